@@ -20,15 +20,37 @@ const server = new MCPServer({
   ],
 });
 
+// Last body and ETag per GET request; unchanged payloads come back as a 304.
+const ETAG_CACHE_SIZE = 200;
+const etagCache = new Map<string, { etag: string; body: unknown }>();
+
 async function apiCall<T>(path: string, options?: RequestInit): Promise<T> {
+  const key = (options?.method ?? "GET") === "GET" ? path : null;
+  const cached = key === null ? undefined : etagCache.get(key);
   const resp = await fetch(`${PYTHON_API}${path}`, {
-    headers: { "Content-Type": "application/json" },
     ...options,
+    headers: {
+      "Content-Type": "application/json",
+      ...(cached ? { "If-None-Match": cached.etag } : {}),
+      ...options?.headers,
+    },
   });
+  if (resp.status === 304 && cached) {
+    return cached.body as T;
+  }
   if (!resp.ok) {
     throw new Error(`API error ${resp.status}: ${await resp.text()}`);
   }
-  return resp.json() as Promise<T>;
+  const body = await resp.json();
+  const etag = resp.headers.get("ETag");
+  if (etag && key !== null) {
+    etagCache.delete(key);
+    etagCache.set(key, { etag, body });
+    if (etagCache.size > ETAG_CACHE_SIZE) {
+      etagCache.delete(etagCache.keys().next().value as string);
+    }
+  }
+  return body as T;
 }
 
 // --- Tool 1: Check Overdue Invoices ---
@@ -278,11 +300,13 @@ server.tool(
 server.tool(
   {
     name: "financial-analysis",
-    description: "Generate a comprehensive financial analysis with interactive charts showing revenue, expenses, profit/loss, and sales data over time. Supports monthly and quarterly views with full-year data.",
+    description: "Generate a comprehensive financial analysis with interactive charts showing revenue, expenses, profit/loss, and sales data over time. Supports daily, weekly, monthly, quarterly and yearly views, rolling windows and year-over-year comparison.",
     schema: z.object({
       connectionId: z.string().default("demo").describe("Connection ID"),
-      timeframe: z.enum(["monthly", "quarterly"]).default("monthly").describe("Time period grouping"),
+      timeframe: z.enum(["daily", "weekly", "monthly", "quarterly", "yearly"]).default("monthly").describe("Time period grouping (yearly covers the five years up to the given year)"),
       year: z.number().default(2026).describe("Year to analyze"),
+      window: z.number().int().min(0).max(366).default(0).describe("Add rolling sums over this many periods"),
+      comparePriorYear: z.boolean().default(false).describe("Add the same period one year earlier to each period"),
     }),
     widget: {
       name: "financial-charts",
@@ -290,13 +314,15 @@ server.tool(
       invoked: "Financial analysis ready",
     },
   },
-  async ({ connectionId, timeframe, year }) => {
+  async ({ connectionId, timeframe, year, window, comparePriorYear }) => {
     const data = await apiCall<any>("/analysis/financial", {
       method: "POST",
       body: JSON.stringify({
         connection_id: connectionId,
         timeframe,
         year,
+        window,
+        compare_prior_year: comparePriorYear,
       }),
     });
 
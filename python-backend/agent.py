@@ -1,9 +1,206 @@
+import asyncio
 import os
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import httpx
+
+AGENT_MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", "5"))
+AGENT_SESSION_IDLE_TTL = float(os.getenv("AGENT_SESSION_IDLE_TTL", "600"))
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "32"))
+AGENT_SESSIONS_PER_CONNECTION = int(os.getenv("AGENT_SESSIONS_PER_CONNECTION", "4"))
+AGENT_SWEEP_INTERVAL = float(os.getenv("AGENT_SWEEP_INTERVAL", "60"))
+
+# Errors that mean the MCP transport is gone rather than the run failing on
+# its own; those get one transparent reconnect.
+_DISCONNECT_ERRORS = (ConnectionError, OSError, httpx.TransportError)
+_DISCONNECT_NAMES = {"ClosedResourceError", "BrokenResourceError", "EndOfStream"}
+
+
+def _is_disconnect(exc: BaseException) -> bool:
+    return isinstance(exc, _DISCONNECT_ERRORS) or type(exc).__name__ in _DISCONNECT_NAMES
+
+
+class _AgentSession:
+    def __init__(self, client, agent, tools):
+        self.client = client
+        self.agent = agent
+        self.tools = tools
+        self.last_used = time.monotonic()
+
+    async def close(self) -> None:
+        try:
+            await self.client.close_all_sessions()
+        except Exception:
+            pass
+
+
+class _SessionGroup:
+    def __init__(self):
+        # MCPAgent runs one message at a time, so each run checks a session
+        # out; beyond AGENT_SESSIONS_PER_CONNECTION runs, callers queue here.
+        self.slots = asyncio.Semaphore(AGENT_SESSIONS_PER_CONNECTION)
+        self.idle: list[_AgentSession] = []
+        self.busy = 0
+
+
+class AgentSessionPool:
+    """Live MCP sessions, tool catalogs and agents, pooled per connection_id.
+
+    Opening a session costs an SSE handshake, ``list_tools`` and agent
+    setup; the pool pays that once per session and reuses it until it has
+    been idle for ``AGENT_SESSION_IDLE_TTL`` or the pool holds more than
+    ``AGENT_POOL_SIZE``. Each run checks a session out of its connection's
+    group, so up to ``AGENT_SESSIONS_PER_CONNECTION`` runs on the same
+    connection go at once. A session that fails is dropped, and a run that
+    failed because the transport went away is retried once on a fresh
+    session.
+    """
+
+    def __init__(self):
+        self._groups: dict[str, _SessionGroup] = {}
+        self._sweeper: asyncio.Task | None = None
+
+    async def _open(self) -> _AgentSession:
+        from mcp_use import MCPAgent, MCPClient
+        from langchain_openai import ChatOpenAI
+
+        mcp_url = os.getenv("MCP_SERVER_URL", "http://localhost:3000")
+        client = MCPClient({"mcpServers": {"ledgify": {"url": f"{mcp_url}/sse"}}})
+        try:
+            session = await client.create_session("ledgify")
+            tools = await session.list_tools()
+            llm = ChatOpenAI(model="gpt-4o", api_key=os.getenv("OPENAI_API_KEY"))
+            # No memory: each request is answered on its own, as before pooling.
+            agent = MCPAgent(llm=llm, client=client, max_steps=AGENT_MAX_STEPS, memory_enabled=False)
+            await agent.initialize()
+        except BaseException:
+            await client.close_all_sessions()
+            raise
+        return _AgentSession(client, agent, tools)
+
+    def warm(self, connection_id: str) -> bool:
+        """Whether a run on ``connection_id`` would start on an open session."""
+        group = self._groups.get(connection_id)
+        return bool(group and group.idle)
+
+    @asynccontextmanager
+    async def checkout(self, connection_id: str, fresh: bool = False) -> AsyncIterator[_AgentSession]:
+        """Hold a session of ``connection_id`` for one run; it goes back to the
+        pool afterwards, or is closed if the run raised. ``fresh`` skips the
+        idle sessions and opens a new one."""
+        group = self._groups.setdefault(connection_id, _SessionGroup())
+        async with group.slots:
+            group.busy += 1
+            session = None
+            try:
+                session = group.idle.pop() if group.idle and not fresh else await self._open()
+                yield session
+            except BaseException:
+                if session is not None:
+                    await session.close()
+                    session = None
+                raise
+            finally:
+                group.busy -= 1
+                if session is not None:
+                    session.last_used = time.monotonic()
+                    group.idle.append(session)
+        await self._trim()
+
+    async def run(self, connection_id: str, message: str):
+        for attempt in range(2):
+            try:
+                async with self.checkout(connection_id, fresh=bool(attempt)) as session:
+                    return await session.agent.run(message)
+            except Exception as exc:
+                if attempt or not _is_disconnect(exc):
+                    raise
+
+    async def stream(self, connection_id: str, message: str) -> AsyncIterator[dict]:
+        async with self.checkout(connection_id) as session:
+            async for event in _agent_events(session.agent, message):
+                yield event
+
+    async def _close_idle(self, keep) -> None:
+        """Close idle sessions for which ``keep(session)`` is false."""
+        for connection_id, group in list(self._groups.items()):
+            closing = [session for session in group.idle if not keep(session)]
+            group.idle = [session for session in group.idle if keep(session)]
+            if not group.idle and not group.busy:
+                del self._groups[connection_id]
+            for session in closing:
+                await session.close()
+
+    async def _trim(self) -> None:
+        idle = sorted((session.last_used for group in self._groups.values() for session in group.idle), reverse=True)
+        busy = sum(group.busy for group in self._groups.values())
+        room = max(0, AGENT_POOL_SIZE - busy)
+        if len(idle) > room:
+            # Keep the most recently used idle sessions that still fit.
+            cutoff = idle[room - 1] if room else float("inf")
+            await self._close_idle(lambda session: session.last_used >= cutoff)
+
+    async def evict_idle(self) -> None:
+        cutoff = time.monotonic() - AGENT_SESSION_IDLE_TTL
+        await self._close_idle(lambda session: session.last_used >= cutoff)
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(AGENT_SWEEP_INTERVAL)
+            await self.evict_idle()
+
+    def start(self) -> None:
+        self._sweeper = asyncio.create_task(self._sweep())
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        await self._close_idle(lambda session: False)
+
+
+async def _agent_events(agent, message: str) -> AsyncIterator[dict]:
+    """Translate an agent run into token / tool / final events.
+
+    Uses ``MCPAgent.astream`` (LangChain ``astream_events``) when the
+    installed mcp_use has it, otherwise falls back to a single final event
+    from ``run``.
+    """
+    astream = getattr(agent, "astream", None)
+    if astream is None:
+        yield {"event": "final", "response": str(await agent.run(message))}
+        return
+
+    final = None
+    tokens = []
+    async for chunk in astream(message):
+        if isinstance(chunk, str):
+            final = chunk
+            continue
+        kind = chunk.get("event") if isinstance(chunk, dict) else None
+        data = chunk.get("data", {}) if kind else {}
+        if kind == "on_chat_model_stream":
+            text = getattr(data.get("chunk"), "content", "")
+            if text:
+                tokens.append(text)
+                yield {"event": "token", "text": text}
+        elif kind == "on_tool_start":
+            yield {"event": "tool_start", "tool": chunk.get("name"), "run_id": chunk.get("run_id"), "input": data.get("input")}
+        elif kind == "on_tool_end":
+            yield {"event": "tool_end", "tool": chunk.get("name"), "run_id": chunk.get("run_id"), "output": str(data.get("output"))[:2000]}
+        elif kind == "on_chain_end" and not chunk.get("parent_ids"):
+            output = data.get("output")
+            final = output.get("output", output) if isinstance(output, dict) else output
+    yield {"event": "final", "response": str(final if final is not None else "".join(tokens))}
+
+
+agent_pool = AgentSessionPool()
 
 
 async def run_agent(connection_id: str, message: str) -> dict:
     openai_key = os.getenv("OPENAI_API_KEY")
-    mcp_url = os.getenv("MCP_SERVER_URL", "http://localhost:3000")
 
     if not openai_key:
         return {
@@ -13,28 +210,7 @@ async def run_agent(connection_id: str, message: str) -> dict:
         }
 
     try:
-        from mcp_use import MCPClient
-        from langchain_openai import ChatOpenAI
-
-        config = {
-            "mcpServers": {
-                "ledgify": {
-                    "url": f"{mcp_url}/sse",
-                }
-            }
-        }
-
-        client = MCPClient(config)
-        session = await client.create_session("ledgify")
-        tools = await session.list_tools()
-
-        llm = ChatOpenAI(model="gpt-4o", api_key=openai_key)
-        from mcp_use import MCPAgent
-        agent = MCPAgent(llm=llm, client=client, max_steps=5)
-        result = await agent.run(message)
-
-        await client.close_all_sessions()
-
+        result = await agent_pool.run(connection_id, message)
         return {
             "status": "success",
             "response": str(result),
@@ -45,3 +221,33 @@ async def run_agent(connection_id: str, message: str) -> dict:
             "status": "error",
             "message": f"Agent error: {str(e)}",
         }
+
+
+async def stream_agent(connection_id: str, message: str) -> AsyncIterator[dict]:
+    """Streaming run_agent: events carry ``t_ms`` since the request started,
+    and tool_end events the tool's own ``duration_ms``."""
+    started = time.perf_counter()
+
+    def elapsed() -> float:
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    if not os.getenv("OPENAI_API_KEY"):
+        yield {
+            "event": "unavailable",
+            "message": "Agent mode requires OPENAI_API_KEY. Please set it in your .env file.",
+            "t_ms": elapsed(),
+        }
+        return
+
+    yield {"event": "start", "session_reused": agent_pool.warm(connection_id), "t_ms": elapsed()}
+    tool_started = {}
+    try:
+        async for event in agent_pool.stream(connection_id, message):
+            event["t_ms"] = elapsed()
+            if event["event"] == "tool_start":
+                tool_started[event["run_id"]] = event["t_ms"]
+            elif event["event"] == "tool_end" and event["run_id"] in tool_started:
+                event["duration_ms"] = round(event["t_ms"] - tool_started.pop(event["run_id"]), 1)
+            yield event
+    except Exception as e:
+        yield {"event": "error", "message": f"Agent error: {str(e)}", "t_ms": elapsed()}
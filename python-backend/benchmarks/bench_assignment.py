@@ -0,0 +1,79 @@
+"""One-to-one assignment benchmark.
+
+    python benchmarks/bench_assignment.py --size 50000 --degrees 2 4 8
+
+Times ``max_weight_matching`` on sparse transaction x invoice graphs with
+confidences in (0.6, 1]. "corpus" is the real edge set of a
+:func:`synthetic.make_corpus` of ``--size`` invoices (its degree is its own).
+The others come from :func:`synthetic.make_graph`: "banded" graphs connect
+each transaction to invoices of nearby amount, which chains everything into
+one large component the way amount-window candidates do; "random" graphs are
+the harder case for the auction. ``--check`` solves smaller graphs densely
+and compares totals.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import reconciliation  # noqa: E402
+from reconciliation import max_weight_matching  # noqa: E402
+from records import invoice_records, transaction_records  # noqa: E402
+from synthetic import make_corpus, make_graph  # noqa: E402
+
+
+def corpus_graph(size: int):
+    """``(n_txn, n_inv, txn_idx, inv_idx, confidence)`` of the edges above the
+    threshold in a corpus of ``size`` invoices, as optimal assignment sees them."""
+    invoices, transactions, _ = make_corpus(size)
+    invoices, transactions = invoice_records(invoices), transaction_records(transactions)
+    txn_idx, inv_idx, confidence, _, _ = reconciliation._edges_above_threshold(invoices, transactions, True)
+    return len(transactions), len(invoices), txn_idx, inv_idx, confidence
+
+
+def greedy_conflicts(txn_idx, inv_idx, weight) -> int:
+    # Invoices claimed by more than one transaction under per-transaction argmax.
+    order = np.lexsort((-weight, txn_idx))
+    _, first = np.unique(txn_idx[order], return_index=True)
+    claimed = inv_idx[order[first]]
+    return len(claimed) - len(np.unique(claimed))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=50_000)
+    parser.add_argument("--degrees", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--check", action="store_true", help="verify against dense solving at 2k rows")
+    args = parser.parse_args()
+
+    if args.check:
+        for layout in ("banded", "random"):
+            txn_idx, inv_idx, weight = make_graph(2_000, 6, layout)
+            sparse_total = weight[max_weight_matching(2_000, 2_000, txn_idx, inv_idx, weight)].sum()
+            reconciliation.DENSE_COMPONENT_CELLS, saved = 10**9, reconciliation.DENSE_COMPONENT_CELLS
+            dense_total = weight[max_weight_matching(2_000, 2_000, txn_idx, inv_idx, weight)].sum()
+            reconciliation.DENSE_COMPONENT_CELLS = saved
+            print(f"check {layout}: auction {sparse_total:.6f} dense {dense_total:.6f}")
+
+    graphs = [("corpus", corpus_graph(args.size))]
+    graphs += [
+        (layout, (args.size, args.size, *make_graph(args.size, degree, layout)))
+        for layout in ("banded", "random")
+        for degree in args.degrees
+    ]
+    print(f"{'layout':>7} {'deg':>4} {'edges':>9} {'seconds':>8} {'matched':>8} {'greedy double-claims':>21}")
+    for layout, (n_txn, n_inv, txn_idx, inv_idx, weight) in graphs:
+        start = time.perf_counter()
+        picked = max_weight_matching(n_txn, n_inv, txn_idx, inv_idx, weight)
+        elapsed = time.perf_counter() - start
+        conflicts = greedy_conflicts(txn_idx, inv_idx, weight)
+        degree = len(weight) / n_txn
+        print(f"{layout:>7} {degree:>4.1f} {len(weight):>9} {elapsed:>8.2f} {len(picked):>8} {conflicts:>21}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Event-loop stalls while a reconciliation runs, inline vs offloaded.
+
+    python benchmarks/bench_compute.py --sizes 5000 20000
+
+A ticker coroutine sleeps 10 ms in a loop, standing in for the other
+requests the server is answering (``/health`` and the like); how late it
+wakes up is how long those requests would wait. Each size reconciles a
+:func:`synthetic.make_corpus` of that many invoices and their payments:
+
+``inline``   ``fuzzy_reconcile`` called on the event loop, as before.
+``thread``   through :meth:`ComputeExecutor.run`, the matcher in a thread.
+``process``  through :meth:`ComputeExecutor.reconcile` in a worker
+             process; ``pack KB`` is the pickled size of the packed
+             columns sent to it, against pickling the records themselves.
+"""
+import argparse
+import asyncio
+import pickle
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from compute import ComputeExecutor  # noqa: E402
+from reconciliation import fuzzy_reconcile, pack_inputs  # noqa: E402
+from records import invoice_records, transaction_records  # noqa: E402
+from synthetic import make_corpus  # noqa: E402
+
+TICK = 0.01
+
+
+async def measure(job) -> tuple[float, float, float]:
+    """Seconds for ``job()``, plus the worst and median ticker delay in ms."""
+    delays = []
+
+    async def ticker():
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            delays.append(time.perf_counter() - start - TICK)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK * 2)
+    delays.clear()
+    start = time.perf_counter()
+    await job()
+    elapsed = time.perf_counter() - start
+    task.cancel()
+    delays.sort()
+    return elapsed, delays[-1] * 1e3 if delays else elapsed * 1e3, delays[len(delays) // 2] * 1e3 if delays else 0
+
+
+async def run(sizes: list[int]) -> None:
+    executor = ComputeExecutor(offload_threshold=0, process_threshold=0)
+    print(f"{'rows':>7} {'mode':>8} {'seconds':>8} {'worst ms':>9} {'median ms':>10} {'pack KB':>8} {'records KB':>11}")
+    for size in sizes:
+        invoices, transactions, _ = make_corpus(size)
+        invoices, transactions = invoice_records(invoices), transaction_records(transactions)
+        packed = len(pickle.dumps(pack_inputs(invoices, transactions))) / 1e3
+        plain = len(pickle.dumps((invoices, transactions))) / 1e3
+
+        async def inline():
+            fuzzy_reconcile(invoices, transactions)
+
+        async def thread():
+            await executor.run(fuzzy_reconcile, invoices, transactions)
+
+        async def process():
+            await executor.run(executor.reconcile, invoices, transactions)
+
+        await process()  # start the worker outside the timing
+        for mode, job in (("inline", inline), ("thread", thread), ("process", process)):
+            elapsed, worst, median = await measure(job)
+            sent = f"{packed:>8.0f} {plain:>11.0f}" if mode == "process" else ""
+            print(f"{size:>7} {mode:>8} {elapsed:>8.2f} {worst:>9.1f} {median:>10.2f} {sent}")
+    executor.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 20_000])
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes))
+
+
+if __name__ == "__main__":
+    main()
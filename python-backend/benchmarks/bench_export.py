@@ -0,0 +1,67 @@
+"""Export throughput and memory for large datasets.
+
+    python benchmarks/bench_export.py --rows 10000 100000 1000000 --formats csv parquet xlsx --memory
+
+Feeds :mod:`synthetic` corpus invoices, generated up front, through the
+export stream as an async generator (as a paged listing would arrive) and
+drains the output without keeping it. With ``--memory`` each export runs a second time under tracemalloc
+and reports the traced peak; flat peaks across row counts mean memory
+does not grow with the dataset. Timings come from the untraced run.
+"""
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from export import check_format, export_stream  # noqa: E402
+from synthetic import generate  # noqa: E402
+
+
+async def paged(invoices: list[dict]):
+    for i, inv in enumerate(invoices):
+        yield inv
+        if i % 100 == 99:
+            await asyncio.sleep(0)  # a page boundary
+
+
+async def run(invoices: list[dict], fmt: str, trace: bool = False) -> tuple[float, int, float]:
+    size = 0
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    async for data in export_stream("invoices", paged(invoices), fmt):
+        size += len(data)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, size, peak / 1e6
+
+
+def main(args) -> None:
+    print(f"{'format':>8} {'rows':>9} {'seconds':>8} {'rows/s':>10} {'MB out':>8} {'peak MB':>8}")
+    for fmt in args.formats:
+        problem = check_format(fmt)
+        if problem:
+            print(f"{fmt:>8}  skipped: {problem}")
+            continue
+        for rows in args.rows:
+            # Only the invoices are kept; each chunk's payments are dropped.
+            invoices = [inv for chunk, _, _ in generate(rows) for inv in chunk]
+            elapsed, size, _ = asyncio.run(run(invoices, fmt))
+            peak = f"{asyncio.run(run(invoices, fmt, trace=True))[2]:.2f}" if args.memory else "-"
+            del invoices
+            print(f"{fmt:>8} {rows:>9} {elapsed:>8.2f} {rows / elapsed:>10,.0f} {size / 1e6:>8.1f} {peak:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--formats", nargs="+", default=["csv", "parquet", "arrow", "xlsx"])
+    parser.add_argument("--memory", action="store_true", help="also measure the traced allocation peak")
+    main(parser.parse_args())
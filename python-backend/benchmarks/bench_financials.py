@@ -0,0 +1,83 @@
+"""Financial period aggregation benchmark.
+
+    python benchmarks/bench_financials.py --sizes 12 1826 100000
+
+Times the per-metric list passes the insights/analysis code used to make
+against the columnar FinancialSeries over :func:`synthetic.make_periods`,
+both cold (building the columns) and memoized (same period list again),
+and checks the figures agree.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from financials import FinancialSeries, financial_series  # noqa: E402
+from synthetic import make_periods  # noqa: E402
+
+
+def list_passes(periods: list[dict]) -> dict:
+    total_revenue = sum(m["revenue"] for m in periods)
+    total_expenses = sum(m["expenses"] for m in periods)
+    total_profit = sum(m["profit"] for m in periods)
+    total_sales = sum(m["sales"] for m in periods)
+    revenue_trend = [m["revenue"] for m in periods]
+    recent = sum(revenue_trend[-3:])
+    prior = sum(revenue_trend[-6:-3]) if len(revenue_trend) >= 6 else sum(revenue_trend[:3])
+    ratios = [round((m["expenses"] / m["revenue"]) * 100, 1) if m["revenue"] else 0 for m in periods]
+    best = max(periods, key=lambda m: m["profit"])
+    worst = min(periods, key=lambda m: m["profit"])
+    best_rev = max(periods, key=lambda m: m["revenue"])
+    worst_rev = min(periods, key=lambda m: m["revenue"])
+    return {
+        "totals": (total_revenue, total_expenses, total_profit, total_sales),
+        "growth": round(((recent - prior) / prior) * 100, 1) if prior else 0,
+        "ratios": ratios,
+        "extremes": (best["month"], worst["month"], best_rev["month"], worst_rev["month"]),
+    }
+
+
+def columnar(series: FinancialSeries) -> dict:
+    stats = series.stats
+    totals = stats["totals"]
+    return {
+        "totals": (totals["revenue"], totals["expenses"], totals["profit"], totals["sales"]),
+        "growth": stats["recent_growth"],
+        "ratios": stats["expense_ratios"],
+        "extremes": tuple(
+            series.labels[stats[key]] for key in ("best_profit", "worst_profit", "best_revenue", "worst_revenue")
+        ),
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(args) -> None:
+    print(f"{'periods':>8} {'list ms':>10} {'cold ms':>10} {'memo ms':>10}  agree")
+    for size in args.sizes:
+        periods = make_periods(size)
+        repeat = max(1, 20_000 // size)
+        legacy = timed(lambda: list_passes(periods), repeat)
+        cold = timed(lambda: columnar(FinancialSeries.from_periods(periods)), repeat)
+        columnar(financial_series(periods))  # warm the memo
+        memo = timed(lambda: columnar(financial_series(periods)), repeat)
+        expected, got = list_passes(periods), columnar(financial_series(periods))
+        # np.round and round() can differ by one step on exact .x5 ties.
+        ratios_close = np.allclose(expected.pop("ratios"), got.pop("ratios"), atol=0.1 + 1e-9)
+        agree = ratios_close and expected == got
+        print(f"{size:>8} {legacy:>10.3f} {cold:>10.3f} {memo:>10.4f}  {agree}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[12, 1826, 100_000])
+    main(parser.parse_args())
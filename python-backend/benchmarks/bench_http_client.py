@@ -0,0 +1,116 @@
+"""Unified API client latency benchmark against a local mock server.
+
+    python benchmarks/bench_http_client.py --requests 500 --concurrency 20 --handshake-ms 20
+
+Starts a keep-alive HTTP/1.1 mock of the invoice listing endpoint and times
+``get_overdue_invoices`` two ways: a fresh ``httpx.AsyncClient`` per call
+(what the data modules used to do) and the shared pooled client. The mock
+sleeps ``--handshake-ms`` once per new connection to stand in for TCP+TLS
+setup against the real API. Reports p50/p99 per mode.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from synthetic import make_corpus  # noqa: E402
+
+
+async def _serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, body: bytes, handshake: float):
+    await asyncio.sleep(handshake)
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def _timed(call, n: int, concurrency: int) -> list[float]:
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(n)))
+    return latencies
+
+
+async def main(args) -> None:
+    body = json.dumps(make_corpus(args.invoices)[0]).encode()
+    server = await asyncio.start_server(
+        lambda r, w: _serve(r, w, body, args.handshake_ms / 1000), "127.0.0.1", 0
+    )
+    port = server.sockets[0].getsockname()[1]
+
+    os.environ["UNIFIED_API_KEY"] = "bench"
+    os.environ["UNIFIED_BASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["UNIFIED_HTTP2"] = "0"  # the mock only speaks HTTP/1.1
+    import httpx
+    from data import client
+    from data.accounting import get_overdue_invoices
+
+    async def fresh_client():
+        # The previous per-call pattern: new client, new connection, every time.
+        async with httpx.AsyncClient() as c:
+            resp = await c.get(
+                f"{client.UNIFIED_BASE_URL}/accounting/bench/invoice",
+                headers={"Authorization": f"Bearer {client.UNIFIED_API_KEY}"},
+                params={"status": "overdue"},
+                timeout=30,
+            )
+            resp.raise_for_status()
+            resp.json()
+
+    async def shared_client():
+        await get_overdue_invoices("bench")
+
+    print(f"{'mode':<10} {'requests':>8} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'total s':>8}")
+    for name, call in (("per-call", fresh_client), ("shared", shared_client)):
+        start = time.perf_counter()
+        latencies = await _timed(call, args.requests, args.concurrency)
+        total = time.perf_counter() - start
+        print(
+            f"{name:<10} {len(latencies):>8} {_percentile(latencies, 50):>8.2f} "
+            f"{_percentile(latencies, 99):>8.2f} {statistics.mean(latencies):>8.2f} {total:>8.2f}"
+        )
+
+    await client.close_client()
+    server.close()
+    await server.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--invoices", type=int, default=50, help="invoices in each mock response")
+    parser.add_argument("--handshake-ms", type=float, default=20.0, help="simulated connection setup cost")
+    asyncio.run(main(parser.parse_args()))
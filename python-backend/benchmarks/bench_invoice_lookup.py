@@ -0,0 +1,79 @@
+"""Invoice-by-id lookup benchmark.
+
+    python benchmarks/bench_invoice_lookup.py --invoices 100000 --lookups 2000
+
+Loads ``--invoices`` :func:`synthetic.make_corpus` invoices as demo data and
+resolves random ids three ways: the old linear scan, ``get_demo_invoice_by_id``
+(indexed), and the live ``get_invoice_by_id`` path served from a cached
+overdue list. Overrides go to a temp file so the real demo_overrides.json is
+left alone.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["UNIFIED_API_KEY"] = "bench"
+
+import demo_data  # noqa: E402
+from data.accounting import get_invoice_by_id  # noqa: E402
+from data.cache import unified_cache  # noqa: E402
+from synthetic import make_corpus  # noqa: E402
+
+
+def linear_scan(invoices: list[dict], invoice_id: str) -> dict | None:
+    for inv in invoices:
+        if inv["id"] == invoice_id:
+            return inv
+    return None
+
+
+def report(name: str, seconds: float, lookups: int) -> None:
+    print(f"{name:<22} {seconds * 1e6 / lookups:>10.2f} us/lookup  {lookups / seconds:>12,.0f} lookups/s")
+
+
+async def main(args) -> None:
+    demo_data._store.path = Path(tempfile.mkdtemp()) / "demo_overrides.json"
+    invoices = make_corpus(args.invoices)[0]
+    demo_data.set_demo_invoices(invoices)
+    rng = random.Random(1)
+    ids = [rng.choice(invoices)["id"] for _ in range(args.lookups)]
+
+    start = time.perf_counter()
+    for invoice_id in ids:
+        assert linear_scan(invoices, invoice_id) is not None
+    report("linear scan", time.perf_counter() - start, len(ids))
+
+    start = time.perf_counter()
+    demo_data.get_demo_invoice_by_id(ids[0])
+    print(f"{'index build':<22} {(time.perf_counter() - start) * 1000:>10.2f} ms (once per dataset version)")
+
+    start = time.perf_counter()
+    for invoice_id in ids:
+        assert demo_data.get_demo_invoice_by_id(invoice_id) is not None
+    report("demo index", time.perf_counter() - start, len(ids))
+
+    # Live mode: the overdue list is already cached from /invoices/overdue.
+    async def overdue():
+        return invoices
+
+    await unified_cache.get(("bench", "overdue_invoices"), overdue)
+    start = time.perf_counter()
+    for invoice_id in ids:
+        assert await get_invoice_by_id("bench", invoice_id) is not None
+    report("live cached index", time.perf_counter() - start, len(ids))
+    demo_data._store.clear()
+    demo_data.flush_demo_overrides()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
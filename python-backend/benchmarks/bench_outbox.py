@@ -0,0 +1,121 @@
+"""Email outbox drain test against a local stand-in for the messaging API.
+
+    python benchmarks/bench_outbox.py --messages 200 --connections 4 --error-rate 0.2
+
+The stand-in accepts ``POST /messaging/{connection_id}/message`` and fails a
+share of requests with 429 or 500. Half of the 500s are "ambiguous": the
+message is recorded as delivered before the error is returned, like a
+provider timing out after accepting it. Deliveries are deduplicated on the
+Idempotency-Key header, so a retry after an ambiguous failure must not
+count as a second delivery. Reports drain time, attempts and duplicates.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class StandIn:
+    def __init__(self, error_rate: float, seed: int = 3):
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.delivered: Counter = Counter()  # idempotency key -> deliveries
+        self.requests = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                headers = {}
+                for line in head.decode().split("\r\n")[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+                key = headers.get("idempotency-key", f"anon-{self.requests}")
+                status, body = 200, {"id": key}
+                roll = self.rng.random()
+                if key in self.delivered:
+                    body["duplicate"] = True  # already accepted; acknowledge, don't resend
+                elif roll < self.error_rate / 2:
+                    status, body = 429, {"error": "rate limited"}
+                elif roll < self.error_rate * 3 / 4:
+                    status, body = 500, {"error": "upstream error"}
+                elif roll < self.error_rate:
+                    self.delivered[key] += 1  # accepted, but the caller sees a failure
+                    status, body = 500, {"error": "timeout after accept"}
+                else:
+                    self.delivered[key] += 1
+                payload = json.dumps(body).encode()
+                extra = b"Retry-After: 0.05\r\n" if status == 429 else b""
+                writer.write(
+                    f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\n".encode() + extra
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def main(args) -> None:
+    stand_in = StandIn(args.error_rate)
+    server = await asyncio.start_server(stand_in.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    os.environ["UNIFIED_API_KEY"] = "bench"
+    os.environ["UNIFIED_BASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["UNIFIED_HTTP2"] = "0"
+    os.environ["EMAIL_OUTBOX_BACKOFF_BASE"] = "1.5"
+    os.environ["EMAIL_OUTBOX_BACKOFF_MAX"] = "0.5"
+    os.environ["EMAIL_OUTBOX_MAX_ATTEMPTS"] = "10"
+    from data.client import close_client
+    from outbox import EmailOutbox
+
+    outbox = EmailOutbox(Path(tempfile.mkdtemp()) / "outbox.db", workers=args.workers, rate=args.rate)
+    ids = []
+    for i in range(args.messages):
+        message = await outbox.enqueue(f"conn_{i % args.connections}", f"ap{i}@example.com", f"Invoice {i}", "Please pay.", f"inv_{i}")
+        ids.append(message["id"])
+    # Enqueueing the same email again is a no-op.
+    await outbox.enqueue("conn_0", "ap0@example.com", "Invoice 0", "Please pay.", "inv_0")
+
+    start = time.perf_counter()
+    await outbox.start()
+    while True:
+        counts = await outbox.counts()
+        if counts["queued"] == 0 and counts["sending"] == 0:
+            break
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    await outbox.stop()
+    await close_client()
+    server.close()
+
+    attempts = sum([(await outbox.status(i))["attempts"] for i in ids])
+    duplicates = sum(n - 1 for n in stand_in.delivered.values() if n > 1)
+    print(f"messages        {args.messages} over {args.connections} connections, {args.workers} workers")
+    print(f"outcome         {counts}")
+    print(f"drain time      {elapsed:.2f}s ({args.messages / elapsed:.0f} msg/s, cap {args.rate * args.connections:.0f} msg/s)")
+    print(f"attempts        {attempts} ({attempts - args.messages} retries)")
+    print(f"delivered       {len(stand_in.delivered)} unique, {duplicates} duplicates")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=20.0, help="sends per second per connection")
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    asyncio.run(main(parser.parse_args()))
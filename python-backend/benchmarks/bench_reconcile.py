@@ -0,0 +1,55 @@
+"""Reconciliation scaling benchmark.
+
+    python benchmarks/bench_reconcile.py --sizes 100 1000 10000 100000
+
+Each size is a :func:`synthetic.make_corpus` of that many invoices and their
+payments. The all-pairs scan is only timed up to ``--max-brute`` rows; where
+both run, the matched pairs are compared. ``--scoring pairwise`` times the
+one-call-per-pair scorer instead of the vectorized batch scorer;
+``--assignment optimal`` adds the one-to-one matching stage.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from reconciliation import ReconciliationResult, fuzzy_reconcile  # noqa: E402
+from synthetic import make_corpus  # noqa: E402
+
+
+def _pairs(result: ReconciliationResult) -> set[tuple[str, str]]:
+    return {(txn.id, inv.id) for txn, inv, *_ in result.matches()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--max-brute", type=int, default=2_000)
+    parser.add_argument("--scoring", choices=["batch", "pairwise"], default="batch")
+    parser.add_argument("--assignment", choices=["greedy", "optimal"], default="greedy")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'indexed s':>10} {'all-pairs s':>12} {'matched':>8} {'agree':>6}")
+    for size in args.sizes:
+        invoices, transactions, _ = make_corpus(size)
+
+        start = time.perf_counter()
+        indexed = fuzzy_reconcile(invoices, transactions, scoring=args.scoring, assignment=args.assignment)
+        indexed_s = time.perf_counter() - start
+
+        brute_s, agree = "-", "-"
+        if size <= args.max_brute:
+            start = time.perf_counter()
+            brute = fuzzy_reconcile(
+                invoices, transactions, blocking=False, scoring=args.scoring, assignment=args.assignment
+            )
+            brute_s = f"{time.perf_counter() - start:.3f}"
+            agree = f"{len(_pairs(indexed) & _pairs(brute)) / max(len(_pairs(brute)), 1):.1%}"
+
+        print(f"{size:>8} {indexed_s:>10.3f} {brute_s:>12} {len(indexed.txn_idx):>8} {agree:>6}")
+
+
+if __name__ == "__main__":
+    main()
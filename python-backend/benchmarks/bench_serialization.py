@@ -0,0 +1,85 @@
+"""JSON serialization cost per response payload.
+
+    python benchmarks/bench_serialization.py --rows 1000 100000
+
+Times the ways a payload can reach the wire:
+
+``stdlib``   ``jsonable_encoder`` then ``json.dumps``, FastAPI's stock
+             ``JSONResponse`` path.
+``encoder``  ``jsonable_encoder`` then orjson, what an endpoint returning a
+             plain dict gets with the orjson default response class.
+``orjson``   orjson straight from the payload (``json_response``, first call).
+``cached``   a repeat ``json_response`` for an unchanged payload.
+
+Payloads are the demo insights, a daily financial analysis with a 7-day
+rolling window and prior-year comparison, and ``--rows`` invoices from
+:func:`synthetic.make_corpus` (the admin data endpoints). ``overrides`` compares writing the demo
+overrides file pretty-printed with ``json.dump(indent=2)`` against orjson.
+"""
+import argparse
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from demo_data import get_demo_insights, get_demo_timeseries  # noqa: E402
+from responses import dumps, serialized_payloads  # noqa: E402
+from synthetic import make_corpus  # noqa: E402
+from timeseries import financial_analysis  # noqa: E402
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def stdlib(payload) -> bytes:
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payloads = {
+        "insights": get_demo_insights(),
+        "analysis": financial_analysis(get_demo_timeseries(), 2026, "daily", window=7, compare_prior_year=True),
+    }
+    payloads.update({f"invoices {rows}": make_corpus(rows)[0] for rows in args.rows})
+
+    print(f"{'payload':>16} {'KB':>8} {'stdlib ms':>10} {'encoder ms':>11} {'orjson ms':>10} {'cached ms':>10} {'speedup':>8}")
+    for name, payload in payloads.items():
+        size = len(dumps(payload)) / 1e3
+        base = best_of(lambda: stdlib(payload), args.repeat)
+        encoder = best_of(lambda: dumps(jsonable_encoder(payload)), args.repeat)
+        direct = best_of(lambda: dumps(payload), args.repeat)
+        serialized_payloads.get(payload)
+        cached = best_of(lambda: serialized_payloads.get(payload), args.repeat)
+        print(
+            f"{name:>16} {size:>8.1f} {base * 1e3:>10.2f} {encoder * 1e3:>11.2f} {direct * 1e3:>10.3f} "
+            f"{cached * 1e3:>10.4f} {base / direct:>7.0f}x"
+        )
+
+    print(f"\n{'overrides':>16} {'KB':>8} {'indent=2 ms':>12} {'orjson ms':>10}")
+    for rows in args.rows:
+        data = {"invoices": payloads[f"invoices {rows}"]}
+        pretty = best_of(lambda: json.dump(data, io.StringIO(), indent=2), args.repeat)
+        compact = best_of(lambda: dumps(data), args.repeat)
+        print(f"{rows:>16} {len(dumps(data)) / 1e3:>8.1f} {pretty * 1e3:>12.2f} {compact * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Sharded reconciliation: shard costs and speedup by worker count.
+
+    python benchmarks/bench_sharded.py --sizes 100000 --workers 1 2 4 8 16
+
+Each size is a :func:`synthetic.make_corpus` of that many invoices and
+their payments. The plain ``fuzzy_reconcile`` run is timed once, then
+``sharded_reconcile`` with twice as many shards as workers (what the
+compute pool uses). Shards are run one after another in this process and
+timed individually, which gives:
+
+``replicas``   transactions sent to shards per transaction (band overlap).
+``work s``     summed shard time, against the single unsharded run.
+``serial s``   partitioning, packing and the global merge, done in the
+               calling process.
+``wall s``     serial time plus the makespan of the shards on ``workers``
+               processes, handed out in submission order. With ``--measure``
+               and at least that many CPUs the run is also repeated on a
+               real ``ProcessPoolExecutor`` and timed.
+
+``matched`` is compared against the unsharded run; the sharded run can only
+find more, where a shard's smaller name and amount blocks stay under
+``MAX_BLOCK_SIZE``.
+
+Speedup stays well short of linear: a payment is scored in every band its
+viable range (0.6x to 3x its amount) overlaps, so ``replicas`` and the
+summed work grow with the shard count.
+"""
+import argparse
+import heapq
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from reconciliation import fuzzy_reconcile, partition_shards, sharded_reconcile  # noqa: E402
+from records import invoice_records, transaction_records  # noqa: E402
+from synthetic import make_corpus  # noqa: E402
+
+
+class TimedMap:
+    """An inline ``executor.map`` that records how long each job of each
+    ``map`` call (round) took.
+
+    Arguments and results go through pickle as they would to and from a
+    worker process: unpickling the arguments and pickling the result count
+    toward the job, the caller's side toward serial time.
+    """
+
+    def __init__(self):
+        self.rounds = []
+
+    def map(self, fn, items):
+        times = []
+        self.rounds.append(times)
+        for item in items:
+            payload = pickle.dumps(item)
+            start = time.perf_counter()
+            result = pickle.dumps(fn(pickle.loads(payload)))
+            times.append(time.perf_counter() - start)
+            yield pickle.loads(result)
+
+
+def makespan(times: list[float], workers: int) -> float:
+    free = [0.0] * workers
+    for seconds in times:
+        heapq.heappush(free, heapq.heappop(free) + seconds)
+    return max(free)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--assignment", choices=["greedy", "optimal"], default="greedy")
+    parser.add_argument("--measure", action="store_true", help="also time a real process pool where CPUs allow")
+    args = parser.parse_args()
+
+    print(
+        f"{'rows':>9} {'workers':>7} {'shards':>6} {'replicas':>8} {'work s':>8} {'serial s':>8} "
+        f"{'wall s':>8} {'speedup':>7} {'measured':>8} {'matched':>8}"
+    )
+    for size in args.sizes:
+        invoices, transactions, _ = make_corpus(size)
+        invoices, transactions = invoice_records(invoices), transaction_records(transactions)
+        start = time.perf_counter()
+        base = fuzzy_reconcile(invoices, transactions, assignment=args.assignment)
+        base_seconds = time.perf_counter() - start
+        print(
+            f"{size:>9} {'-':>7} {'-':>6} {'-':>8} {base_seconds:>8.2f} {'-':>8} "
+            f"{base_seconds:>8.2f} {1:>6.1f}x {'-':>8} {len(base.txn_idx):>8}"
+        )
+        for workers in args.workers:
+            shards = 2 * workers
+            replicas = sum(len(txns) for _, txns in partition_shards(invoices, transactions, shards)) / len(transactions)
+            timed = TimedMap()
+            start = time.perf_counter()
+            result = sharded_reconcile(invoices, transactions, shards, executor=timed, assignment=args.assignment)
+            work = sum(map(sum, timed.rounds))
+            serial = time.perf_counter() - start - work
+            wall = serial + sum(makespan(times, workers) for times in timed.rounds)
+            measured = "-"
+            if args.measure and workers <= (os.cpu_count() or 1):
+                with ProcessPoolExecutor(workers) as pool:
+                    start = time.perf_counter()
+                    sharded_reconcile(invoices, transactions, shards, executor=pool, assignment=args.assignment)
+                    measured = f"{time.perf_counter() - start:.2f}"
+            print(
+                f"{size:>9} {workers:>7} {shards:>6} {replicas:>8.2f} {work:>8.2f} {serial:>8.2f} "
+                f"{wall:>8.2f} {base_seconds / wall:>6.1f}x {measured:>8} {len(result.txn_idx):>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Benchmark suite over synthetic corpora, with a history to compare runs.
+
+    python benchmarks/bench_suite.py --rows 1000 10000 100000
+    python benchmarks/bench_suite.py --rows 1000000 --cases reconcile sharded
+
+Every (case, rows) pair runs in its own process on the :mod:`synthetic`
+corpus for ``--seed`` (``rows`` invoices, about 0.9x as many payments):
+
+``reconcile``  ``fuzzy_reconcile``, greedy assignment.
+``optimal``    ``fuzzy_reconcile``, optimal assignment.
+``sharded``    ``sharded_reconcile``, optimal assignment, on a process pool
+               with one worker per CPU.
+``insights``   ``get_demo_insights`` with the corpus loaded as the demo data
+               and no materialized result, so every card is built,
+               including the match rate from reconciling the corpus.
+``overdue``    ``get_overdue_invoices`` paging the invoices from a local mock
+               of the Unified API; the mock's serving cost is included.
+
+``rows/s`` is invoices per second. ``peak MB`` is the case's resident
+high-water mark above the corpus already in memory (the calling process
+only). ``precision`` and ``recall`` compare matched (payment, invoice)
+pairs with the generator's truth. Each result is appended to ``--history``
+as a JSON line with the commit and time; ``vs last`` is the change in
+rows/s since the previous entry for the same case, rows and seed.
+"""
+import argparse
+import asyncio
+import ctypes
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from synthetic import make_corpus, precision_recall  # noqa: E402
+
+CASES = ["reconcile", "optimal", "sharded", "insights", "overdue"]
+HISTORY = Path(__file__).resolve().parent / "history.jsonl"
+
+
+def _rss_mb() -> float:
+    gc.collect()
+    ctypes.CDLL("libc.so.6").malloc_trim(0)
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1e6
+
+
+def _reset_peak() -> None:
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")  # resets VmHWM to the current RSS
+
+
+def _peak_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1e3
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def _pairs(result) -> set[tuple[str, str]]:
+    return {(txn.id, inv.id) for txn, inv, *_ in result.matches()}
+
+
+async def _serve_invoices(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, invoices: list[dict]):
+    import orjson
+
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            query = parse_qs(urlsplit(head.split(b" ", 2)[1].decode()).query)
+            offset, limit = int(query["offset"][0]), int(query["limit"][0])
+            body = orjson.dumps(invoices[offset:offset + limit])
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _overdue(invoices: list[dict]) -> int:
+    from data import client
+    from data.accounting import get_overdue_invoices
+
+    server = await asyncio.start_server(lambda r, w: _serve_invoices(r, w, invoices), "127.0.0.1", 0)
+    client.UNIFIED_BASE_URL = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    try:
+        return len(await get_overdue_invoices("bench"))
+    finally:
+        await client.close_client()
+        server.close()
+        await server.wait_closed()
+
+
+def child(case: str, rows: int, seed: int) -> dict:
+    # Everything a case imports is loaded before timing starts.
+    os.environ["UNIFIED_API_KEY"] = "bench"
+    os.environ["UNIFIED_HTTP2"] = "0"  # the mock only speaks HTTP/1.1
+    import demo_data
+    from data import accounting  # noqa: F401
+    from insights import materialized_insights
+    from reconciliation import fuzzy_reconcile, sharded_reconcile
+
+    invoices, transactions, truth = make_corpus(rows, seed)
+    if case == "insights":
+        demo_data._store.path = Path(tempfile.mkdtemp()) / "demo_overrides.json"
+        demo_data.set_demo_invoices(invoices)
+        demo_data.set_demo_transactions(transactions)
+        demo_data.flush_demo_overrides()
+        assert len(demo_data.get_demo_invoices()) == rows
+        materialized_insights.invalidate("demo")
+    elif case == "overdue":
+        del transactions
+
+    base = _rss_mb()
+    _reset_peak()
+    start = time.perf_counter()
+    if case in ("reconcile", "optimal"):
+        result = fuzzy_reconcile(invoices, transactions, assignment="greedy" if case == "reconcile" else "optimal")
+    elif case == "sharded":
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = os.cpu_count() or 1
+        with ProcessPoolExecutor(workers) as pool:
+            result = sharded_reconcile(invoices, transactions, 2 * workers, executor=pool, assignment="optimal")
+    elif case == "insights":
+        result = demo_data.get_demo_insights("2026-02")
+    else:
+        result = asyncio.run(_overdue(invoices))
+    seconds = time.perf_counter() - start
+    out = {"seconds": seconds, "rows_per_s": rows / seconds, "peak_mb": max(0.0, _peak_mb() - base)}
+    if case in ("reconcile", "optimal", "sharded"):
+        out["precision"], out["recall"] = precision_recall(_pairs(result), truth)
+    return out
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _last_runs(path: Path | None) -> dict[tuple, dict]:
+    last = {}
+    if path is not None and path.exists():
+        for line in path.read_text().splitlines():
+            entry = json.loads(line)
+            last[entry["case"], entry["rows"], entry["seed"]] = entry
+    return last
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--history", type=Path, default=HISTORY)
+    parser.add_argument("--no-history", action="store_true", help="don't read or append to the history")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(child(args.child[0], int(args.child[1]), args.seed)))
+        return
+
+    history = None if args.no_history else args.history
+    last = _last_runs(history)
+    commit = _commit()
+    print(
+        f"{'case':>10} {'rows':>9} {'seconds':>8} {'rows/s':>10} {'peak MB':>8} "
+        f"{'precision':>9} {'recall':>7} {'vs last':>8}"
+    )
+    for rows in args.rows:
+        for case in args.cases:
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", case, str(rows), "--seed", str(args.seed)],
+                capture_output=True, text=True, check=True,
+            )
+            run = json.loads(out.stdout.strip().splitlines()[-1])
+            previous = last.get((case, rows, args.seed))
+            change = f"{run['rows_per_s'] / previous['rows_per_s'] - 1:>+7.0%}" if previous else "-"
+            quality = (
+                f"{run['precision']:>9.3f} {run['recall']:>7.3f}" if "precision" in run else f"{'-':>9} {'-':>7}"
+            )
+            print(
+                f"{case:>10} {rows:>9} {run['seconds']:>8.2f} {run['rows_per_s']:>10.0f} {run['peak_mb']:>8.1f} "
+                f"{quality} {change:>8}"
+            )
+            if history is not None:
+                entry = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit, "case": case,
+                         "rows": rows, "seed": args.seed, **run}
+                with history.open("a") as f:
+                    f.write(json.dumps(entry) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Time-series engine benchmark over :func:`synthetic.make_entries` ledger entries.
+
+    python benchmarks/bench_timeseries.py --entries 200000 --years 5 --batch 5000
+
+Feeds the entries to a TimeSeriesEngine in batches (as syncs would), with
+a share of them re-sent as updates, then times every granularity over the
+whole span: the rollup query cold (after a new batch) and cached, against
+grouping the raw entries in Python. Checks the two agree to the cent.
+"""
+import argparse
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from synthetic import AS_OF, make_entries  # noqa: E402
+from timeseries import GRANULARITIES, TimeSeriesEngine, day_number  # noqa: E402
+
+
+def naive(entries: dict[str, dict], granularity: str) -> dict[int, list[int]]:
+    sums = defaultdict(lambda: [0, 0, 0])
+    for entry in entries.values():
+        day = date.fromisoformat(entry["date"])
+        months = (day.year - 1970) * 12 + day.month - 1
+        key = {
+            "day": day_number(day),
+            "week": (day_number(day) + 3) // 7,
+            "month": months,
+            "quarter": months // 3,
+            "year": months // 12,
+        }[granularity]
+        row = sums[key]
+        row[0] += round(entry.get("revenue", 0) * 100)
+        row[1] += round(entry.get("operating_expenses", 0) * 100)
+        row[2] += entry.get("sales", 0)
+    return sums
+
+
+def main(args) -> None:
+    entries = make_entries(args.entries, args.years)
+    rng = random.Random(2)
+    updates = [dict(e, revenue=round(e["revenue"] * 1.1, 2)) for e in rng.sample(entries, len(entries) // 20) if "revenue" in e]
+
+    engine = TimeSeriesEngine()
+    start = time.perf_counter()
+    for i in range(0, len(entries), args.batch):
+        engine.add(entries[i:i + args.batch])
+    engine.add(updates)
+    ingest = time.perf_counter() - start
+    print(f"ingest          {len(entries)} entries + {len(updates)} updates in {ingest:.2f}s "
+          f"({(len(entries) + len(updates)) / ingest:,.0f} entries/s, batches of {args.batch})")
+
+    latest = {e["id"]: e for e in entries}
+    latest.update((e["id"], e) for e in updates)
+    first, last = date(AS_OF.year - args.years + 1, 1, 1), date(AS_OF.year, 12, 31)
+
+    print(f"{'granularity':>12} {'buckets':>8} {'naive ms':>10} {'cold ms':>9} {'cached ms':>10}  agree")
+    for granularity in GRANULARITIES:
+        t0 = time.perf_counter()
+        expected = naive(latest, granularity)
+        naive_ms = (time.perf_counter() - t0) * 1000
+
+        engine._results.clear()
+        t0 = time.perf_counter()
+        series = engine.series(granularity, first, last)
+        engine.rolling(granularity, first, last, 3)
+        engine.prior_year(granularity, first, last)
+        cold_ms = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        engine.series(granularity, first, last)
+        engine.rolling(granularity, first, last, 3)
+        engine.prior_year(granularity, first, last)
+        cached_ms = (time.perf_counter() - t0) * 1000
+
+        keys = engine.keys(granularity, first, last).tolist()
+        got = np.column_stack([
+            np.rint(series.columns["revenue"] * 100), np.rint(series.columns["operating_expenses"] * 100), series.columns["sales"],
+        ]).astype(np.int64)
+        agree = all(expected.get(k, [0, 0, 0]) == row for k, row in zip(keys, got.tolist()))
+        print(f"{granularity:>12} {len(series):>8} {naive_ms:>10.1f} {cold_ms:>9.2f} {cached_ms:>10.4f}  {agree}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=200_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=5_000)
+    main(parser.parse_args())
@@ -0,0 +1,329 @@
+"""Seeded synthetic invoices and payments at production scale.
+
+    python benchmarks/synthetic.py --rows 1000000 --seed 7 --out /tmp/ledgify-1m
+
+Writes ``invoices.jsonl``, ``transactions.jsonl`` and ``truth.jsonl`` (the
+``[transaction_id, invoice_id]`` pairs a perfect reconciler would report)
+without holding the corpus in memory, so 10M rows is fine. Other benchmarks
+import :func:`make_corpus` instead; :func:`make_entries`, :func:`make_periods`
+and :func:`make_graph` build the ledger entries, financial periods and match
+graphs the time-series, financials and assignment benchmarks need.
+
+``rows`` is the number of invoices. They belong to about ``rows / 10``
+customers with a skewed share of invoices each and one currency each
+(mostly USD, then EUR, GBP and CAD). A fifth of customers bill fixed price
+points, so the same amount recurs across invoices and customers. Each
+invoice is then:
+
+``paid``     one payment of the exact amount
+``fee``      one payment short by a bank or wire fee
+``partial``  two or three payments that add up to it
+``bulk``     paid together with other open invoices of the same customer
+             by one payment
+``unpaid``   no payment
+
+Payer names are noisy versions of the customer name ("Acme Corp" becomes
+"ACME CORPORATION LLC", "ACME CORP", "PAYMENT FROM ACME CORP", "Acme Crop",
+a truncated bank field, ...). Payment references quote the invoice number
+about a third of the time. About one payment in ten settles nothing listed:
+other income from unknown payers, or a known customer paying something else.
+
+Generation runs in chunks of ``CHUNK`` invoices, each from its own seeded
+stream; a chunk's payments only settle that chunk's invoices, so the corpus
+for a seed is the same however it is consumed.
+"""
+import argparse
+import random
+import sys
+from collections import Counter
+from collections.abc import Iterator
+from datetime import date, timedelta
+from pathlib import Path
+
+import orjson
+
+CHUNK = 50_000
+AS_OF = date(2026, 3, 1)  # "today" for due dates and days overdue
+
+CURRENCIES = {"USD": 0.62, "EUR": 0.18, "GBP": 0.12, "CAD": 0.08}
+OUTCOMES = {"paid": 0.52, "fee": 0.08, "partial": 0.07, "bulk": 0.06, "unpaid": 0.27}
+NOISE_PAYMENTS = 0.1  # unrelated payments, as a share of invoices
+PRICE_POINTS = [49.0, 99.0, 149.0, 199.0, 299.0, 499.0, 999.0, 1200.0, 2500.0, 5000.0]
+
+_STEMS = [
+    "acme", "globex", "initech", "umbrella", "stark", "wayne", "wonka", "tyrell", "cyberdyne", "hooli",
+    "vandelay", "soylent", "oscorp", "massive", "dynamic", "pied piper", "blue sun", "north star",
+    "river", "summit", "apex", "vertex", "nimbus", "quantum", "harbor", "cedar", "granite", "silver",
+    "redwood", "atlas", "beacon", "orion", "meridian", "pioneer", "evergreen", "horizon", "lakeside",
+    "keystone", "liberty", "sterling", "crescent", "falcon", "ironwood", "juniper", "maple", "oakridge",
+    "pinnacle", "riverside", "sapphire", "trident", "unity", "vanguard", "westfield", "zenith",
+]
+_TRADES = [
+    "", "", "health", "logistics", "labs", "systems", "foods", "media", "energy", "capital", "consulting",
+    "software", "robotics", "builders", "medical", "retail", "analytics", "design", "freight", "supply",
+    "networks", "partners", "holdings", "industries", "solutions", "studios", "motors", "pharma",
+]
+_LEGAL = ["Inc", "LLC", "Ltd", "Corp", "Corporation", "Co", "GmbH", "PLC", ""]
+_LONG_LEGAL = {"Inc": "INCORPORATED", "Corp": "CORPORATION", "Co": "COMPANY", "Ltd": "LIMITED"}
+_PAYMENT_PREFIXES = ["PAYMENT FROM ", "ACH CREDIT ", "WIRE IN ", "TRANSFER "]
+_BANK_FIELD = 18  # characters some banks keep of the payer name
+
+
+def _customers(rows: int, seed: int) -> list[tuple[str, str, str, float | None]]:
+    """(name, email, currency, price point or None) per customer."""
+    rng = random.Random(seed)
+    currencies, weights = list(CURRENCIES), list(CURRENCIES.values())
+    customers = []
+    for k in range(max(20, rows // 10)):
+        words = [rng.choice(_STEMS).title(), rng.choice(_TRADES).title()]
+        if rng.random() < 0.3:
+            words.insert(1, rng.choice(_STEMS).title())
+        legal = rng.choice(_LEGAL)
+        name = " ".join(w for w in words + [legal] if w)
+        email = f"ap{k}@{words[0].lower().replace(' ', '')}.example.com"
+        price = rng.choice(PRICE_POINTS) if rng.random() < 0.2 else None
+        customers.append((name, email, rng.choices(currencies, weights)[0], price))
+    return customers
+
+
+def _typo(name: str, rng: random.Random) -> str:
+    k = rng.randrange(max(1, len(name) - 1))
+    edit = rng.randrange(3)
+    if edit == 0:
+        return name[:k] + name[k + 1] + name[k] + name[k + 2:]  # swap
+    if edit == 1:
+        return name[:k] + name[k + 1:]  # drop
+    return name[:k] + name[k] + name[k:]  # double
+
+
+def payer_variant(name: str, rng: random.Random) -> str:
+    """How a bank statement might spell ``name``."""
+    pick = rng.random()
+    if pick < 0.35:
+        return name
+    words = name.split()
+    if pick < 0.5:
+        legal = _LONG_LEGAL.get(words[-1], words[-1]) if words[-1] in _LEGAL else ""
+        base = words[:-1] if legal else words
+        return " ".join(w for w in [*base, legal, "LLC" if legal != "LLC" else ""] if w).upper()
+    if pick < 0.65:
+        return " ".join(words[:-1] if len(words) > 1 and words[-1] in _LEGAL else words)
+    if pick < 0.75:
+        return "".join(c for c in name.upper() if c.isalnum() or c == " ")[:_BANK_FIELD].strip()
+    if pick < 0.87:
+        return _typo(name, rng)
+    if pick < 0.95:
+        return rng.choice(_PAYMENT_PREFIXES) + name.upper()
+    return words[0].upper()
+
+
+def _amount(rng: random.Random, price: float | None) -> float:
+    if price is not None:
+        return price * rng.choice((1, 1, 1, 2, 3))
+    return round(min(250_000.0, max(5.0, rng.lognormvariate(7.5, 1.2))), 2)
+
+
+def _reference(rng: random.Random, number: str) -> str:
+    if rng.random() < 0.35:
+        return rng.choice((number, f"Payment {number}", f"{number.replace('-', '')} REMIT"))
+    return rng.choice(("WIRE-", "ACH-", "TRF ")) + str(rng.randrange(10**8))
+
+
+def generate(rows: int, seed: int = 7, chunk: int = CHUNK) -> Iterator[tuple[list[dict], list[dict], list[tuple]]]:
+    """Yield ``(invoices, transactions, truth)`` per chunk of ``chunk`` invoices."""
+    customers = _customers(rows, seed)
+    outcomes, weights = list(OUTCOMES), list(OUTCOMES.values())
+    txn_count = 0
+    for start in range(0, rows, chunk):
+        rng = random.Random(f"{seed}:{start}")
+        invoices, payments = [], []  # payments: (payer, amount, currency, date, reference, invoice ids)
+        open_by_customer: dict[int, list[dict]] = {}
+        for k in range(start, min(start + chunk, rows)):
+            c = int(len(customers) * rng.random() ** 1.5)  # the largest customers get ~10x the average
+            name, email, currency, price = customers[c]
+            due = AS_OF - timedelta(days=rng.randrange(1, 120))
+            inv = {
+                "id": f"inv_{k:08d}",
+                "invoice_number": f"INV-{k:08d}",
+                "customer_name": name,
+                "customer_email": email,
+                "amount": _amount(rng, price),
+                "currency": currency,
+                "due_date": due.isoformat(),
+                "days_overdue": (AS_OF - due).days,
+                "status": "overdue",
+            }
+            invoices.append(inv)
+
+            outcome = rng.choices(outcomes, weights)[0]
+            paid_on = (due + timedelta(days=rng.randrange(-10, 30))).isoformat()
+            ref = _reference(rng, inv["invoice_number"])
+            if outcome == "paid":
+                payments.append((payer_variant(name, rng), inv["amount"], currency, paid_on, ref, [inv["id"]]))
+            elif outcome == "fee":
+                fee = rng.choice((15.0, 25.0, 35.0)) if rng.random() < 0.5 else inv["amount"] * rng.uniform(0.002, 0.02)
+                amount = round(max(0.01, inv["amount"] - fee), 2)
+                payments.append((payer_variant(name, rng), amount, currency, paid_on, ref, [inv["id"]]))
+            elif outcome == "partial":
+                cents = round(inv["amount"] * 100)
+                cuts = sorted(rng.sample(range(1, cents), min(cents - 1, rng.choice((1, 2))))) if cents > 2 else []
+                for lo, hi in zip([0, *cuts], [*cuts, cents]):
+                    payments.append((payer_variant(name, rng), hi / 100 - lo / 100, currency, paid_on, ref, [inv["id"]]))
+            elif outcome == "bulk":
+                group = open_by_customer.setdefault(c, [])
+                group.append(inv)
+                if len(group) >= rng.choice((2, 3)):
+                    total = round(sum(i["amount"] for i in group), 2)
+                    ids = [i["id"] for i in group]
+                    payments.append((payer_variant(name, rng), total, currency, paid_on, ref, ids))
+                    del open_by_customer[c]
+        # Bulk invoices whose customer had no second one in this chunk are paid alone.
+        for group in open_by_customer.values():
+            for inv in group:
+                name = inv["customer_name"]
+                ref = _reference(rng, inv["invoice_number"])
+                payments.append((payer_variant(name, rng), inv["amount"], inv["currency"], inv["due_date"], ref, [inv["id"]]))
+
+        for _ in range(round(len(invoices) * NOISE_PAYMENTS)):
+            if rng.random() < 0.5:
+                name, _, currency, price = customers[rng.randrange(len(customers))]
+                payer = payer_variant(name, rng)
+            else:
+                payer = f"{rng.choice(_STEMS).title()} {rng.choice(('Refund', 'Payroll', 'Interest', 'Transfer'))}"
+                currency, price = rng.choice(list(CURRENCIES)), None
+            paid_on = (AS_OF - timedelta(days=rng.randrange(0, 150))).isoformat()
+            payments.append((payer, _amount(rng, price), currency, paid_on, _reference(rng, "INV-X"), []))
+
+        rng.shuffle(payments)
+        transactions, truth = [], []
+        for payer, amount, currency, paid_on, reference, settles in payments:
+            txn_id = f"txn_{txn_count:08d}"
+            txn_count += 1
+            transactions.append({
+                "id": txn_id,
+                "payer_name": payer,
+                "amount": round(amount, 2),
+                "currency": currency,
+                "date": paid_on,
+                "reference": reference,
+            })
+            truth.extend((txn_id, inv_id) for inv_id in settles)
+        yield invoices, transactions, truth
+
+
+def make_corpus(rows: int, seed: int = 7) -> tuple[list[dict], list[dict], set[tuple[str, str]]]:
+    """The whole corpus in memory: invoices, transactions and the true pairs."""
+    invoices, transactions, truth = [], [], set()
+    for chunk_invoices, chunk_transactions, chunk_truth in generate(rows, seed):
+        invoices += chunk_invoices
+        transactions += chunk_transactions
+        truth.update(chunk_truth)
+    return invoices, transactions, truth
+
+
+def make_entries(count: int, years: int, seed: int = 11) -> list[dict]:
+    """Dated ledger entries spread over the last ``years`` calendar years.
+
+    About 70% are :func:`make_corpus` invoices booked as revenue, re-dated
+    across the span; the rest are bills booked as operating expenses.
+    """
+    rng = random.Random(seed)
+    first = date(AS_OF.year - years + 1, 1, 1)
+    span = (date(AS_OF.year, 12, 31) - first).days + 1
+    invoices = make_corpus(round(count * 0.7), seed)[0][:count] if count else []
+    entries = [
+        {"id": inv["id"], "date": (first + timedelta(days=rng.randrange(span))).isoformat(),
+         "revenue": inv["amount"], "sales": 1}
+        for inv in invoices
+    ]
+    entries += [
+        {"id": f"bill_{k:08d}", "date": (first + timedelta(days=rng.randrange(span))).isoformat(),
+         "operating_expenses": round(rng.uniform(20, 2000), 2)}
+        for k in range(count - len(entries))
+    ]
+    rng.shuffle(entries)
+    return entries
+
+
+def make_periods(size: int, seed: int = 5) -> list[dict]:
+    """``size`` financial periods shaped like the demo timeseries rows."""
+    rng = random.Random(seed)
+    periods = []
+    for i in range(size):
+        revenue = rng.randint(3_000, 12_000)
+        cogs = int(revenue * rng.uniform(0.35, 0.5))
+        opex = int(revenue * rng.uniform(0.1, 0.2))
+        periods.append({
+            "month": f"d{i}",
+            "revenue": revenue,
+            "expenses": cogs + opex,
+            "profit": revenue - cogs - opex,
+            "sales": rng.randint(5, 40),
+            "cogs": cogs,
+            "operating_expenses": opex,
+        })
+    return periods
+
+
+def make_graph(size: int, degree: int, layout: str, seed: int = 11):
+    """A random ``size`` x ``size`` match graph: ``(txn_idx, inv_idx, confidence)``
+    with about ``degree`` edges per transaction and confidences in (0.6, 1].
+
+    "banded" links each transaction to invoices of nearby index, which chains
+    everything into one large component the way amount windows do; "random"
+    links anywhere.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    txn_idx = np.repeat(np.arange(size), degree)
+    if layout == "banded":
+        inv_idx = np.clip(txn_idx + rng.integers(-20, 21, len(txn_idx)), 0, size - 1)
+    else:
+        inv_idx = rng.integers(0, size, len(txn_idx))
+    key = np.unique(txn_idx * size + inv_idx)
+    txn_idx, inv_idx = key // size, key % size
+    return txn_idx, inv_idx, rng.uniform(0.61, 1.0, len(key))
+
+
+def precision_recall(pairs: set[tuple[str, str]], truth: set[tuple[str, str]]) -> tuple[float, float]:
+    """Share of reported (transaction id, invoice id) pairs that are true, and
+    of true pairs that were reported."""
+    hits = len(pairs & truth)
+    return hits / len(pairs) if pairs else 1.0, hits / len(truth) if truth else 1.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", type=Path, required=True, help="directory for the .jsonl files")
+    args = parser.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    counts, currencies, amounts = Counter(), Counter(), Counter()
+    files = {name: open(args.out / f"{name}.jsonl", "wb") for name in ("invoices", "transactions", "truth")}
+    try:
+        for invoices, transactions, truth in generate(args.rows, args.seed):
+            for name, records in (("invoices", invoices), ("transactions", transactions), ("truth", truth)):
+                files[name].write(b"".join(orjson.dumps(r) + b"\n" for r in records))
+                counts[name] += len(records)
+            currencies.update(inv["currency"] for inv in invoices)
+            amounts.update(inv["amount"] for inv in invoices)
+            print(f"\r{counts['invoices']:,} / {args.rows:,} invoices", end="", file=sys.stderr)
+    finally:
+        for f in files.values():
+            f.close()
+    print(file=sys.stderr)
+
+    repeated = sum(n for n in amounts.values() if n > 1)
+    shares = ", ".join(f"{c} {n / counts['invoices']:.0%}" for c, n in currencies.most_common())
+    print(f"invoices      {counts['invoices']:>12,}")
+    print(f"transactions  {counts['transactions']:>12,}")
+    print(f"true pairs    {counts['truth']:>12,}")
+    print(f"currencies    {shares}")
+    print(f"shared amount {repeated / counts['invoices']:>12.1%} of invoices")
+
+
+if __name__ == "__main__":
+    main()
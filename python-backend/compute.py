@@ -0,0 +1,178 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from records import Invoice, Transaction, invoice_records, transaction_records
+from reconciliation import ReconciliationResult, fuzzy_reconcile, pack_inputs, reconcile_packed, sharded_reconcile
+
+COMPUTE_THREADS = int(os.getenv("COMPUTE_THREADS", "4"))
+COMPUTE_PROCESSES = int(os.getenv("COMPUTE_PROCESSES", str(min(4, os.cpu_count() or 1))))
+# Jobs queued or running per pool before new ones are turned away (429).
+COMPUTE_MAX_PENDING = int(os.getenv("COMPUTE_MAX_PENDING", "16"))
+# Input sizes (records) from which work leaves the event loop for a thread,
+# and from which a reconciliation is sent to a worker process.
+COMPUTE_OFFLOAD_THRESHOLD = int(os.getenv("COMPUTE_OFFLOAD_THRESHOLD", "2000"))
+COMPUTE_PROCESS_THRESHOLD = int(os.getenv("COMPUTE_PROCESS_THRESHOLD", "50000"))
+# From this size a reconciliation is split by currency and amount band and
+# the shards spread over the process pool (more shards than processes, so
+# the uneven bands balance out).
+COMPUTE_SHARD_THRESHOLD = int(os.getenv("COMPUTE_SHARD_THRESHOLD", "500000"))
+COMPUTE_SHARDS = int(os.getenv("COMPUTE_SHARDS", str(2 * COMPUTE_PROCESSES)))
+
+
+class ComputeSaturated(Exception):
+    """A compute pool already has its maximum number of pending jobs."""
+
+
+def _process_context():
+    # forkserver avoids forking a process that has threads running; the
+    # server imports the matcher once and every worker forks from it.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["reconciliation"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class _Pool:
+    """An executor, created on first use, with a cap on pending jobs."""
+
+    def __init__(self, name: str, factory: Callable[[], Executor], max_pending: int):
+        self.name = name
+        self.max_pending = max_pending
+        self._factory = factory
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.counters = {"submitted": 0, "rejected": 0}
+
+    def _reserve(self, jobs: int) -> Executor:
+        with self._lock:
+            if self.pending + jobs > self.max_pending:
+                self.counters["rejected"] += 1
+                raise ComputeSaturated(f"Compute {self.name} pool is busy ({self.pending} jobs pending), retry shortly")
+            if self._executor is None:
+                self._executor = self._factory()
+            self.pending += jobs
+            self.counters["submitted"] += jobs
+            return self._executor
+
+    def _start(self, executor: Executor, fn, *args, **kwargs) -> Future:
+        try:
+            future = executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        return self._start(self._reserve(1), fn, *args, **kwargs)
+
+    def map(self, fn, items):
+        """Like :meth:`Executor.map` over one iterable; all the jobs are
+        admitted together or not at all."""
+        items = list(items)
+        executor = self._reserve(len(items))
+        futures = []
+        for k, item in enumerate(items):
+            try:
+                futures.append(self._start(executor, fn, item))
+            except BaseException:
+                for _ in items[k + 1:]:
+                    self._done(None)
+                raise
+        return self._results(futures)
+
+    @staticmethod
+    def _results(futures: list[Future]):
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _done(self, _) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    def stats(self) -> dict:
+        return {"pending": self.pending, "max_pending": self.max_pending, **self.counters}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ComputeExecutor:
+    """Keeps CPU-bound work from stalling the event loop.
+
+    :meth:`run` calls small jobs inline and hands anything at or above
+    ``offload_threshold`` records to a thread pool, where rapidfuzz and
+    NumPy release the GIL for most of the work. :meth:`reconcile` sends
+    reconciliations of ``process_threshold`` records or more to a worker
+    process as :func:`~reconciliation.pack_inputs` columns, and only the
+    match indexes come back; from ``shard_threshold`` records it runs
+    :func:`~reconciliation.sharded_reconcile` over ``shards`` worker jobs.
+    Each pool admits ``max_pending`` jobs; past that
+    :class:`ComputeSaturated` is raised, which the API turns into a 429.
+    """
+
+    def __init__(
+        self,
+        threads: int = COMPUTE_THREADS,
+        processes: int = COMPUTE_PROCESSES,
+        max_pending: int = COMPUTE_MAX_PENDING,
+        offload_threshold: int = COMPUTE_OFFLOAD_THRESHOLD,
+        process_threshold: int = COMPUTE_PROCESS_THRESHOLD,
+        shard_threshold: int = COMPUTE_SHARD_THRESHOLD,
+        shards: int = COMPUTE_SHARDS,
+    ):
+        self.offload_threshold = offload_threshold
+        self.process_threshold = process_threshold
+        self.shard_threshold = shard_threshold
+        self.shards = max(1, min(shards, max_pending))
+        self.threads = _Pool(
+            "thread", lambda: ThreadPoolExecutor(threads, thread_name_prefix="compute"), max_pending
+        )
+        self.processes = _Pool(
+            "process", lambda: ProcessPoolExecutor(processes, mp_context=_process_context()), max_pending
+        )
+
+    async def run(self, fn, *args, size: int | None = None, **kwargs):
+        """``fn(*args, **kwargs)``: inline below ``offload_threshold``
+        records, otherwise in the thread pool. ``size=None`` always offloads."""
+        if size is not None and size < self.offload_threshold:
+            return fn(*args, **kwargs)
+        return await asyncio.wrap_future(self.threads.submit(fn, *args, **kwargs))
+
+    def reconcile(
+        self, invoices: list[Invoice | dict], transactions: list[Transaction | dict], **options
+    ) -> ReconciliationResult:
+        """:func:`~reconciliation.fuzzy_reconcile`, in a worker process for
+        large inputs. Blocks until done, so call it from :meth:`run`."""
+        invoices, transactions = invoice_records(invoices), transaction_records(transactions)
+        size = len(invoices) + len(transactions)
+        if size < self.process_threshold:
+            return fuzzy_reconcile(invoices, transactions, **options)
+        if size >= self.shard_threshold:
+            return sharded_reconcile(invoices, transactions, self.shards, executor=self.processes, **options)
+        packed = pack_inputs(invoices, transactions)
+        txn_idx, inv_idx, confidence, flags, groups = self.processes.submit(reconcile_packed, packed, **options).result()
+        return ReconciliationResult(invoices, transactions, txn_idx, inv_idx, confidence, flags, groups)
+
+    def stats(self) -> dict:
+        return {"threads": self.threads.stats(), "processes": self.processes.stats()}
+
+    def shutdown(self) -> None:
+        self.threads.shutdown()
+        self.processes.shutdown()
+
+
+compute = ComputeExecutor()
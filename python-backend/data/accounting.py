@@ -1,85 +1,284 @@
+import asyncio
+import json
 import os
-import httpx
-from demo_data import is_demo_mode, get_demo_invoices, get_demo_invoice_by_id, get_demo_monthly_summary
+import sqlite3
+import time
+from collections.abc import AsyncIterator
+from datetime import date, datetime, timezone
+from pathlib import Path
 
+from data.cache import index_by_id, unified_cache
+from data.client import GET_TIMEOUT, collect, get_client, paginate
+from demo_data import is_demo_mode, get_demo_invoices, get_demo_invoice_by_id, get_demo_monthly_summary, get_demo_timeseries
+from timeseries import TimeSeriesEngine
 
-UNIFIED_API_KEY = os.getenv("UNIFIED_API_KEY", "")
-UNIFIED_BASE_URL = "https://api.unified.to"
+MONTHLY_STATS_PATH = Path(os.getenv("MONTHLY_STATS_PATH", Path(__file__).parent.parent / "monthly_stats.db"))
+LOOKUP_CONCURRENCY = int(os.getenv("UNIFIED_LOOKUP_CONCURRENCY", "8"))  # single-invoice GETs in flight per batch
 
 
-async def get_overdue_invoices(connection_id: str, min_days_overdue: int = 0) -> list[dict]:
+async def iter_overdue_invoices(connection_id: str, min_days_overdue: int = 0) -> AsyncIterator[dict]:
     if is_demo_mode(connection_id):
-        invoices = get_demo_invoices()
-        return [inv for inv in invoices if inv["days_overdue"] >= min_days_overdue]
-
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{UNIFIED_BASE_URL}/accounting/{connection_id}/invoice",
-            headers={"Authorization": f"Bearer {UNIFIED_API_KEY}"},
-            params={"status": "overdue"},
-            timeout=30,
-        )
-        resp.raise_for_status()
-        invoices = resp.json()
-
-    from datetime import date
+        for inv in get_demo_invoices():
+            if inv["days_overdue"] >= min_days_overdue:
+                yield inv
+        return
+
     today = date.today()
-    results = []
-    for inv in invoices:
+    async for inv in paginate(f"/accounting/{connection_id}/invoice", {"status": "overdue"}):
         due = inv.get("due_date", "")
         if due:
             days = (today - date.fromisoformat(due[:10])).days
             if days >= min_days_overdue:
                 inv["days_overdue"] = days
-                results.append(inv)
-    return results
+                yield inv
+
+
+async def get_overdue_invoices(connection_id: str, min_days_overdue: int = 0) -> list[dict]:
+    if is_demo_mode(connection_id):
+        return await collect(iter_overdue_invoices(connection_id, min_days_overdue))
+
+    # Cache the full overdue list once per connection; the threshold is
+    # applied on the way out so every caller shares the same entry.
+    invoices = await unified_cache.get(
+        (connection_id, "overdue_invoices"),
+        lambda: collect(iter_overdue_invoices(connection_id)),
+    )
+    if min_days_overdue <= 0:
+        return invoices  # the cached list itself, so callers can compare by identity
+    return [inv for inv in invoices if inv["days_overdue"] >= min_days_overdue]
 
 
 async def get_invoice_by_id(connection_id: str, invoice_id: str) -> dict | None:
     if is_demo_mode(connection_id):
         return get_demo_invoice_by_id(invoice_id)
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{UNIFIED_BASE_URL}/accounting/{connection_id}/invoice/{invoice_id}",
-            headers={"Authorization": f"Bearer {UNIFIED_API_KEY}"},
-            timeout=30,
-        )
-        if resp.status_code == 404:
-            return None
-        resp.raise_for_status()
-        return resp.json()
+    # Most follow-ups are for an invoice the overdue list just returned.
+    overdue = unified_cache.peek((connection_id, "overdue_invoices"))
+    if overdue is not None:
+        invoice = index_by_id(overdue).get(invoice_id)
+        if invoice is not None:
+            return invoice
+
+    return await unified_cache.get(
+        (connection_id, "invoice", invoice_id),
+        lambda: _fetch_invoice(connection_id, invoice_id),
+    )
+
+
+async def get_invoices_by_id(connection_id: str, invoice_ids: list[str]) -> list[dict | None]:
+    """:func:`get_invoice_by_id` for many ids, in order.
+
+    Ids on the overdue list are read from it; the rest are fetched
+    ``LOOKUP_CONCURRENCY`` at a time.
+    """
+    if is_demo_mode(connection_id):
+        return [get_demo_invoice_by_id(invoice_id) for invoice_id in invoice_ids]
+
+    overdue = index_by_id(await get_overdue_invoices(connection_id))
+    slots = asyncio.Semaphore(LOOKUP_CONCURRENCY)
+
+    async def lookup(invoice_id: str) -> dict | None:
+        invoice = overdue.get(invoice_id)
+        if invoice is not None:
+            return invoice
+        async with slots:
+            return await get_invoice_by_id(connection_id, invoice_id)
+
+    return await asyncio.gather(*(lookup(invoice_id) for invoice_id in invoice_ids))
+
+
+async def _fetch_invoice(connection_id: str, invoice_id: str) -> dict | None:
+    resp = await get_client().get(
+        f"/accounting/{connection_id}/invoice/{invoice_id}",
+        timeout=GET_TIMEOUT,
+    )
+    if resp.status_code == 404:
+        return None
+    resp.raise_for_status()
+    return resp.json()
 
 
 async def get_monthly_stats(connection_id: str, month: str) -> dict:
     if is_demo_mode(connection_id):
         return get_demo_monthly_summary(month)
+    return await unified_cache.get(
+        (connection_id, "monthly_stats", month),
+        lambda: _fetch_monthly_stats(connection_id, month),
+    )
+
+
+# ``estimated`` counts paid invoices without a ``paid_at`` that may belong to the month.
+_TOTALS = ("collected", "outstanding", "invoice_count", "days_total", "days_count", "estimated")
+
+
+def _previous_month(month: str) -> str:
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year - 1}-12" if mon == 1 else f"{year}-{mon - 1:02d}"
+
+
+class ClosedMonthStore:
+    """Month totals per connection for months that are over.
+
+    A closed month's figures no longer change (collections are dated by
+    payment, outstanding is what was still unpaid at month end), so they
+    are computed once and kept in memory and in SQLite across restarts.
+    Months that rely on an estimated payment date are not stored.
+    """
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{UNIFIED_BASE_URL}/accounting/{connection_id}/invoice",
-            headers={"Authorization": f"Bearer {UNIFIED_API_KEY}"},
-            params={"updated_gte": f"{month}-01T00:00:00Z"},
-            timeout=30,
-        )
-        resp.raise_for_status()
-        invoices = resp.json()
-
-    collected = sum(inv.get("amount", 0) for inv in invoices if inv.get("status") == "paid")
-    outstanding = sum(inv.get("amount", 0) for inv in invoices if inv.get("status") != "paid")
-    days_list = [inv.get("days_to_pay", 0) for inv in invoices if inv.get("days_to_pay")]
-    avg_days = int(sum(days_list) / len(days_list)) if days_list else 0
+    def __init__(self, path: Path | str = MONTHLY_STATS_PATH):
+        self.path = Path(path)
+        self._totals: dict[tuple[str, str], dict] = {}
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS month_totals (connection_id TEXT NOT NULL, month TEXT NOT NULL, "
+                "totals TEXT NOT NULL, computed_at REAL NOT NULL, PRIMARY KEY (connection_id, month))"
+            )
+
+    def get(self, connection_id: str, month: str) -> dict | None:
+        totals = self._totals.get((connection_id, month))
+        if totals is None:
+            with sqlite3.connect(self.path) as conn:
+                row = conn.execute(
+                    "SELECT totals FROM month_totals WHERE connection_id = ? AND month = ?", (connection_id, month)
+                ).fetchone()
+            if row is not None:
+                totals = self._totals[(connection_id, month)] = json.loads(row[0])
+        return totals
+
+    def put(self, connection_id: str, month: str, totals: dict) -> None:
+        self._totals[(connection_id, month)] = totals
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO month_totals VALUES (?, ?, ?, ?)",
+                (connection_id, month, json.dumps(totals), time.time()),
+            )
+
+
+_closed_months: ClosedMonthStore | None = None
+
+
+def get_closed_months() -> ClosedMonthStore:
+    global _closed_months
+    if _closed_months is None:
+        _closed_months = ClosedMonthStore()
+    return _closed_months
+
+
+async def _accumulate_months(connection_id: str, months: list[str]) -> dict[str, dict]:
+    """Totals for each of ``months`` from one paged fetch.
+
+    An invoice counts towards the month it was issued in (count, and
+    outstanding if it wasn't paid within that month) and the month it was
+    paid in (collected, days to pay). Both happen after the earliest
+    month starts, so ``updated_gte`` that month covers them. A paid invoice
+    without ``paid_at`` is taken as paid when last updated; every month
+    between issue and that update is marked ``estimated``.
+    """
+    totals = {month: dict.fromkeys(_TOTALS, 0) for month in months}
+    async for inv in paginate(f"/accounting/{connection_id}/invoice", {"updated_gte": f"{min(months)}-01T00:00:00Z"}):
+        amount = inv.get("amount", 0)
+        issued = (inv.get("posted_at") or inv.get("created_at") or "")[:7]
+        paid = None
+        if inv.get("status") == "paid":
+            paid = (inv.get("paid_at") or inv.get("updated_at") or "")[:7]
+            if not inv.get("paid_at"):
+                for m, month in totals.items():
+                    if issued <= m <= paid:
+                        month["estimated"] += 1
+        if issued in totals:
+            month = totals[issued]
+            month["invoice_count"] += 1
+            if paid != issued:
+                month["outstanding"] += amount
+        if paid in totals:
+            month = totals[paid]
+            month["collected"] += amount
+            if inv.get("days_to_pay"):
+                month["days_total"] += inv["days_to_pay"]
+                month["days_count"] += 1
+    return totals
+
+
+def _change(current: float, previous: float) -> float:
+    return round(((current - previous) / previous) * 100, 1) if previous else 0
+
+
+async def _fetch_monthly_stats(connection_id: str, month: str) -> dict:
+    previous = _previous_month(month)
+    current_month = date.today().strftime("%Y-%m")
+    store = get_closed_months()
+    totals = {m: store.get(connection_id, m) if m < current_month else None for m in (month, previous)}
+    missing = [m for m, t in totals.items() if t is None]
+    if missing:
+        for m, fresh in (await _accumulate_months(connection_id, missing)).items():
+            totals[m] = fresh
+            if m < current_month and not fresh["estimated"]:
+                store.put(connection_id, m, fresh)  # only months whose payment dates are all known
+
+    this, last = totals[month], totals[previous]
+    avg_days = int(this["days_total"] / this["days_count"]) if this["days_count"] else 0
+    last_avg_days = int(last["days_total"] / last["days_count"]) if last["days_count"] else 0
 
     return {
         "month": month,
-        "collected": collected,
-        "outstanding": outstanding,
-        "invoice_count": len(invoices),
+        "collected": this["collected"],
+        "outstanding": this["outstanding"],
+        "invoice_count": this["invoice_count"],
         "avg_days_to_pay": avg_days,
         "vs_last_month": {
-            "collected_change": 0,
-            "outstanding_change": 0,
-            "invoice_count_change": 0,
-            "avg_days_change": 0,
+            "collected_change": _change(this["collected"], last["collected"]),
+            "outstanding_change": _change(this["outstanding"], last["outstanding"]),
+            "invoice_count_change": this["invoice_count"] - last["invoice_count"],
+            "avg_days_change": avg_days - last_avg_days if last["days_count"] else 0,
         },
     }
+
+
+async def iter_ledger_entries(connection_id: str, updated_since: str | None = None) -> AsyncIterator[dict]:
+    """Dated ledger entries: invoices as revenue on their posting date, bills
+    as operating expenses. Voided documents come through as zero entries so
+    they cancel what was recorded for them earlier."""
+    params = {"updated_gte": updated_since} if updated_since else {}
+    async for inv in paginate(f"/accounting/{connection_id}/invoice", params):
+        posted = inv.get("posted_at") or inv.get("created_at")
+        if not posted:
+            continue
+        live = inv.get("status") not in ("void", "voided", "deleted", "draft")
+        yield {
+            "id": f"invoice:{inv['id']}",
+            "date": posted,
+            "revenue": inv.get("amount", 0) if live else 0,
+            "sales": 1 if live else 0,
+        }
+    async for bill in paginate(f"/accounting/{connection_id}/bill", params):
+        posted = bill.get("posted_at") or bill.get("created_at")
+        if not posted:
+            continue
+        live = bill.get("status") not in ("void", "voided", "deleted", "draft")
+        yield {
+            "id": f"bill:{bill['id']}",
+            "date": posted,
+            "operating_expenses": bill.get("amount", 0) if live else 0,
+        }
+
+
+_timeseries: dict[str, TimeSeriesEngine] = {}
+
+
+async def get_ledger_timeseries(connection_id: str) -> TimeSeriesEngine:
+    if is_demo_mode(connection_id):
+        return get_demo_timeseries()
+
+    # The engine lives for the process; each sync only pulls documents
+    # updated since the last one. The cache entry throttles and coalesces
+    # syncs, it holds nothing but the engine version.
+    engine = _timeseries.setdefault(connection_id, TimeSeriesEngine())
+    await unified_cache.get((connection_id, "ledger_sync"), lambda: _sync_ledger(connection_id, engine))
+    return engine
+
+
+async def _sync_ledger(connection_id: str, engine: TimeSeriesEngine) -> int:
+    started = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    engine.add(await collect(iter_ledger_entries(connection_id, engine.watermark)))
+    engine.watermark = started
+    return engine.version
@@ -0,0 +1,155 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+
+class AsyncCache:
+    """TTL cache for upstream reads, keyed by ``(connection_id, name, *args)``.
+
+    Fresh entries are served directly. Entries past ``ttl`` but within
+    ``stale_ttl`` are served as-is while one background call refreshes them.
+    Concurrent misses for the same key share a single upstream call. The
+    total weight (records for list values, 1 otherwise) is bounded by
+    ``max_weight``; least recently used entries go first.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float, max_weight: int):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_weight = max_weight
+        self._entries: OrderedDict[tuple, tuple[Any, float, int]] = OrderedDict()
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self._weight = 0
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "load_errors": 0}
+
+    async def get(self, key: tuple, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at, _ = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                self.counters["hits"] += 1
+                self._entries.move_to_end(key)
+                return value
+            if age < self.stale_ttl:
+                self.counters["stale_hits"] += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self._start(key, loader)
+                return value
+
+        if key in self._inflight:
+            self.counters["coalesced"] += 1
+        else:
+            self.counters["misses"] += 1
+            self._start(key, loader)
+        # Shield so one caller going away doesn't cancel the shared call.
+        return await asyncio.shield(self._inflight[key])
+
+    def peek(self, key: tuple) -> Any:
+        """Return a cached value still within its stale window, without loading."""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] >= self.stale_ttl:
+            return None
+        return entry[0]
+
+    def peek_prefix(self, *prefix) -> list[Any]:
+        n = len(prefix)
+        now = time.monotonic()
+        return [
+            value for key, (value, stored_at, _) in self._entries.items()
+            if key[:n] == prefix and now - stored_at < self.stale_ttl
+        ]
+
+    def _start(self, key: tuple, loader: Callable[[], Awaitable[Any]]) -> None:
+        task = asyncio.create_task(loader())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+
+    def _finish(self, key: tuple, task: asyncio.Task) -> None:
+        current = self._inflight.get(key) is task
+        if current:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            # Waiting callers get the error; a failed background refresh
+            # leaves the stale value in place until it ages out.
+            self.counters["load_errors"] += 1
+            return
+        if current:
+            self._store(key, task.result())
+
+    def _store(self, key: tuple, value: Any) -> None:
+        self._drop(key)
+        weight = len(value) if isinstance(value, list) else 1
+        if weight > self.max_weight:
+            return
+        self._entries[key] = (value, time.monotonic(), weight)
+        self._weight += weight
+        while self._weight > self.max_weight:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.counters["evictions"] += 1
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._weight -= entry[2]
+
+    def invalidate(self, *prefix) -> int:
+        """Drop every entry whose key starts with ``prefix``.
+
+        ``invalidate(conn)`` clears a connection, ``invalidate(conn, "invoice", id)``
+        a single record. In-flight loads for matching keys are detached so
+        their (possibly stale) result is not stored.
+        """
+        n = len(prefix)
+        matched = [key for key in self._entries if key[:n] == prefix]
+        for key in matched:
+            self._drop(key)
+        for key in [key for key in self._inflight if key[:n] == prefix]:
+            del self._inflight[key]
+        return len(matched)
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["stale_hits"] + self.counters["misses"] + self.counters["coalesced"]
+        served = lookups - self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "weight": self._weight,
+            "max_weight": self.max_weight,
+        }
+
+
+_indexes: OrderedDict[int, tuple[list, dict]] = OrderedDict()
+_MAX_INDEXES = 64
+
+
+def index_by_id(records: list[dict]) -> dict[str, dict]:
+    """id -> record for a dataset list, built once per list object.
+
+    Cached and demo datasets are replaced, never edited in place, so the
+    list's identity is enough to know the index is current.
+    """
+    cached = _indexes.get(id(records))
+    if cached is not None and cached[0] is records:
+        _indexes.move_to_end(id(records))
+        return cached[1]
+    index = {str(record.get("id", "")): record for record in records}
+    _indexes[id(records)] = (records, index)
+    if len(_indexes) > _MAX_INDEXES:
+        _indexes.popitem(last=False)
+    return index
+
+
+unified_cache = AsyncCache(
+    ttl=float(os.getenv("UNIFIED_CACHE_TTL", "30")),
+    stale_ttl=float(os.getenv("UNIFIED_CACHE_STALE_TTL", "300")),
+    max_weight=int(os.getenv("UNIFIED_CACHE_MAX_RECORDS", "200000")),
+)
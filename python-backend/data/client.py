@@ -0,0 +1,94 @@
+import asyncio
+import importlib.util
+import os
+from collections.abc import AsyncIterator
+
+import httpx
+
+
+UNIFIED_API_KEY = os.getenv("UNIFIED_API_KEY", "")
+UNIFIED_BASE_URL = os.getenv("UNIFIED_BASE_URL", "https://api.unified.to")
+
+# Per-endpoint timeouts: listings can be large, single-record reads should
+# fail fast, and sends get extra room for the provider's own upstream call.
+LIST_TIMEOUT = httpx.Timeout(float(os.getenv("UNIFIED_LIST_TIMEOUT", "30")), connect=5.0)
+GET_TIMEOUT = httpx.Timeout(float(os.getenv("UNIFIED_GET_TIMEOUT", "10")), connect=5.0)
+SEND_TIMEOUT = httpx.Timeout(float(os.getenv("UNIFIED_SEND_TIMEOUT", "30")), connect=5.0)
+
+PAGE_SIZE = int(os.getenv("UNIFIED_PAGE_SIZE", "100"))
+
+_client: httpx.AsyncClient | None = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("UNIFIED_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("UNIFIED_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("UNIFIED_KEEPALIVE_EXPIRY", "30")),
+    )
+    # HTTP/2 needs the optional h2 package (httpx[http2]).
+    http2 = os.getenv("UNIFIED_HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+    return httpx.AsyncClient(
+        base_url=UNIFIED_BASE_URL,
+        headers={"Authorization": f"Bearer {UNIFIED_API_KEY}"},
+        limits=limits,
+        http2=http2,
+        timeout=LIST_TIMEOUT,
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the application-wide Unified API client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def paginate(
+    path: str,
+    params: dict | None = None,
+    page_size: int = PAGE_SIZE,
+    timeout: httpx.Timeout = LIST_TIMEOUT,
+) -> AsyncIterator[dict]:
+    """Yield records from an offset/limit listing one page at a time.
+
+    The request for the next page is in flight while the caller works
+    through the current one, and only one parsed page is held at a time.
+    A short page marks the end of the listing.
+    """
+    client = get_client()
+
+    async def fetch(offset: int) -> list[dict]:
+        resp = await client.get(
+            path,
+            params={**(params or {}), "limit": page_size, "offset": offset},
+            timeout=timeout,
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    offset = 0
+    pending = asyncio.create_task(fetch(offset))
+    try:
+        while pending is not None:
+            page = await pending
+            offset += len(page)
+            pending = asyncio.create_task(fetch(offset)) if len(page) >= page_size else None
+            for record in page:
+                yield record
+    finally:
+        # The consumer stopped early (or failed); don't leave a fetch running.
+        if pending is not None:
+            pending.cancel()
+
+
+async def collect(records: AsyncIterator[dict]) -> list[dict]:
+    return [record async for record in records]
@@ -0,0 +1,47 @@
+import asyncio
+import os
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+FANOUT_DEADLINE = float(os.getenv("UNIFIED_FANOUT_DEADLINE", "20"))
+
+
+async def fan_out(
+    calls: dict[str, Callable[[], Awaitable[Any]]],
+    required: set[str] | None = None,
+    deadline: float = FANOUT_DEADLINE,
+) -> tuple[dict[str, Any], dict[str, str]]:
+    """Run independent upstream fetches concurrently under one deadline.
+
+    Returns ``(results, errors)`` keyed by call name. A failure or timeout
+    in a ``required`` call (all calls by default) cancels its siblings and
+    is re-raised; optional calls that fail or miss the deadline are left
+    out of ``results`` and reported in ``errors`` so the caller can serve
+    what it has.
+    """
+    required = set(calls) if required is None else required
+    results: dict[str, Any] = {}
+    errors: dict[str, str] = {}
+    when = asyncio.get_running_loop().time() + deadline
+
+    async def run(name: str, call: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            async with asyncio.timeout_at(when):
+                results[name] = await call()
+        except TimeoutError:
+            if name in required:
+                raise TimeoutError(f"{name} did not finish within {deadline:g}s") from None
+            errors[name] = f"timed out after {deadline:g}s"
+        except Exception as exc:
+            if name in required:
+                raise
+            errors[name] = f"{type(exc).__name__}: {exc}"
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for name, call in calls.items():
+                tg.create_task(run(name, call))
+    except ExceptionGroup as group:
+        # Surface the first real failure rather than the group wrapper.
+        raise group.exceptions[0] from None
+    return results, errors
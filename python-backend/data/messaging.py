@@ -1,13 +1,16 @@
-import os
-import httpx
+from data.cache import unified_cache
+from data.client import SEND_TIMEOUT, get_client
 from demo_data import is_demo_mode
 
 
-UNIFIED_API_KEY = os.getenv("UNIFIED_API_KEY", "")
-UNIFIED_BASE_URL = "https://api.unified.to"
-
-
-async def send_email(connection_id: str, to: str, subject: str, body: str) -> dict:
+async def send_email(
+    connection_id: str,
+    to: str,
+    subject: str,
+    body: str,
+    invoice_id: str | None = None,
+    idempotency_key: str | None = None,
+) -> dict:
     if is_demo_mode(connection_id):
         return {
             "status": "demo_preview",
@@ -19,16 +22,19 @@ async def send_email(connection_id: str, to: str, subject: str, body: str) -> di
             },
         }
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            f"{UNIFIED_BASE_URL}/messaging/{connection_id}/message",
-            headers={"Authorization": f"Bearer {UNIFIED_API_KEY}"},
-            json={
-                "to": [{"email": to}],
-                "subject": subject,
-                "body": body,
-            },
-            timeout=30,
-        )
-        resp.raise_for_status()
-        return {"status": "sent", "message": "Email sent successfully", "response": resp.json()}
+    resp = await get_client().post(
+        f"/messaging/{connection_id}/message",
+        json={
+            "to": [{"email": to}],
+            "subject": subject,
+            "body": body,
+        },
+        headers={"Idempotency-Key": idempotency_key} if idempotency_key else None,
+        timeout=SEND_TIMEOUT,
+    )
+    resp.raise_for_status()
+    if invoice_id:
+        # A sent reminder updates the invoice's follow-up state upstream.
+        unified_cache.invalidate(connection_id, "invoice", invoice_id)
+        unified_cache.invalidate(connection_id, "overdue_invoices")
+    return {"status": "sent", "message": "Email sent successfully", "response": resp.json()}
@@ -1,25 +1,52 @@
-import os
-import httpx
-from demo_data import is_demo_mode, get_demo_transactions
+from collections.abc import AsyncIterator
+from datetime import date, timedelta
 
+from data.cache import index_by_id, unified_cache
+from data.client import GET_TIMEOUT, collect, get_client, paginate
+from demo_data import is_demo_mode, get_demo_transactions, get_demo_transaction_by_id
 
-UNIFIED_API_KEY = os.getenv("UNIFIED_API_KEY", "")
-UNIFIED_BASE_URL = "https://api.unified.to"
+
+async def iter_recent_transactions(connection_id: str, days: int = 30) -> AsyncIterator[dict]:
+    if is_demo_mode(connection_id):
+        for txn in get_demo_transactions():
+            yield txn
+        return
+
+    since = (date.today() - timedelta(days=days)).isoformat()
+    async for txn in paginate(f"/payment/{connection_id}/payment", {"updated_gte": f"{since}T00:00:00Z"}):
+        yield txn
 
 
 async def get_recent_transactions(connection_id: str, days: int = 30) -> list[dict]:
     if is_demo_mode(connection_id):
         return get_demo_transactions()
+    return await unified_cache.get(
+        (connection_id, "recent_transactions", days),
+        lambda: collect(iter_recent_transactions(connection_id, days)),
+    )
+
+
+async def get_transaction_by_id(connection_id: str, transaction_id: str) -> dict | None:
+    if is_demo_mode(connection_id):
+        return get_demo_transaction_by_id(transaction_id)
+
+    for transactions in unified_cache.peek_prefix(connection_id, "recent_transactions"):
+        txn = index_by_id(transactions).get(transaction_id)
+        if txn is not None:
+            return txn
+
+    return await unified_cache.get(
+        (connection_id, "transaction", transaction_id),
+        lambda: _fetch_transaction(connection_id, transaction_id),
+    )
 
-    from datetime import date, timedelta
-    since = (date.today() - timedelta(days=days)).isoformat()
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{UNIFIED_BASE_URL}/payment/{connection_id}/payment",
-            headers={"Authorization": f"Bearer {UNIFIED_API_KEY}"},
-            params={"updated_gte": f"{since}T00:00:00Z"},
-            timeout=30,
-        )
-        resp.raise_for_status()
-        return resp.json()
+async def _fetch_transaction(connection_id: str, transaction_id: str) -> dict | None:
+    resp = await get_client().get(
+        f"/payment/{connection_id}/payment/{transaction_id}",
+        timeout=GET_TIMEOUT,
+    )
+    if resp.status_code == 404:
+        return None
+    resp.raise_for_status()
+    return resp.json()
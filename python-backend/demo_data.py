@@ -1,19 +1,134 @@
+import atexit
+import functools
 import os
-import json
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
 from datetime import date, timedelta
 
+import numpy as np
+import orjson
+
+from data.cache import index_by_id
+from financials import financial_series
+from insights import materialized_insights
+from reconciliation import fuzzy_reconcile
+from timeseries import TimeSeriesEngine, day_number
+
 OVERRIDES_PATH = Path(__file__).parent / "demo_overrides.json"
+# How long admin writes are batched before hitting disk, and how often the
+# file's mtime is checked for edits made outside the process.
+FLUSH_DELAY = float(os.getenv("DEMO_OVERRIDES_FLUSH_DELAY", "0.5"))
+CHECK_INTERVAL = float(os.getenv("DEMO_OVERRIDES_CHECK_INTERVAL", "1"))
+# The demo financial periods are the months of DEMO_FINANCIAL_YEAR; earlier
+# years are the same months scaled back by DEMO_ANNUAL_GROWTH per year.
+DEMO_FINANCIAL_YEAR = 2026
+DEMO_HISTORY_YEARS = 5
+DEMO_ANNUAL_GROWTH = 1.12
+
+
+class _OverrideStore:
+    """In-memory copy of ``demo_overrides.json``.
+
+    Reads return the current snapshot, a dict that is replaced rather than
+    mutated, so a reader never sees a half-applied write. Writes update the
+    snapshot under a lock and are flushed write-behind: changes within
+    ``FLUSH_DELAY`` go out as one temp-file-and-rename. The file is reloaded
+    when its mtime moves and there are no unflushed local changes.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: dict = {}
+        self._mtime: float | None = None
+        self._checked_at = float("-inf")
+        self._dirty = False
+        self._timer: threading.Timer | None = None
+        self._pinned: ContextVar[dict | None] = ContextVar("demo_overrides_pinned", default=None)
+
+    def _mtime_on_disk(self) -> float | None:
+        try:
+            return self.path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    def snapshot(self) -> dict:
+        pinned = self._pinned.get()
+        if pinned is not None:
+            return pinned
+        now = time.monotonic()
+        if now - self._checked_at >= CHECK_INTERVAL:
+            with self._lock:
+                self._checked_at = now
+                mtime = self._mtime_on_disk()
+                if mtime != self._mtime and not self._dirty:
+                    self._data = orjson.loads(self.path.read_bytes()) if mtime is not None else {}
+                    self._mtime = mtime
+        return self._data
+
+    @contextmanager
+    def pinned(self):
+        """Serve one snapshot to every read inside the block."""
+        token = self._pinned.set(self.snapshot())
+        try:
+            yield
+        finally:
+            self._pinned.reset(token)
+
+    def set(self, key: str, value) -> None:
+        self.snapshot()  # pick up external edits before layering ours on top
+        with self._lock:
+            self._data = {**self._data, key: value}
+            self._schedule()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data = {}
+            self._schedule()
+
+    def _schedule(self) -> None:
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(FLUSH_DELAY, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            if self._data:
+                fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(orjson.dumps(self._data))
+                    os.replace(tmp, self.path)
+                except BaseException:
+                    os.unlink(tmp)
+                    raise
+            elif self.path.exists():
+                self.path.unlink()
+            self._mtime = self._mtime_on_disk()
+            self._dirty = False
+
+
+_store = _OverrideStore(OVERRIDES_PATH)
+atexit.register(_store.flush)
 
 
 def _load_overrides() -> dict:
-    if OVERRIDES_PATH.exists():
-        return json.loads(OVERRIDES_PATH.read_text())
-    return {}
+    return _store.snapshot()
 
 
-def _save_overrides(data: dict) -> None:
-    OVERRIDES_PATH.write_text(json.dumps(data, indent=2))
+def flush_demo_overrides() -> None:
+    _store.flush()
 
 
 def is_demo_mode(connection_id: str | None = None) -> bool:
@@ -26,8 +141,11 @@ def get_demo_invoices() -> list[dict]:
     overrides = _load_overrides()
     if "invoices" in overrides:
         return overrides["invoices"]
+    return _default_invoices(date.today())
 
-    today = date.today()
+
+@functools.lru_cache(maxsize=1)
+def _default_invoices(today: date) -> list[dict]:
     return [
         {
             "id": "inv_001",
@@ -73,40 +191,52 @@ def get_demo_invoices() -> list[dict]:
 
 
 def get_demo_invoice_by_id(invoice_id: str) -> dict | None:
-    for inv in get_demo_invoices():
-        if inv["id"] == invoice_id:
-            return inv
-    return None
+    return index_by_id(get_demo_invoices()).get(invoice_id)
+
+
+_monthly_views: dict[str, tuple[dict | None, dict]] = {}
 
 
 def get_demo_monthly_summary(month: str) -> dict:
-    overrides = _load_overrides()
-    if "monthly" in overrides:
-        summary = dict(overrides["monthly"])
+    # One dict per month until the override changes, so callers can tell
+    # by identity that the summary hasn't moved.
+    source = _load_overrides().get("monthly")
+    cached = _monthly_views.get(month)
+    if cached is not None and cached[0] is source:
+        return cached[1]
+
+    if source is not None:
+        summary = dict(source)
         summary["month"] = month
-        return summary
-
-    return {
-        "month": month,
-        "collected": 94200.00,
-        "outstanding": 31500.00,
-        "invoice_count": 47,
-        "avg_days_to_pay": 16,
-        "vs_last_month": {
-            "collected_change": 12.5,
-            "outstanding_change": -8.3,
-            "invoice_count_change": 5,
-            "avg_days_change": -2,
-        },
-    }
+    else:
+        summary = {
+            "month": month,
+            "collected": 94200.00,
+            "outstanding": 31500.00,
+            "invoice_count": 47,
+            "avg_days_to_pay": 16,
+            "vs_last_month": {
+                "collected_change": 12.5,
+                "outstanding_change": -8.3,
+                "invoice_count_change": 5,
+                "avg_days_change": -2,
+            },
+        }
+    if len(_monthly_views) >= 64:
+        _monthly_views.clear()
+    _monthly_views[month] = (source, summary)
+    return summary
 
 
 def get_demo_transactions() -> list[dict]:
     overrides = _load_overrides()
     if "transactions" in overrides:
         return overrides["transactions"]
+    return _default_transactions(date.today())
+
 
-    today = date.today()
+@functools.lru_cache(maxsize=1)
+def _default_transactions(today: date) -> list[dict]:
     return [
         {
             "id": "txn_001",
@@ -139,72 +269,33 @@ def get_demo_transactions() -> list[dict]:
     ]
 
 
+def get_demo_transaction_by_id(transaction_id: str) -> dict | None:
+    return index_by_id(get_demo_transactions()).get(transaction_id)
+
+
 def set_demo_invoices(data: list[dict]) -> None:
-    overrides = _load_overrides()
-    overrides["invoices"] = data
-    _save_overrides(overrides)
+    _store.set("invoices", data)
 
 
 def set_demo_transactions(data: list[dict]) -> None:
-    overrides = _load_overrides()
-    overrides["transactions"] = data
-    _save_overrides(overrides)
+    _store.set("transactions", data)
 
 
 def set_demo_monthly_summary(data: dict) -> None:
-    overrides = _load_overrides()
-    overrides["monthly"] = data
-    _save_overrides(overrides)
+    _store.set("monthly", data)
 
 
 def reset_demo_data() -> None:
-    if OVERRIDES_PATH.exists():
-        OVERRIDES_PATH.unlink()
+    _store.clear()
 
 
 def get_demo_reconciliation() -> dict:
-    invoices = get_demo_invoices()
-    transactions = get_demo_transactions()
-    return {
-        "matched": [
-            {
-                "transaction": transactions[0],
-                "invoice": invoices[0],
-                "confidence": 0.95,
-                "match_reason": "Amount exact match + name similarity (Acme Corp / Acme Corporation)",
-            },
-            {
-                "transaction": transactions[1],
-                "invoice": invoices[1],
-                "confidence": 0.88,
-                "match_reason": "Amount exact match + partial name match (GlobalTech Solutions / GlobalTech)",
-            },
-            {
-                "transaction": transactions[2],
-                "invoice": invoices[3],
-                "confidence": 0.82,
-                "match_reason": "Amount exact match + partial name match (MediCo Health / MediCo)",
-            },
-        ],
-        "unmatched_transactions": [
-            {
-                "transaction": transactions[3],
-                "reason": "No invoice found matching amount $4,300.00 or payer 'Unknown Sender'",
-            },
-        ],
-        "unmatched_invoices": [
-            {
-                "invoice": invoices[2],
-                "reason": "No payment received for StartupXYZ ($3,200.00, 45 days overdue)",
-            },
-        ],
-    }
+    """Reconcile whatever demo invoices and transactions are current."""
+    return fuzzy_reconcile(get_demo_invoices(), get_demo_transactions()).to_dict()
 
 
 def set_demo_financial_periods(data: list[dict]) -> None:
-    overrides = _load_overrides()
-    overrides["financial_periods"] = data
-    _save_overrides(overrides)
+    _store.set("financial_periods", data)
 
 
 def get_demo_financial_periods() -> list[dict]:
@@ -214,6 +305,7 @@ def get_demo_financial_periods() -> list[dict]:
     return _default_financial_periods()
 
 
+@functools.lru_cache(maxsize=1)
 def _default_financial_periods() -> list[dict]:
     return [
         {"month": "Jan", "revenue": 142000, "expenses": 98000, "profit": 44000, "sales": 312, "cogs": 71400, "operating_expenses": 26600},
@@ -231,214 +323,57 @@ def _default_financial_periods() -> list[dict]:
     ]
 
 
-def get_demo_insights() -> dict:
+def get_demo_insights(month: str | None = None) -> dict:
     """Aggregate all data sources and generate actionable insights."""
-    invoices = get_demo_invoices()
-    monthly = get_demo_monthly_summary("2026-02")
-    financial = _default_financial_periods()
-    reconciliation = get_demo_reconciliation()
-
-    total_overdue = sum(inv["amount"] for inv in invoices)
-    avg_days_overdue = round(sum(inv["days_overdue"] for inv in invoices) / len(invoices)) if invoices else 0
-    critically_overdue = [inv for inv in invoices if inv["days_overdue"] > 30]
-    total_revenue = sum(m["revenue"] for m in financial)
-    total_profit = sum(m["profit"] for m in financial)
-    total_expenses = sum(m["expenses"] for m in financial)
-    avg_margin = round((total_profit / total_revenue) * 100, 1) if total_revenue else 0
-    revenue_trend = [m["revenue"] for m in financial]
-    profit_trend = [m["profit"] for m in financial]
-    expense_trend = [m["expenses"] for m in financial]
-    months = [m["month"] for m in financial]
-
-    # Revenue growth rate (last 3 months vs prior 3 months)
-    recent_rev = sum(revenue_trend[-3:])
-    prior_rev = sum(revenue_trend[-6:-3]) if len(revenue_trend) >= 6 else sum(revenue_trend[:3])
-    rev_growth = round(((recent_rev - prior_rev) / prior_rev) * 100, 1) if prior_rev else 0
-
-    # Expense ratio trend
-    expense_ratios = [round((m["expenses"] / m["revenue"]) * 100, 1) if m["revenue"] else 0 for m in financial]
-
-    # Top overdue customers
-    top_overdue = sorted(invoices, key=lambda x: x["amount"], reverse=True)[:5]
-
-    # Generate insights
-    insights = []
-
-    # Cash collection insight
-    collection_rate = round((monthly["collected"] / (monthly["collected"] + monthly["outstanding"])) * 100, 1) if (monthly["collected"] + monthly["outstanding"]) > 0 else 0
-    insights.append({
-        "type": "metric",
-        "severity": "info" if collection_rate > 70 else "warning",
-        "title": "Cash Collection Rate",
-        "value": f"{collection_rate}%",
-        "description": f"You collected ${monthly['collected']:,.0f} out of ${monthly['collected'] + monthly['outstanding']:,.0f} total receivables this month.",
-        "suggestion": "Consider automated payment reminders for outstanding invoices." if collection_rate < 80 else "Strong collection rate. Keep it up!",
-    })
-
-    # Overdue risk
-    if critically_overdue:
-        insights.append({
-            "type": "warning",
-            "severity": "critical",
-            "title": "Critical Overdue Invoices",
-            "value": f"{len(critically_overdue)} invoices",
-            "description": f"${sum(i['amount'] for i in critically_overdue):,.0f} is severely overdue (30+ days). Customers: {', '.join(i['customer_name'] for i in critically_overdue)}.",
-            "suggestion": "Send final-notice emails immediately and consider escalating to collections.",
-        })
-
-    # Revenue growth insight
-    insights.append({
-        "type": "trend",
-        "severity": "success" if rev_growth > 0 else "warning",
-        "title": "Revenue Growth Trend",
-        "value": f"{'+' if rev_growth > 0 else ''}{rev_growth}%",
-        "description": f"Recent 3-month revenue (${recent_rev:,.0f}) vs prior 3-month (${prior_rev:,.0f}).",
-        "suggestion": "Revenue is accelerating — invest in scaling operations." if rev_growth > 10 else "Revenue growth is slowing. Review pricing strategy and lead generation." if rev_growth < 5 else "Steady growth. Monitor for seasonal patterns.",
-    })
-
-    # Profit margin insight
-    insights.append({
-        "type": "metric",
-        "severity": "success" if avg_margin > 35 else "warning" if avg_margin > 20 else "critical",
-        "title": "Average Profit Margin",
-        "value": f"{avg_margin}%",
-        "description": f"Full-year profit of ${total_profit:,.0f} on ${total_revenue:,.0f} revenue.",
-        "suggestion": "Healthy margins. Consider reinvesting in growth." if avg_margin > 35 else "Margins are thin. Look for cost optimization opportunities.",
-    })
-
-    # Expense management
-    recent_expense_ratio = expense_ratios[-1] if expense_ratios else 0
-    early_expense_ratio = expense_ratios[0] if expense_ratios else 0
-    expense_trend_direction = "increasing" if recent_expense_ratio > early_expense_ratio else "decreasing"
-    insights.append({
-        "type": "trend",
-        "severity": "warning" if expense_trend_direction == "increasing" else "success",
-        "title": "Expense Ratio Trend",
-        "value": f"{recent_expense_ratio}%",
-        "description": f"Expenses as % of revenue moved from {early_expense_ratio}% to {recent_expense_ratio}% over the year.",
-        "suggestion": "Expense ratio is creeping up. Review line items for cost savings." if expense_trend_direction == "increasing" else "Good cost management — expenses are growing slower than revenue.",
-    })
-
-    # Reconciliation insight
-    matched_count = len(reconciliation.get("matched", []))
-    unmatched_txn = len(reconciliation.get("unmatched_transactions", []))
-    unmatched_inv = len(reconciliation.get("unmatched_invoices", []))
-    total_recon = matched_count + unmatched_txn + unmatched_inv
-    match_rate = round((matched_count / total_recon) * 100) if total_recon else 0
-    insights.append({
-        "type": "metric",
-        "severity": "success" if match_rate > 80 else "warning",
-        "title": "Payment Match Rate",
-        "value": f"{match_rate}%",
-        "description": f"{matched_count} of {total_recon} items matched. {unmatched_txn} unmatched payments, {unmatched_inv} unmatched invoices.",
-        "suggestion": "Review unmatched items to ensure all payments are accounted for." if match_rate < 100 else "Perfect match rate!",
-    })
-
-    # Best/worst months
-    best = max(financial, key=lambda m: m["profit"])
-    worst = min(financial, key=lambda m: m["profit"])
-    insights.append({
-        "type": "tip",
-        "severity": "info",
-        "title": "Peak Performance Month",
-        "value": best["month"],
-        "description": f"Best: {best['month']} (${best['profit']:,.0f} profit). Worst: {worst['month']} (${worst['profit']:,.0f} profit).",
-        "suggestion": f"Analyze what drove {best['month']}'s success and replicate those strategies.",
-    })
-
-    # Days to pay insight
-    insights.append({
-        "type": "metric",
-        "severity": "success" if monthly["avg_days_to_pay"] < 20 else "warning",
-        "title": "Average Days to Pay",
-        "value": f"{monthly['avg_days_to_pay']} days",
-        "description": f"Customers take an average of {monthly['avg_days_to_pay']} days to pay invoices.",
-        "suggestion": "Consider offering early payment discounts to reduce DSO." if monthly["avg_days_to_pay"] > 15 else "Excellent payment velocity!",
-    })
-
-    return {
-        "summary": {
-            "total_revenue": total_revenue,
-            "total_profit": total_profit,
-            "total_expenses": total_expenses,
-            "avg_margin": avg_margin,
-            "total_overdue": total_overdue,
-            "overdue_count": len(invoices),
-            "avg_days_overdue": avg_days_overdue,
-            "collection_rate": collection_rate,
-            "revenue_growth": rev_growth,
-        },
-        "insights": insights,
-        "top_overdue_customers": [
-            {
-                "name": inv["customer_name"],
-                "amount": inv["amount"],
-                "days_overdue": inv["days_overdue"],
-                "invoice_id": inv["id"],
-            }
-            for inv in top_overdue
-        ],
-        "charts": {
-            "months": months,
-            "revenue": revenue_trend,
-            "profit": profit_trend,
-            "expenses": expense_trend,
-            "expense_ratios": expense_ratios,
-        },
-    }
-
-
-def get_demo_financial_analysis(timeframe: str = "monthly", year: int = 2026) -> dict:
-    """Full year of realistic mock financial data for graphing."""
-    monthly_data = get_demo_financial_periods()
-    if not monthly_data:
-        monthly_data = _default_financial_periods()
-
-    total_revenue = sum(m["revenue"] for m in monthly_data)
-    total_expenses = sum(m["expenses"] for m in monthly_data)
-    total_profit = sum(m["profit"] for m in monthly_data)
-    total_sales = sum(m["sales"] for m in monthly_data)
-
-    if timeframe == "quarterly":
-        quarterly_data = []
-        quarters = [("Q1", 0, 3), ("Q2", 3, 6), ("Q3", 6, 9), ("Q4", 9, 12)]
-        for label, start, end in quarters:
-            q_months = monthly_data[start:end]
-            quarterly_data.append({
-                "period": label,
-                "revenue": sum(m["revenue"] for m in q_months),
-                "expenses": sum(m["expenses"] for m in q_months),
-                "profit": sum(m["profit"] for m in q_months),
-                "sales": sum(m["sales"] for m in q_months),
-                "cogs": sum(m["cogs"] for m in q_months),
-                "operating_expenses": sum(m["operating_expenses"] for m in q_months),
-            })
-        period_data = quarterly_data
-    else:
-        period_data = [
-            {**m, "period": m["month"]} for m in monthly_data
-        ]
-
-    best_month = max(monthly_data, key=lambda m: m["revenue"])
-    worst_month = min(monthly_data, key=lambda m: m["revenue"])
-    avg_margin = round((total_profit / total_revenue) * 100, 1) if total_revenue else 0
-
-    return {
-        "year": year,
-        "timeframe": timeframe,
-        "periods": period_data,
-        "summary": {
-            "total_revenue": total_revenue,
-            "total_expenses": total_expenses,
-            "total_profit": total_profit,
-            "total_sales": total_sales,
-            "avg_profit_margin": avg_margin,
-            "best_month": best_month["month"],
-            "best_month_revenue": best_month["revenue"],
-            "worst_month": worst_month["month"],
-            "worst_month_revenue": worst_month["revenue"],
-            "revenue_growth": round(
-                ((monthly_data[-1]["revenue"] - monthly_data[0]["revenue"]) / monthly_data[0]["revenue"]) * 100, 1
-            ),
-        },
-    }
+    month = month or date.today().strftime("%Y-%m")
+    with _store.pinned():
+        sources = {
+            "invoices": get_demo_invoices(),
+            "transactions": get_demo_transactions(),
+            "periods": financial_series(get_demo_financial_periods()),
+            "monthly": get_demo_monthly_summary(month),
+        }
+        key = ("demo", month)
+        reconciliation = get_demo_reconciliation() if "match_rate" in materialized_insights.stale(key, sources) else None
+        return materialized_insights.get(key, sources, reconciliation)
+
+
+_demo_timeseries: tuple[list, TimeSeriesEngine] | None = None
+
+
+def get_demo_timeseries() -> TimeSeriesEngine:
+    """Daily ledger behind the demo financial periods, rebuilt when they change.
+
+    Each month's figures are spread evenly over its days (the remainder
+    lands on the 1st), so the monthly rollups add back up to the periods.
+    """
+    global _demo_timeseries
+    periods = get_demo_financial_periods() or _default_financial_periods()
+    if _demo_timeseries is not None and _demo_timeseries[0] is periods:
+        return _demo_timeseries[1]
+
+    days, values = [], []
+    for back in range(DEMO_HISTORY_YEARS):
+        year = DEMO_FINANCIAL_YEAR - back
+        scale = DEMO_ANNUAL_GROWTH ** -back
+        for month, period in enumerate(periods[:12], start=1):
+            first = date(year, month, 1)
+            length = ((first + timedelta(days=32)).replace(day=1) - first).days
+            cogs = period.get("cogs", 0)
+            opex = period.get("operating_expenses", period.get("expenses", 0) - cogs)
+            totals = np.array([
+                round(period.get("revenue", 0) * scale * 100),
+                round(cogs * scale * 100),
+                round(opex * scale * 100),
+                round(period.get("sales", 0) * scale),
+            ], dtype=np.int64)
+            per_day = np.tile(totals // length, (length, 1))
+            per_day[0] += totals - per_day.sum(axis=0)
+            days.append(np.arange(length, dtype=np.int64) + day_number(first))
+            values.append(per_day)
+
+    engine = TimeSeriesEngine()
+    engine.add_columns(np.concatenate(days), np.concatenate(values))
+    _demo_timeseries = (periods, engine)
+    return engine
+
@@ -0,0 +1,293 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+
+DRAFT_MODEL = os.getenv("DRAFT_MODEL", "gpt-4o")
+DRAFT_CONCURRENCY = int(os.getenv("DRAFT_CONCURRENCY", "8"))
+DRAFT_MAX_RETRIES = int(os.getenv("DRAFT_MAX_RETRIES", "4"))
+DRAFT_CACHE_SIZE = int(os.getenv("DRAFT_CACHE_SIZE", "2000"))
+DRAFT_CACHE_TTL = float(os.getenv("DRAFT_CACHE_TTL", "86400"))
+DRAFT_CACHE_PATH = os.getenv("DRAFT_CACHE_PATH", "")  # set to persist drafts in SQLite
+
+EMAIL_TEMPLATES = {
+    "friendly": {
+        "subject": "Friendly Reminder: Invoice {invoice_id} — ${amount:.2f} Past Due",
+        "body": (
+            "Hi {customer_name},\n\n"
+            "I hope this message finds you well! I wanted to send a quick reminder that "
+            "invoice {invoice_id} for ${amount:.2f} was due on {due_date} and is now "
+            "{days_overdue} days past due.\n\n"
+            "Could you please let me know when we can expect payment? If you've already "
+            "sent it, please disregard this note.\n\n"
+            "Thanks so much!\nBest regards"
+        ),
+    },
+    "firm": {
+        "subject": "Payment Required: Invoice {invoice_id} — ${amount:.2f} Overdue",
+        "body": (
+            "Dear {customer_name},\n\n"
+            "This is a follow-up regarding invoice {invoice_id} for ${amount:.2f}, which "
+            "was due on {due_date} and is now {days_overdue} days overdue.\n\n"
+            "We kindly request immediate attention to this matter. Please arrange payment "
+            "at your earliest convenience or contact us to discuss a payment plan.\n\n"
+            "Thank you for your prompt attention.\nRegards"
+        ),
+    },
+    "final-notice": {
+        "subject": "FINAL NOTICE: Invoice {invoice_id} — ${amount:.2f} Severely Overdue",
+        "body": (
+            "Dear {customer_name},\n\n"
+            "This is a final notice regarding invoice {invoice_id} for ${amount:.2f}, "
+            "originally due on {due_date} ({days_overdue} days ago).\n\n"
+            "Despite previous reminders, we have not received payment. If payment is not "
+            "received within 7 business days, we may need to escalate this matter to our "
+            "collections department.\n\n"
+            "Please contact us immediately to resolve this.\nRegards"
+        ),
+    },
+}
+
+TONE_INSTRUCTIONS = {
+    "friendly": "Write in a warm, friendly tone. Be understanding and non-confrontational.",
+    "firm": "Write in a professional, firm tone. Be direct but respectful.",
+    "final-notice": "Write in a serious, urgent tone. Mention potential escalation to collections.",
+}
+
+_openai_client = None
+_draft_slots = asyncio.Semaphore(DRAFT_CONCURRENCY)
+
+
+def get_openai_client():
+    """Shared AsyncOpenAI client, or None when no API key is configured."""
+    global _openai_client
+    openai_key = os.getenv("OPENAI_API_KEY")
+    if not openai_key:
+        return None
+    if _openai_client is None:
+        from openai import AsyncOpenAI
+        # Retries are handled in _complete so they happen outside the
+        # concurrency slot accounting and respect Retry-After.
+        _openai_client = AsyncOpenAI(api_key=openai_key, max_retries=0)
+    return _openai_client
+
+
+async def close_openai_client() -> None:
+    global _openai_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+
+
+def _retry_delay(exc: Exception, attempt: int) -> float:
+    response = getattr(exc, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return min(30.0, 2 ** attempt) * (0.5 + random.random())
+
+
+async def _complete(client, prompt: str) -> str:
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+    for attempt in range(DRAFT_MAX_RETRIES + 1):
+        try:
+            async with _draft_slots:
+                resp = await client.chat.completions.create(
+                    model=DRAFT_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=500,
+                )
+            return resp.choices[0].message.content or ""
+        except (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError) as exc:
+            if attempt == DRAFT_MAX_RETRIES:
+                raise
+            await asyncio.sleep(_retry_delay(exc, attempt))
+
+
+def template_email(invoice: dict, tone: str) -> dict:
+    template = EMAIL_TEMPLATES.get(tone, EMAIL_TEMPLATES["friendly"])
+    fmt = {**invoice, "invoice_id": invoice.get("id", "")}
+    return {
+        "subject": template["subject"].format_map(fmt),
+        "body": template["body"].format_map(fmt),
+    }
+
+
+class DraftCache:
+    """LRU + TTL cache of LLM drafts keyed on a hash of the prompt inputs.
+
+    With ``path`` set, drafts are also written to SQLite so they survive a
+    restart; memory misses fall through to disk.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, path: str = ""):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries: OrderedDict[str, tuple[dict, float, float]] = OrderedDict()
+        self.metrics = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "llm_calls": 0,
+            "llm_seconds": 0.0,
+            "saved_llm_seconds": 0.0,
+            "template_fallbacks": 0,
+        }
+        if path:
+            with sqlite3.connect(path) as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS drafts "
+                    "(key TEXT PRIMARY KEY, email TEXT NOT NULL, created REAL NOT NULL, latency REAL NOT NULL)"
+                )
+
+    @staticmethod
+    def key(invoice: dict, tone: str) -> str:
+        inputs = [
+            DRAFT_MODEL, tone, invoice.get("customer_name"), invoice.get("id"),
+            invoice.get("amount"), invoice.get("due_date"), invoice.get("days_overdue"),
+        ]
+        return hashlib.sha256(json.dumps(inputs, default=str).encode()).hexdigest()
+
+    async def get(self, key: str) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None and self.path:
+            row = await asyncio.to_thread(self._read, key)
+            if row is not None:
+                entry = (json.loads(row[0]), row[1], row[2])
+                self._remember(key, entry)
+                self.metrics["disk_hits"] += 1
+        if entry is None or time.time() - entry[1] >= self.ttl:
+            if entry is not None:
+                self._entries.pop(key, None)
+            self.metrics["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.metrics["hits"] += 1
+        self.metrics["saved_llm_seconds"] += entry[2]
+        return entry[0]
+
+    async def put(self, key: str, email: dict, latency: float) -> None:
+        entry = (email, time.time(), latency)
+        self._remember(key, entry)
+        if self.path:
+            await asyncio.to_thread(self._write, key, json.dumps(email), entry[1], latency)
+
+    # SQLite calls run in a worker thread so a slow disk doesn't stall the event loop.
+    def _read(self, key: str) -> tuple | None:
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute("SELECT email, created, latency FROM drafts WHERE key = ?", (key,)).fetchone()
+
+    def _write(self, key: str, email: str, created: float, latency: float) -> None:
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("INSERT OR REPLACE INTO drafts VALUES (?, ?, ?, ?)", (key, email, created, latency))
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.metrics["evictions"] += 1
+
+    def stats(self) -> dict:
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        calls = self.metrics["llm_calls"]
+        return {
+            **self.metrics,
+            "hit_rate": round(self.metrics["hits"] / lookups, 4) if lookups else 0.0,
+            "avg_llm_seconds": round(self.metrics["llm_seconds"] / calls, 3) if calls else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "persistent": bool(self.path),
+        }
+
+
+draft_cache = DraftCache(DRAFT_CACHE_SIZE, DRAFT_CACHE_TTL, DRAFT_CACHE_PATH)
+
+
+async def draft_email(invoice: dict, tone: str) -> tuple[dict, str]:
+    """Draft a reminder; returns the email and its source: "llm", "cache" or "template"."""
+    client = get_openai_client()
+    if client is not None:
+        key = draft_cache.key(invoice, tone)
+        cached = await draft_cache.get(key)
+        if cached is not None:
+            return cached, "cache"
+        try:
+            prompt = (
+                f"Write a payment reminder email for an overdue invoice.\n"
+                f"Customer: {invoice['customer_name']}\n"
+                f"Invoice ID: {invoice['id']}\n"
+                f"Amount: ${invoice['amount']:.2f}\n"
+                f"Due date: {invoice['due_date']}\n"
+                f"Days overdue: {invoice['days_overdue']}\n\n"
+                f"Tone: {TONE_INSTRUCTIONS.get(tone, TONE_INSTRUCTIONS['friendly'])}\n\n"
+                f"Return the email with a clear subject line on the first line (prefixed with 'Subject: '), "
+                f"followed by a blank line and the body."
+            )
+            started = time.perf_counter()
+            content = await _complete(client, prompt)
+            latency = time.perf_counter() - started
+            draft_cache.metrics["llm_calls"] += 1
+            draft_cache.metrics["llm_seconds"] += latency
+            lines = content.strip().split("\n", 2)
+            subject = lines[0].replace("Subject: ", "").strip()
+            body = lines[2].strip() if len(lines) > 2 else content
+            email = {"subject": subject, "body": body}
+            await draft_cache.put(key, email, latency)
+            return email, "llm"
+        except Exception:
+            draft_cache.metrics["template_fallbacks"] += 1
+
+    return template_email(invoice, tone), "template"
+
+
+async def generate_email(invoice: dict, tone: str) -> dict:
+    email, _ = await draft_email(invoice, tone)
+    return email
+
+
+async def draft_stream(invoices: list[dict], tone: str, missing: list[str] = ()) -> AsyncIterator[dict]:
+    """Yield one event per invoice as its draft completes, then a summary."""
+    for invoice_id in missing:
+        yield {"status": "error", "invoice_id": invoice_id, "message": f"Invoice {invoice_id} not found"}
+
+    async def one(invoice: dict) -> dict:
+        invoice_id = invoice.get("id", "")
+        try:
+            email, source = await draft_email(invoice, tone)
+        except Exception as exc:
+            # e.g. an invoice without a due_date for the template; the rest still get drafted.
+            return {"status": "error", "invoice_id": invoice_id, "message": f"Could not draft: {type(exc).__name__}: {exc}"}
+        return {"status": "draft", "invoice_id": invoice_id, "source": source, "email": email, "invoice": invoice}
+
+    tasks = [asyncio.create_task(one(invoice)) for invoice in invoices]
+    fallbacks = failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            event = await next_done
+            fallbacks += event.get("source") == "template"
+            failed += event["status"] == "error"
+            yield event
+    finally:
+        # The client went away mid-stream: stop drafting for it.
+        for task in tasks:
+            task.cancel()
+    yield {
+        "status": "done", "count": len(tasks), "template_fallbacks": fallbacks, "failed": failed,
+        "not_found": len(missing),
+    }
+
+
+def encode_event(event: dict, fmt: str) -> str:
+    if fmt == "sse":
+        return f"event: {event['status']}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
@@ -0,0 +1,214 @@
+import asyncio
+import csv
+import io
+import os
+import tempfile
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+
+from reconciliation import ReconciliationResult
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "2000"))
+EXPORT_READ_SIZE = 64 * 1024
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# (column, type) per dataset; rows are flattened to exactly these columns.
+COLUMNS = {
+    "invoices": (
+        ("id", "str"), ("customer_name", "str"), ("customer_email", "str"), ("amount", "float"),
+        ("currency", "str"), ("due_date", "str"), ("days_overdue", "int"), ("status", "str"),
+    ),
+    "transactions": (
+        ("id", "str"), ("payer_name", "str"), ("amount", "float"), ("currency", "str"),
+        ("date", "str"), ("reference", "str"),
+    ),
+    "reconciliation": (
+        ("status", "str"), ("transaction_id", "str"), ("payer_name", "str"), ("transaction_amount", "float"),
+        ("invoice_id", "str"), ("customer_name", "str"), ("invoice_amount", "float"),
+        ("confidence", "float"), ("reason", "str"),
+    ),
+    "analysis": (
+        ("period", "str"), ("start", "str"), ("revenue", "float"), ("expenses", "float"), ("profit", "float"),
+        ("sales", "int"), ("cogs", "float"), ("operating_expenses", "float"),
+    ),
+}
+
+
+def reconciliation_rows(result: dict | ReconciliationResult) -> Iterable[dict]:
+    """One row per match, unmatched transaction and unmatched invoice."""
+    if isinstance(result, ReconciliationResult):
+        yield from _result_rows(result)
+        return
+    for m in result.get("matched", []):
+        txn, inv = m["transaction"], m["invoice"]
+        yield {
+            "status": "matched",
+            "transaction_id": txn.get("id"), "payer_name": txn.get("payer_name"), "transaction_amount": txn.get("amount"),
+            "invoice_id": inv.get("id"), "customer_name": inv.get("customer_name"), "invoice_amount": inv.get("amount"),
+            "confidence": m.get("confidence"), "reason": m.get("match_reason"),
+        }
+    for u in result.get("unmatched_transactions", []):
+        txn = u["transaction"]
+        yield {
+            "status": "unmatched_transaction",
+            "transaction_id": txn.get("id"), "payer_name": txn.get("payer_name"), "transaction_amount": txn.get("amount"),
+            "reason": u.get("reason"),
+        }
+    for u in result.get("unmatched_invoices", []):
+        inv = u["invoice"]
+        yield {
+            "status": "unmatched_invoice",
+            "invoice_id": inv.get("id"), "customer_name": inv.get("customer_name"), "invoice_amount": inv.get("amount"),
+            "reason": u.get("reason"),
+        }
+
+
+def _result_rows(result: ReconciliationResult) -> Iterable[dict]:
+    # Straight from the records, without building the nested response.
+    for txn, inv, confidence, reason, _ in result.matches():
+        yield {
+            "status": "matched",
+            "transaction_id": txn.id, "payer_name": txn.payer_name, "transaction_amount": txn.amount,
+            "invoice_id": inv.id, "customer_name": inv.customer_name, "invoice_amount": inv.amount,
+            "confidence": confidence, "reason": reason,
+        }
+    for u in result.unmatched_transactions():
+        yield {
+            "status": "unmatched_transaction",
+            "transaction_id": u["transaction"]["id"], "payer_name": u["transaction"]["payer_name"],
+            "transaction_amount": u["transaction"]["amount"], "reason": u["reason"],
+        }
+    for u in result.unmatched_invoices():
+        yield {
+            "status": "unmatched_invoice",
+            "invoice_id": u["invoice"]["id"], "customer_name": u["invoice"]["customer_name"],
+            "invoice_amount": u["invoice"]["amount"], "reason": u["reason"],
+        }
+
+
+async def _chunks(rows: Iterable[dict] | AsyncIterable[dict], names: tuple[str, ...]) -> AsyncIterator[list[tuple]]:
+    """Rows as tuples in ``names`` order, EXPORT_CHUNK_ROWS at a time."""
+    chunk = []
+    if isinstance(rows, AsyncIterable):
+        async for row in rows:
+            chunk.append(tuple(row.get(n) for n in names))
+            if len(chunk) >= EXPORT_CHUNK_ROWS:
+                yield chunk
+                chunk = []
+    else:
+        for row in rows:
+            chunk.append(tuple(row.get(n) for n in names))
+            if len(chunk) >= EXPORT_CHUNK_ROWS:
+                yield chunk
+                chunk = []
+                await asyncio.sleep(0)  # let other requests run between chunks
+    if chunk:
+        yield chunk
+
+
+async def stream_csv(dataset: str, rows: Iterable[dict] | AsyncIterable[dict]) -> AsyncIterator[bytes]:
+    names = tuple(n for n, _ in COLUMNS[dataset])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    async for chunk in _chunks(rows, names):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _XlsxWriter:
+    def __init__(self, dataset: str, path: str):
+        from openpyxl import Workbook
+
+        self.path = path
+        # Write-only mode streams rows out to the part files as they are
+        # appended instead of keeping cells in memory.
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(dataset)
+        self.sheet.append([n for n, _ in COLUMNS[dataset]])
+
+    def write(self, chunk: list[tuple]) -> None:
+        for row in chunk:
+            self.sheet.append(row)
+
+    def close(self) -> None:
+        self.workbook.save(self.path)
+
+
+class _ArrowWriter:
+    def __init__(self, dataset: str, path: str, fmt: str):
+        import pyarrow as pa
+
+        types = {"str": pa.string(), "float": pa.float64(), "int": pa.int64()}
+        self.pa = pa
+        self.schema = pa.schema([(n, types[t]) for n, t in COLUMNS[dataset]])
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pa.ipc.new_stream(path, self.schema)
+
+    def write(self, chunk: list[tuple]) -> None:
+        # One record batch (a Parquet row group) per chunk.
+        columns = []
+        for values, field in zip(zip(*chunk), self.schema):
+            if field.type == self.pa.string():
+                values = [None if v is None else str(v) for v in values]
+            columns.append(self.pa.array(values, type=field.type))
+        self.writer.write_batch(self.pa.record_batch(columns, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def check_format(fmt: str) -> str | None:
+    """Why ``fmt`` can't be exported here, or None if it can."""
+    if fmt not in FORMATS:
+        return f"Unknown format: {fmt}. Use one of {', '.join(FORMATS)}"
+    module = {"xlsx": "openpyxl", "parquet": "pyarrow", "arrow": "pyarrow"}.get(fmt)
+    if module:
+        try:
+            __import__(module)
+        except ImportError:
+            return f"{fmt} export needs {module} (pip install {module})"
+    return None
+
+
+def _open_writer(dataset: str, path: str, fmt: str) -> _XlsxWriter | _ArrowWriter:
+    return _XlsxWriter(dataset, path) if fmt == "xlsx" else _ArrowWriter(dataset, path, fmt)
+
+
+async def stream_file(dataset: str, rows: Iterable[dict] | AsyncIterable[dict], fmt: str) -> AsyncIterator[bytes]:
+    """XLSX/Parquet/Arrow: chunks are written to a temp file off the event
+    loop, then the file is streamed out and removed."""
+    names = tuple(n for n, _ in COLUMNS[dataset])
+    fd, path = tempfile.mkstemp(prefix=f"ledgify-{dataset}-", suffix=f".{fmt}")
+    os.close(fd)
+    writer = None
+    try:
+        writer = await asyncio.to_thread(_open_writer, dataset, path, fmt)
+        async for chunk in _chunks(rows, names):
+            await asyncio.to_thread(writer.write, chunk)
+        finished, writer = writer, None
+        await asyncio.to_thread(finished.close)
+        with open(path, "rb") as f:
+            while data := await asyncio.to_thread(f.read, EXPORT_READ_SIZE):
+                yield data
+    finally:
+        if writer is not None:
+            writer.close()  # the client went away mid-export
+        os.unlink(path)
+
+
+def export_stream(dataset: str, rows: Iterable[dict] | AsyncIterable[dict], fmt: str) -> AsyncIterator[bytes]:
+    return stream_csv(dataset, rows) if fmt == "csv" else stream_file(dataset, rows, fmt)
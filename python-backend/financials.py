@@ -0,0 +1,116 @@
+from collections import OrderedDict
+from functools import cached_property
+
+import numpy as np
+
+METRICS = ("revenue", "expenses", "profit", "sales", "cogs", "operating_expenses")
+QUARTERS = ("Q1", "Q2", "Q3", "Q4")
+
+
+def _item(value):
+    """NumPy scalar -> int/float so results serialize like the plain-Python sums did."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class FinancialSeries:
+    """Financial periods stored column-wise: one array per metric.
+
+    ``matrix`` holds every metric side by side (periods x metrics) so
+    totals and rollups are single reductions over it. Derived figures are
+    computed once per series in :attr:`stats` and cached on the instance;
+    a new list of periods gets a new series (see :func:`financial_series`).
+    """
+
+    def __init__(self, labels: list[str], columns: dict[str, np.ndarray]):
+        self.labels = labels
+        self.columns = columns
+        self.matrix = np.column_stack([columns[m] for m in METRICS]) if labels else np.zeros((0, len(METRICS)))
+
+    @classmethod
+    def from_periods(cls, periods: list[dict]) -> "FinancialSeries":
+        labels = [p.get("month", p.get("period", "")) for p in periods]
+        # np.asarray keeps integer metrics as int64, so totals stay ints.
+        columns = {m: np.asarray([p.get(m, 0) for p in periods]) for m in METRICS}
+        return cls(labels, columns)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @cached_property
+    def stats(self) -> dict:
+        n = len(self)
+        revenue, expenses, profit = self.columns["revenue"], self.columns["expenses"], self.columns["profit"]
+        totals = self._row(self.matrix.sum(axis=0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = np.where(revenue != 0, expenses / np.where(revenue != 0, revenue, 1) * 100, 0)
+
+        recent = _item(revenue[-3:].sum())
+        prior = _item(revenue[-6:-3].sum() if n >= 6 else revenue[:3].sum())
+        first, last = (_item(revenue[0]), _item(revenue[-1])) if n else (0, 0)
+        best_rev, worst_rev = (int(revenue.argmax()), int(revenue.argmin())) if n else (None, None)
+        best_profit, worst_profit = (int(profit.argmax()), int(profit.argmin())) if n else (None, None)
+        return {
+            "totals": totals,
+            "margin": round((totals["profit"] / totals["revenue"]) * 100, 1) if totals["revenue"] else 0,
+            "expense_ratios": np.round(ratios, 1).tolist(),
+            "recent_revenue": recent,
+            "prior_revenue": prior,
+            "recent_growth": round(((recent - prior) / prior) * 100, 1) if prior else 0,
+            "period_growth": round(((last - first) / first) * 100, 1) if first else 0,
+            "best_revenue": best_rev,
+            "worst_revenue": worst_rev,
+            "best_profit": best_profit,
+            "worst_profit": worst_profit,
+        }
+
+    def _row(self, row: np.ndarray) -> dict:
+        # The matrix is float when any metric is; integer metrics go back
+        # to int so totals serialize as they did before.
+        return {
+            m: int(v) if self.columns[m].dtype.kind in "iu" else float(v)
+            for m, v in zip(METRICS, row.tolist())
+        }
+
+    def column(self, metric: str) -> list:
+        return self.columns[metric].tolist()
+
+    @cached_property
+    def quarters(self) -> list[dict]:
+        """Q1-Q4 over the first twelve periods; missing months count as zero."""
+        padded = np.zeros((12, len(METRICS)), dtype=self.matrix.dtype)
+        head = self.matrix[:12]
+        padded[: len(head)] = head
+        sums = padded.reshape(4, 3, len(METRICS)).sum(axis=1)
+        return [
+            {"period": label, **self._row(row)}
+            for label, row in zip(QUARTERS, sums)
+        ]
+
+    def group_sum(self, keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Sum every metric per distinct key; returns (keys, sums) in key order."""
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) if len(keys) else np.array([], int)
+        sums = np.add.reduceat(self.matrix[order], starts, axis=0) if len(keys) else self.matrix[:0]
+        return sorted_keys[starts], sums
+
+
+_series: OrderedDict[int, tuple[list, FinancialSeries]] = OrderedDict()
+_MAX_SERIES = 16
+
+
+def financial_series(periods: list[dict]) -> FinancialSeries:
+    """Columnar view of a period list, built once per list object.
+
+    Demo period lists are replaced on write rather than edited, so the
+    list's identity is enough to know the cached series is current.
+    """
+    cached = _series.get(id(periods))
+    if cached is not None and cached[0] is periods:
+        _series.move_to_end(id(periods))
+        return cached[1]
+    series = FinancialSeries.from_periods(periods)
+    _series[id(periods)] = (periods, series)
+    if len(_series) > _MAX_SERIES:
+        _series.popitem(last=False)
+    return series
@@ -0,0 +1,311 @@
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from datetime import datetime, timezone
+
+from financials import FinancialSeries, financial_series
+from reconciliation import ReconciliationResult
+
+INSIGHTS_MAX_SNAPSHOTS = int(os.getenv("INSIGHTS_MAX_SNAPSHOTS", "256"))
+
+SOURCES = ("invoices", "transactions", "periods", "monthly")
+SUMMARY_KEYS = (
+    "total_revenue", "total_profit", "total_expenses", "avg_margin", "total_overdue",
+    "overdue_count", "avg_days_overdue", "collection_rate", "revenue_growth",
+)
+_NO_PERIODS = FinancialSeries.from_periods([])
+
+
+# Each part reads the inputs dict and returns a fragment of the response:
+# ``summary`` fields, a ``card``, or top-level sections. Cards appear in
+# the order of PARTS.
+
+def _overdue(inputs: dict) -> dict:
+    invoices = inputs["invoices"]
+    top_overdue = sorted(invoices, key=lambda x: x["amount"], reverse=True)[:5]
+    return {
+        "summary": {
+            "total_overdue": sum(inv["amount"] for inv in invoices),
+            "overdue_count": len(invoices),
+            "avg_days_overdue": round(sum(inv["days_overdue"] for inv in invoices) / len(invoices)) if invoices else 0,
+        },
+        "top_overdue_customers": [
+            {
+                "name": inv["customer_name"],
+                "amount": inv["amount"],
+                "days_overdue": inv["days_overdue"],
+                "invoice_id": inv["id"],
+            }
+            for inv in top_overdue
+        ],
+    }
+
+
+def _financials(inputs: dict) -> dict:
+    series = inputs["periods"]
+    stats = series.stats
+    return {
+        "summary": {
+            "total_revenue": stats["totals"]["revenue"],
+            "total_profit": stats["totals"]["profit"],
+            "total_expenses": stats["totals"]["expenses"],
+            "avg_margin": stats["margin"],
+            "revenue_growth": stats["recent_growth"],
+        },
+        "charts": {
+            "months": series.labels,
+            "revenue": series.column("revenue"),
+            "profit": series.column("profit"),
+            "expenses": series.column("expenses"),
+            "expense_ratios": stats["expense_ratios"],
+        },
+    }
+
+
+def _collection_rate(inputs: dict) -> dict:
+    monthly = inputs["monthly"]
+    if monthly is None:
+        return {"summary": {"collection_rate": 0}}
+    receivables = monthly["collected"] + monthly["outstanding"]
+    collection_rate = round((monthly["collected"] / receivables) * 100, 1) if receivables > 0 else 0
+    return {
+        "summary": {"collection_rate": collection_rate},
+        "card": {
+            "type": "metric",
+            "severity": "info" if collection_rate > 70 else "warning",
+            "title": "Cash Collection Rate",
+            "value": f"{collection_rate}%",
+            "description": f"You collected ${monthly['collected']:,.0f} out of ${receivables:,.0f} total receivables this month.",
+            "suggestion": "Consider automated payment reminders for outstanding invoices." if collection_rate < 80 else "Strong collection rate. Keep it up!",
+        },
+    }
+
+
+def _critical_overdue(inputs: dict) -> dict:
+    critically_overdue = [inv for inv in inputs["invoices"] if inv["days_overdue"] > 30]
+    if not critically_overdue:
+        return {}
+    return {"card": {
+        "type": "warning",
+        "severity": "critical",
+        "title": "Critical Overdue Invoices",
+        "value": f"{len(critically_overdue)} invoices",
+        "description": f"${sum(i['amount'] for i in critically_overdue):,.0f} is severely overdue (30+ days). Customers: {', '.join(i['customer_name'] for i in critically_overdue)}.",
+        "suggestion": "Send final-notice emails immediately and consider escalating to collections.",
+    }}
+
+
+def _revenue_growth(inputs: dict) -> dict:
+    series = inputs["periods"]
+    if not len(series):
+        return {}
+    stats = series.stats
+    rev_growth = stats["recent_growth"]
+    return {"card": {
+        "type": "trend",
+        "severity": "success" if rev_growth > 0 else "warning",
+        "title": "Revenue Growth Trend",
+        "value": f"{'+' if rev_growth > 0 else ''}{rev_growth}%",
+        "description": f"Recent 3-month revenue (${stats['recent_revenue']:,.0f}) vs prior 3-month (${stats['prior_revenue']:,.0f}).",
+        "suggestion": "Revenue is accelerating — invest in scaling operations." if rev_growth > 10 else "Revenue growth is slowing. Review pricing strategy and lead generation." if rev_growth < 5 else "Steady growth. Monitor for seasonal patterns.",
+    }}
+
+
+def _profit_margin(inputs: dict) -> dict:
+    series = inputs["periods"]
+    if not len(series):
+        return {}
+    stats = series.stats
+    avg_margin = stats["margin"]
+    return {"card": {
+        "type": "metric",
+        "severity": "success" if avg_margin > 35 else "warning" if avg_margin > 20 else "critical",
+        "title": "Average Profit Margin",
+        "value": f"{avg_margin}%",
+        "description": f"Full-year profit of ${stats['totals']['profit']:,.0f} on ${stats['totals']['revenue']:,.0f} revenue.",
+        "suggestion": "Healthy margins. Consider reinvesting in growth." if avg_margin > 35 else "Margins are thin. Look for cost optimization opportunities.",
+    }}
+
+
+def _expense_ratio(inputs: dict) -> dict:
+    series = inputs["periods"]
+    if not len(series):
+        return {}
+    expense_ratios = series.stats["expense_ratios"]
+    recent_expense_ratio = expense_ratios[-1] if expense_ratios else 0
+    early_expense_ratio = expense_ratios[0] if expense_ratios else 0
+    expense_trend_direction = "increasing" if recent_expense_ratio > early_expense_ratio else "decreasing"
+    return {"card": {
+        "type": "trend",
+        "severity": "warning" if expense_trend_direction == "increasing" else "success",
+        "title": "Expense Ratio Trend",
+        "value": f"{recent_expense_ratio}%",
+        "description": f"Expenses as % of revenue moved from {early_expense_ratio}% to {recent_expense_ratio}% over the year.",
+        "suggestion": "Expense ratio is creeping up. Review line items for cost savings." if expense_trend_direction == "increasing" else "Good cost management — expenses are growing slower than revenue.",
+    }}
+
+
+def _match_rate(inputs: dict) -> dict:
+    reconciliation = inputs.get("reconciliation")
+    if reconciliation is None:
+        return {}
+    if isinstance(reconciliation, dict):
+        matched_count, unmatched_txn, unmatched_inv = (
+            len(reconciliation.get(part, [])) for part in ("matched", "unmatched_transactions", "unmatched_invoices")
+        )
+    else:
+        matched_count, unmatched_txn, unmatched_inv = reconciliation.counts()
+    total_recon = matched_count + unmatched_txn + unmatched_inv
+    match_rate = round((matched_count / total_recon) * 100) if total_recon else 0
+    return {"card": {
+        "type": "metric",
+        "severity": "success" if match_rate > 80 else "warning",
+        "title": "Payment Match Rate",
+        "value": f"{match_rate}%",
+        "description": f"{matched_count} of {total_recon} items matched. {unmatched_txn} unmatched payments, {unmatched_inv} unmatched invoices.",
+        "suggestion": "Review unmatched items to ensure all payments are accounted for." if match_rate < 100 else "Perfect match rate!",
+    }}
+
+
+def _peak_month(inputs: dict) -> dict:
+    series = inputs["periods"]
+    if not len(series):
+        return {}
+    stats = series.stats
+    profit = series.column("profit")
+    best, worst = stats["best_profit"], stats["worst_profit"]
+    best_month, worst_month = series.labels[best], series.labels[worst]
+    return {"card": {
+        "type": "tip",
+        "severity": "info",
+        "title": "Peak Performance Month",
+        "value": best_month,
+        "description": f"Best: {best_month} (${profit[best]:,.0f} profit). Worst: {worst_month} (${profit[worst]:,.0f} profit).",
+        "suggestion": f"Analyze what drove {best_month}'s success and replicate those strategies.",
+    }}
+
+
+def _days_to_pay(inputs: dict) -> dict:
+    monthly = inputs["monthly"]
+    if monthly is None:
+        return {}
+    return {"card": {
+        "type": "metric",
+        "severity": "success" if monthly["avg_days_to_pay"] < 20 else "warning",
+        "title": "Average Days to Pay",
+        "value": f"{monthly['avg_days_to_pay']} days",
+        "description": f"Customers take an average of {monthly['avg_days_to_pay']} days to pay invoices.",
+        "suggestion": "Consider offering early payment discounts to reduce DSO." if monthly["avg_days_to_pay"] > 15 else "Excellent payment velocity!",
+    }}
+
+
+# name -> (sources it depends on, builder)
+PARTS: dict[str, tuple[tuple[str, ...], Callable[[dict], dict]]] = {
+    "overdue": (("invoices",), _overdue),
+    "financials": (("periods",), _financials),
+    "collection_rate": (("monthly",), _collection_rate),
+    "critical_overdue": (("invoices",), _critical_overdue),
+    "revenue_growth": (("periods",), _revenue_growth),
+    "profit_margin": (("periods",), _profit_margin),
+    "expense_ratio": (("periods",), _expense_ratio),
+    "match_rate": (("invoices", "transactions"), _match_rate),
+    "peak_month": (("periods",), _peak_month),
+    "days_to_pay": (("monthly",), _days_to_pay),
+}
+
+
+def _assemble(parts: dict[str, dict]) -> dict:
+    summary = {}
+    for fragment in parts.values():
+        summary.update(fragment.get("summary", {}))
+    return {
+        "summary": {key: summary[key] for key in SUMMARY_KEYS},
+        "insights": [parts[name]["card"] for name in PARTS if "card" in parts[name]],
+        "top_overdue_customers": parts["overdue"]["top_overdue_customers"],
+        "charts": parts["financials"]["charts"],
+    }
+
+
+def build_insights(
+    invoices: list[dict],
+    monthly: dict | None,
+    financial: list[dict] | FinancialSeries,
+    reconciliation: dict | ReconciliationResult | None,
+) -> dict:
+    """Aggregate all data sources and generate actionable insights.
+
+    Only ``invoices`` is required. Cards that depend on a missing source
+    (``monthly``/``reconciliation`` of None, an empty ``financial``) are
+    left out, so a live dashboard can still render when one upstream fetch
+    fails or is too slow.
+    """
+    if not isinstance(financial, FinancialSeries):
+        financial = financial_series(financial)
+    inputs = {"invoices": invoices, "monthly": monthly, "periods": financial, "reconciliation": reconciliation}
+    return _assemble({name: build(inputs) for name, (_, build) in PARTS.items()})
+
+
+class _Snapshot:
+    def __init__(self):
+        self.sources: dict[str, object] = {}
+        self.parts: dict[str, dict] = {}
+        self.result: dict | None = None
+
+
+class MaterializedInsights:
+    """Insights results kept per key (connection and period).
+
+    Sources are compared by identity with the ones the snapshot was built
+    from: the cached lists and demo overrides they come from are replaced
+    on change, never edited. Only the parts that depend on a changed
+    source are rebuilt; when nothing changed the stored result is returned
+    as is. ``as_of`` in the result is when it last changed.
+    """
+
+    def __init__(self, max_snapshots: int = INSIGHTS_MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        self._snapshots: OrderedDict[tuple, _Snapshot] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stale(self, key: tuple, sources: dict) -> set[str]:
+        """Names of the parts a :meth:`get` with these sources would rebuild."""
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            return set(PARTS)
+        changed = {name for name in SOURCES if snapshot.sources.get(name) is not sources.get(name)}
+        if not changed:
+            return changed
+        return {name for name, (deps, _) in PARTS.items() if changed.intersection(deps)}
+
+    def get(self, key: tuple, sources: dict, reconciliation: dict | ReconciliationResult | None = None) -> dict:
+        """``sources`` maps SOURCES to their current objects (``periods`` as a
+        FinancialSeries); ``reconciliation`` is only read when the match-rate
+        card is stale, so callers can skip computing it otherwise."""
+        with self._lock:
+            stale = self.stale(key, sources)
+            snapshot = self._snapshots.get(key) or _Snapshot()
+            if stale:
+                inputs = {**sources, "reconciliation": reconciliation}
+                if inputs.get("periods") is None:
+                    inputs["periods"] = _NO_PERIODS
+                for name in stale:
+                    snapshot.parts[name] = PARTS[name][1](inputs)
+                snapshot.sources = {name: sources.get(name) for name in SOURCES}
+                snapshot.result = {
+                    **_assemble(snapshot.parts),
+                    "as_of": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                }
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+            return snapshot.result
+
+    def invalidate(self, *prefix) -> None:
+        with self._lock:
+            for key in [k for k in self._snapshots if k[: len(prefix)] == prefix]:
+                del self._snapshots[key]
+
+
+materialized_insights = MaterializedInsights()
@@ -0,0 +1,374 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Callable, Iterable
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+from records import Invoice, Transaction
+from reconciliation import ReconciliationResult, fuzzy_reconcile
+
+LEDGER_PATH = Path(os.getenv("RECONCILIATION_LEDGER_PATH", Path(__file__).parent / "reconciliation_ledger.db"))
+# Transactions older than this many days, and the matches they settled, age
+# out of the ledger and the response. 0 keeps the whole history.
+LEDGER_WINDOW_DAYS = int(os.getenv("RECONCILIATION_WINDOW_DAYS", "30"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,              -- 'invoice' or 'transaction'
+    record_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    digest BLOB NOT NULL,
+    dated TEXT NOT NULL,             -- transaction date, for aging out
+    payload TEXT NOT NULL,
+    PRIMARY KEY (scope, kind, record_id)
+);
+CREATE TABLE IF NOT EXISTS matches (
+    scope TEXT NOT NULL,
+    transaction_id TEXT NOT NULL,
+    invoice_id TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    match_reason TEXT NOT NULL,
+    grp TEXT,
+    matched_at TEXT NOT NULL,
+    PRIMARY KEY (scope, transaction_id, invoice_id)
+);
+CREATE INDEX IF NOT EXISTS matches_by_invoice ON matches (scope, invoice_id);
+CREATE TABLE IF NOT EXISTS watermarks (
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (scope, kind)
+);
+"""
+_SCHEMA_VERSION = 2
+
+# Stored records that are not on either side of an accepted match.
+_OPEN = {
+    "invoice": "SELECT record_id, payload FROM records r WHERE scope = ? AND kind = 'invoice' AND NOT EXISTS "
+    "(SELECT 1 FROM matches m WHERE m.scope = r.scope AND m.invoice_id = r.record_id)",
+    "transaction": "SELECT record_id, payload FROM records r WHERE scope = ? AND kind = 'transaction' AND NOT EXISTS "
+    "(SELECT 1 FROM matches m WHERE m.scope = r.scope AND m.transaction_id = r.record_id)",
+}
+
+# Fields whose change can alter a match; anything else (e.g. days_overdue
+# ticking up) is refreshed in place without rescoring.
+_MATCH_FIELDS = {
+    "invoice": ("customer_name", "amount", "currency", "status"),
+    "transaction": ("payer_name", "amount", "reference"),
+}
+_WATERMARK_FIELDS = {
+    "invoice": ("updated_at", "due_date"),
+    "transaction": ("updated_at", "date"),
+}
+
+
+def _fingerprint(kind: str, record: dict) -> str:
+    key = json.dumps([record.get(field) for field in _MATCH_FIELDS[kind]], default=str)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _digest(payload: str) -> bytes:
+    return hashlib.blake2b(payload.encode(), digest_size=16).digest()
+
+
+_RECORD_TYPES = {"invoice": Invoice, "transaction": Transaction}
+
+
+def _dated(kind: str, record: dict) -> str:
+    if kind != "transaction":
+        return ""
+    return str(record.get("date") or record.get("updated_at") or "")
+
+
+def _watermark(kind: str, record: dict) -> str:
+    for field in _WATERMARK_FIELDS[kind]:
+        if record.get(field):
+            return str(record[field])
+    return ""
+
+
+class ReconciliationLedger:
+    """Persisted reconciliation state for one or more connection pairs.
+
+    The ledger keeps the invoices and transactions it has seen within the
+    last ``window_days``, the matches that were accepted, and the newest
+    ``updated_at``/date per record kind. :meth:`run` only loads and scores
+    records that are new, changed, or released from a broken match against
+    the still-open set, so the cost of a run follows the daily delta instead
+    of the full history. Transactions that fall out of the window take their
+    matches with them; ``window_days=0`` keeps everything.
+    """
+
+    def __init__(self, path: Path | str = LEDGER_PATH, window_days: int = LEDGER_WINDOW_DAYS):
+        self.path = Path(path)
+        self.window_days = window_days
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        with self._connect() as conn:
+            # The ledger only mirrors upstream state, so an older layout is
+            # dropped and rebuilt by the next run rather than migrated.
+            if conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                for table in ("records", "matches", "watermarks"):
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            conn.executescript(_SCHEMA)
+
+    def _lock(self, scope: str) -> threading.Lock:
+        # Runs may come from several compute threads; one scope at a time.
+        with self._locks_guard:
+            return self._locks.setdefault(scope, threading.Lock())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def watermark(self, scope: str, kind: str) -> str | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM watermarks WHERE scope = ? AND kind = ?", (scope, kind)
+            ).fetchone()
+        return row[0] if row else None
+
+    def reset(self, scope: str) -> None:
+        with self._lock(scope), self._connect() as conn:
+            for table in ("records", "matches", "watermarks"):
+                conn.execute(f"DELETE FROM {table} WHERE scope = ?", (scope,))
+
+    def snapshot(self, scope: str) -> ReconciliationResult:
+        """The state left by the last :meth:`run` for ``scope``, read without writing.
+
+        Nothing is fetched, expired or rescored; transactions that have aged
+        out of the window since then are just left out.
+        """
+        cutoff = (date.today() - timedelta(days=self.window_days)).isoformat() if self.window_days else ""
+        with self._lock(scope), self._connect() as conn:
+            records = {kind: {} for kind in _RECORD_TYPES}
+            for kind, record_id, dated, payload in conn.execute(
+                "SELECT kind, record_id, dated, payload FROM records WHERE scope = ?", (scope,)
+            ):
+                if not (cutoff and dated and dated < cutoff):
+                    records[kind][record_id] = _RECORD_TYPES[kind].from_dict(json.loads(payload))
+            matches = {
+                (txn_id, inv_id): (confidence, reason, group)
+                for txn_id, inv_id, confidence, reason, group in conn.execute(
+                    "SELECT transaction_id, invoice_id, confidence, match_reason, grp FROM matches WHERE scope = ?",
+                    (scope,),
+                )
+                if txn_id in records["transaction"] and inv_id in records["invoice"]
+            }
+        return self._result(matches, records)
+
+    def run(
+        self,
+        scope: str,
+        invoices: Iterable[dict],
+        transactions: Iterable[dict],
+        invoices_complete: bool = True,
+        transactions_complete: bool = False,
+        assignment: str = "greedy",
+        reconcile: Callable[..., ReconciliationResult] = fuzzy_reconcile,
+    ) -> ReconciliationResult:
+        """Fold freshly fetched records into the ledger and reconcile the delta.
+
+        ``*_complete`` says whether a list is the full current set for that
+        kind. Open records missing from a complete list (e.g. an invoice
+        that is no longer overdue) are dropped; for a partial list, such as
+        transactions fetched since the watermark, they are kept. Each
+        iterable is consumed once. Records are held as compact
+        :mod:`records` objects; stored payloads are only kept as digests.
+        ``reconcile`` does the matching, :func:`fuzzy_reconcile` by default.
+        """
+        with self._lock(scope):
+            return self._run(
+                scope, invoices, transactions, invoices_complete, transactions_complete, assignment, reconcile
+            )
+
+    def _run(self, scope, invoices, transactions, invoices_complete, transactions_complete, assignment, reconcile):
+        with self._connect() as conn:
+            dirty = {"invoice": set(), "transaction": set()}
+            cutoff = None
+            if self.window_days:
+                cutoff = (date.today() - timedelta(days=self.window_days)).isoformat()
+                # Invoices whose paying transaction aged out are open again.
+                dirty["invoice"] |= self._expire(conn, scope, cutoff)
+
+            stored = {
+                (kind, record_id): (fingerprint, digest)
+                for kind, record_id, fingerprint, digest in conn.execute(
+                    "SELECT kind, record_id, fingerprint, digest FROM records WHERE scope = ?", (scope,)
+                )
+            }
+            matches = {
+                (txn_id, inv_id): (confidence, reason, group)
+                for txn_id, inv_id, confidence, reason, group in conn.execute(
+                    "SELECT transaction_id, invoice_id, confidence, match_reason, grp FROM matches WHERE scope = ?",
+                    (scope,),
+                )
+            }
+            # Settled records stay on disk; only the open ones are parsed.
+            records = {
+                kind: {
+                    record_id: _RECORD_TYPES[kind].from_dict(json.loads(payload))
+                    for record_id, payload in conn.execute(_OPEN[kind], (scope,))
+                }
+                for kind in _OPEN
+            }
+
+            matched_ids = {
+                "transaction": {txn_id for txn_id, _ in matches},
+                "invoice": {inv_id for _, inv_id in matches},
+            }
+
+            for kind, fetched, complete in (
+                ("invoice", invoices, invoices_complete),
+                ("transaction", transactions, transactions_complete),
+            ):
+                fetched_ids = set()
+                upserts = []
+                newest = ""
+                for record in fetched:
+                    dated = _dated(kind, record)
+                    if cutoff and dated and dated[:10] < cutoff:
+                        continue
+                    record_id = str(record.get("id", ""))
+                    fetched_ids.add(record_id)
+                    fingerprint = _fingerprint(kind, record)
+                    payload = json.dumps(record, default=str)
+                    digest = _digest(payload)
+                    previous = stored.get((kind, record_id))
+                    if previous is None or previous[0] != fingerprint:
+                        dirty[kind].add(record_id)
+                    if previous is None or previous[1] != digest:
+                        upserts.append((scope, kind, record_id, fingerprint, digest, dated, payload))
+                    records[kind][record_id] = _RECORD_TYPES[kind].from_dict(record)
+                    newest = max(newest, _watermark(kind, record))
+                conn.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?)", upserts)
+                conn.execute(
+                    "INSERT INTO watermarks VALUES (?, ?, ?) ON CONFLICT (scope, kind) "
+                    "DO UPDATE SET value = max(value, excluded.value)",
+                    (scope, kind, newest),
+                )
+                if complete:
+                    # Matched records leave the open lists once they are
+                    # settled (a paid invoice is no longer overdue); keep them.
+                    for record_id in list(records[kind]):
+                        if record_id not in fetched_ids and record_id not in matched_ids[kind]:
+                            del records[kind][record_id]
+                            dirty[kind].discard(record_id)
+                            conn.execute(
+                                "DELETE FROM records WHERE scope = ? AND kind = ? AND record_id = ?",
+                                (scope, kind, record_id),
+                            )
+
+            # A change on either side of an accepted match voids it, and the
+            # other side goes back into the delta.
+            for txn_id, inv_id in list(matches):
+                if txn_id in dirty["transaction"] or inv_id in dirty["invoice"]:
+                    del matches[(txn_id, inv_id)]
+                    conn.execute(
+                        "DELETE FROM matches WHERE scope = ? AND transaction_id = ? AND invoice_id = ?",
+                        (scope, txn_id, inv_id),
+                    )
+                    dirty["transaction"].add(txn_id)
+                    dirty["invoice"].add(inv_id)
+            for kind in records:
+                self._load(conn, scope, kind, dirty[kind] - records[kind].keys(), records[kind])
+
+            settled_txns = {txn_id for txn_id, _ in matches}
+            settled_invs = {inv_id for _, inv_id in matches}
+            open_txns = [txn for txn_id, txn in records["transaction"].items() if txn_id not in settled_txns]
+            open_invs = [inv for inv_id, inv in records["invoice"].items() if inv_id not in settled_invs]
+
+            # New/changed transactions against every open invoice, then
+            # new/changed invoices against the older open transactions that
+            # have already failed against everything else.
+            delta_txns = [txn for txn in open_txns if str(txn.id) in dirty["transaction"]]
+            old_txns = [txn for txn in open_txns if str(txn.id) not in dirty["transaction"]]
+            fresh = list(reconcile(open_invs, delta_txns, assignment=assignment).matches()) if delta_txns else []
+            claimed = {str(inv.id) for _, inv, *_ in fresh}
+            delta_invs = [
+                inv for inv in open_invs
+                if str(inv.id) in dirty["invoice"] and str(inv.id) not in claimed
+            ]
+            if delta_invs and old_txns:
+                fresh += reconcile(delta_invs, old_txns, assignment=assignment).matches()
+
+            now = datetime.now(timezone.utc).isoformat()
+            for txn, inv, confidence, reason, group in fresh:
+                key = (str(txn.id), str(inv.id))
+                matches[key] = (confidence, reason, group)
+                conn.execute(
+                    "INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (scope, *key, *matches[key], now),
+                )
+
+            # The response lists every match still inside the window, so the
+            # settled records behind them are read back for it.
+            self._load(conn, scope, "transaction", settled_txns - records["transaction"].keys(), records["transaction"])
+            self._load(conn, scope, "invoice", settled_invs - records["invoice"].keys(), records["invoice"])
+
+        return self._result(matches, records)
+
+    @staticmethod
+    def _expire(conn: sqlite3.Connection, scope: str, cutoff: str) -> set[str]:
+        """Drop transactions dated before ``cutoff`` and their matches; return the released invoice ids."""
+        expired = "SELECT record_id FROM records WHERE scope = ? AND kind = 'transaction' AND dated != '' AND dated < ?"
+        released = {
+            inv_id for (inv_id,) in conn.execute(
+                f"SELECT invoice_id FROM matches WHERE scope = ? AND transaction_id IN ({expired})",
+                (scope, scope, cutoff),
+            )
+        }
+        conn.execute(f"DELETE FROM matches WHERE scope = ? AND transaction_id IN ({expired})", (scope, scope, cutoff))
+        conn.execute(
+            "DELETE FROM records WHERE scope = ? AND kind = 'transaction' AND dated != '' AND dated < ?",
+            (scope, cutoff),
+        )
+        return released
+
+    @staticmethod
+    def _load(conn: sqlite3.Connection, scope: str, kind: str, ids: set[str], into: dict) -> None:
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for record_id, payload in conn.execute(
+                f"SELECT record_id, payload FROM records WHERE scope = ? AND kind = ? "
+                f"AND record_id IN ({', '.join('?' * len(chunk))})",
+                (scope, kind, *chunk),
+            ):
+                into[record_id] = _RECORD_TYPES[kind].from_dict(json.loads(payload))
+
+    @staticmethod
+    def _result(matches: dict, records: dict) -> ReconciliationResult:
+        transactions, invoices = list(records["transaction"].values()), list(records["invoice"].values())
+        txn_pos = {txn_id: t for t, txn_id in enumerate(records["transaction"])}
+        inv_pos = {inv_id: i for i, inv_id in enumerate(records["invoice"])}
+        ordered = sorted(matches.items())
+        groups = {k: group for k, (_, (_, _, group)) in enumerate(ordered) if group}
+        return ReconciliationResult(
+            invoices,
+            transactions,
+            np.array([txn_pos[txn_id] for (txn_id, _), _ in ordered], dtype=np.int64),
+            np.array([inv_pos[inv_id] for (_, inv_id), _ in ordered], dtype=np.int64),
+            np.array([confidence for _, (confidence, _, _) in ordered], dtype=np.float64),
+            np.zeros(len(ordered), dtype=np.uint8),
+            groups,
+            reasons=[reason for _, (_, reason, _) in ordered],
+        )
+
+
+_ledger: ReconciliationLedger | None = None
+
+
+def get_ledger() -> ReconciliationLedger:
+    global _ledger
+    if _ledger is None:
+        _ledger = ReconciliationLedger()
+    return _ledger
@@ -1,18 +1,20 @@
+import json
 import os
-from typing import List
-from fastapi import FastAPI, Query
-from fastapi.responses import HTMLResponse
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import List, Literal
+import httpx
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from dotenv import load_dotenv
-from rapidfuzz import fuzz
 
 load_dotenv()
 
 from demo_data import (
     is_demo_mode,
     get_demo_reconciliation,
-    get_demo_financial_analysis,
     get_demo_insights,
     get_demo_invoices,
     get_demo_transactions,
@@ -23,13 +25,48 @@ from demo_data import (
     set_demo_monthly_summary,
     set_demo_financial_periods,
     reset_demo_data,
+    flush_demo_overrides,
+)
+from data.cache import unified_cache
+from data.client import close_client, get_client
+from data.accounting import (
+    get_overdue_invoices,
+    get_invoice_by_id,
+    get_invoices_by_id,
+    get_ledger_timeseries,
+    get_monthly_stats,
+    iter_overdue_invoices,
 )
-from data.accounting import get_overdue_invoices, get_invoice_by_id, get_monthly_stats
 from data.messaging import send_email
-from data.payments import get_recent_transactions
-from agent import run_agent
-
-app = FastAPI(title="Ledgify API", version="1.0.0")
+from data.fanout import fan_out
+from data.payments import get_recent_transactions, iter_recent_transactions
+from drafting import close_openai_client, draft_cache, draft_stream, encode_event, generate_email
+from insights import materialized_insights
+from ledger import get_ledger
+from reconciliation import ReconciliationResult
+from export import COLUMNS as EXPORT_COLUMNS, FORMATS as EXPORT_FORMATS, check_format, export_stream, reconciliation_rows
+from outbox import get_outbox
+from responses import JSONResponse, json_response, serialized_payloads
+from timeseries import TIMEFRAMES, financial_analysis as build_financial_analysis, min_year
+from agent import agent_pool, run_agent, stream_agent
+from compute import ComputeSaturated, compute
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_client()
+    await get_outbox().start()
+    agent_pool.start()
+    yield
+    await agent_pool.close()
+    await get_outbox().stop()
+    await close_client()
+    await close_openai_client()
+    compute.shutdown()
+    flush_demo_overrides()
+
+
+app = FastAPI(title="Ledgify API", version="1.0.0", lifespan=lifespan, default_response_class=JSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -40,8 +77,22 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(ComputeSaturated)
+async def compute_saturated(request: Request, exc: ComputeSaturated):
+    return JSONResponse({"status": "error", "message": str(exc)}, status_code=429, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(httpx.HTTPError)
+async def upstream_failed(request: Request, exc: httpx.HTTPError):
+    # Unified API failures (refused connections, 5xx after retries, ...).
+    return JSONResponse({"status": "error", "message": f"Upstream error: {exc}"}, status_code=502)
+
+
 # --- Pydantic models ---
 
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"  # YYYY-MM; anything else is rejected with a 422
+
+
 class OverdueRequest(BaseModel):
     connection_id: str = "demo"
     min_days_overdue: int = 0
@@ -53,9 +104,19 @@ class FollowUpRequest(BaseModel):
     tone: str = "friendly"  # friendly, firm, final-notice
 
 
+class BatchFollowUpRequest(BaseModel):
+    connection_id: str = "demo"
+    invoice_ids: List[str] | None = None  # or select by min_days_overdue
+    min_days_overdue: int = 0
+    tone: str = "friendly"
+    format: str = "ndjson"  # ndjson or sse
+
+
 class ReconcileRequest(BaseModel):
     accounting_connection_id: str = "demo"
     payment_connection_id: str = "demo"
+    assignment: Literal["greedy", "optimal"] = "greedy"
+    full_refresh: bool = False  # forget persisted matches and reconcile from scratch
 
 
 class ConfirmSendRequest(BaseModel):
@@ -64,6 +125,7 @@ class ConfirmSendRequest(BaseModel):
     to: str
     subject: str
     body: str
+    idempotency_key: str | None = None  # defaults to a hash of the message
 
 
 class AgentRequest(BaseModel):
@@ -73,182 +135,31 @@ class AgentRequest(BaseModel):
 
 class FinancialAnalysisRequest(BaseModel):
     connection_id: str = "demo"
-    timeframe: str = "monthly"  # monthly or quarterly
-    year: int = 2026
+    timeframe: str = "monthly"  # daily, weekly, monthly, quarterly or yearly
+    year: int = Field(2026, ge=1, le=9999)
+    window: int = 0  # rolling sums over this many periods when > 1
+    compare_prior_year: bool = False
+
+    @model_validator(mode="after")
+    def _year_covers_timeframe(self):
+        if self.year < min_year(self.timeframe):
+            raise ValueError(f"year must be at least {min_year(self.timeframe)} for the {self.timeframe} view")
+        return self
 
 
 class InsightsRequest(BaseModel):
     connection_id: str = "demo"
-
-
-# --- Email generation ---
-
-EMAIL_TEMPLATES = {
-    "friendly": {
-        "subject": "Friendly Reminder: Invoice {invoice_id} — ${amount:.2f} Past Due",
-        "body": (
-            "Hi {customer_name},\n\n"
-            "I hope this message finds you well! I wanted to send a quick reminder that "
-            "invoice {invoice_id} for ${amount:.2f} was due on {due_date} and is now "
-            "{days_overdue} days past due.\n\n"
-            "Could you please let me know when we can expect payment? If you've already "
-            "sent it, please disregard this note.\n\n"
-            "Thanks so much!\nBest regards"
-        ),
-    },
-    "firm": {
-        "subject": "Payment Required: Invoice {invoice_id} — ${amount:.2f} Overdue",
-        "body": (
-            "Dear {customer_name},\n\n"
-            "This is a follow-up regarding invoice {invoice_id} for ${amount:.2f}, which "
-            "was due on {due_date} and is now {days_overdue} days overdue.\n\n"
-            "We kindly request immediate attention to this matter. Please arrange payment "
-            "at your earliest convenience or contact us to discuss a payment plan.\n\n"
-            "Thank you for your prompt attention.\nRegards"
-        ),
-    },
-    "final-notice": {
-        "subject": "FINAL NOTICE: Invoice {invoice_id} — ${amount:.2f} Severely Overdue",
-        "body": (
-            "Dear {customer_name},\n\n"
-            "This is a final notice regarding invoice {invoice_id} for ${amount:.2f}, "
-            "originally due on {due_date} ({days_overdue} days ago).\n\n"
-            "Despite previous reminders, we have not received payment. If payment is not "
-            "received within 7 business days, we may need to escalate this matter to our "
-            "collections department.\n\n"
-            "Please contact us immediately to resolve this.\nRegards"
-        ),
-    },
-}
-
-
-async def generate_email(invoice: dict, tone: str) -> dict:
-    openai_key = os.getenv("OPENAI_API_KEY")
-
-    if openai_key:
-        try:
-            from openai import AsyncOpenAI
-            client = AsyncOpenAI(api_key=openai_key)
-
-            tone_instructions = {
-                "friendly": "Write in a warm, friendly tone. Be understanding and non-confrontational.",
-                "firm": "Write in a professional, firm tone. Be direct but respectful.",
-                "final-notice": "Write in a serious, urgent tone. Mention potential escalation to collections.",
-            }
-
-            prompt = (
-                f"Write a payment reminder email for an overdue invoice.\n"
-                f"Customer: {invoice['customer_name']}\n"
-                f"Invoice ID: {invoice['id']}\n"
-                f"Amount: ${invoice['amount']:.2f}\n"
-                f"Due date: {invoice['due_date']}\n"
-                f"Days overdue: {invoice['days_overdue']}\n\n"
-                f"Tone: {tone_instructions.get(tone, tone_instructions['friendly'])}\n\n"
-                f"Return the email with a clear subject line on the first line (prefixed with 'Subject: '), "
-                f"followed by a blank line and the body."
-            )
-
-            resp = await client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=500,
-            )
-            content = resp.choices[0].message.content or ""
-            lines = content.strip().split("\n", 2)
-            subject = lines[0].replace("Subject: ", "").strip()
-            body = lines[2].strip() if len(lines) > 2 else content
-
-            return {"subject": subject, "body": body}
-
-        except Exception:
-            pass
-
-    template = EMAIL_TEMPLATES.get(tone, EMAIL_TEMPLATES["friendly"])
-    fmt = {**invoice, "invoice_id": invoice.get("id", "")}
-    return {
-        "subject": template["subject"].format(**fmt),
-        "body": template["body"].format(**fmt),
-    }
-
-
-# --- Reconciliation logic ---
-
-def fuzzy_reconcile(invoices: list[dict], transactions: list[dict]) -> dict:
-    matched = []
-    unmatched_transactions = []
-    matched_invoice_ids = set()
-
-    for txn in transactions:
-        best_match = None
-        best_score = 0.0
-
-        for inv in invoices:
-            name_score = fuzz.ratio(
-                txn.get("payer_name", "").lower(),
-                inv.get("customer_name", "").lower(),
-            ) / 100.0
-
-            txn_amount = txn.get("amount", 0)
-            inv_amount = inv.get("amount", 0)
-            if inv_amount > 0:
-                amount_diff = abs(txn_amount - inv_amount) / inv_amount
-                amount_score = 1.0 if amount_diff <= 0.01 else max(0, 1.0 - amount_diff)
-            else:
-                amount_score = 0.0
-
-            confidence = (name_score * 0.4) + (amount_score * 0.6)
-
-            if confidence > best_score:
-                best_score = confidence
-                best_match = inv
-                best_reason = []
-                if amount_score >= 0.99:
-                    best_reason.append("Amount exact match")
-                elif amount_score > 0.8:
-                    best_reason.append("Amount close match")
-                if name_score > 0.6:
-                    best_reason.append(
-                        f"Name similarity ({inv.get('customer_name', '')} / {txn.get('payer_name', '')})"
-                    )
-
-        if best_match and best_score > 0.6:
-            matched.append({
-                "transaction": txn,
-                "invoice": best_match,
-                "confidence": round(best_score, 2),
-                "match_reason": " + ".join(best_reason),
-            })
-            matched_invoice_ids.add(best_match.get("id"))
-        else:
-            unmatched_transactions.append({
-                "transaction": txn,
-                "reason": f"No invoice found matching amount ${txn.get('amount', 0):,.2f} "
-                          f"or payer '{txn.get('payer_name', 'Unknown')}'",
-            })
-
-    unmatched_invoices = [
-        {
-            "invoice": inv,
-            "reason": f"No payment received for {inv.get('customer_name', '')} "
-                      f"(${inv.get('amount', 0):,.2f}, {inv.get('days_overdue', 0)} days overdue)",
-        }
-        for inv in invoices
-        if inv.get("id") not in matched_invoice_ids
-    ]
-
-    return {
-        "matched": matched,
-        "unmatched_transactions": unmatched_transactions,
-        "unmatched_invoices": unmatched_invoices,
-    }
+    payment_connection_id: str | None = None  # adds the match-rate card for live data
+    # YYYY-MM for the cash-flow cards; defaults to the current month
+    month: str | None = Field(None, pattern=MONTH_PATTERN)
 
 
 # --- Endpoints ---
 
 @app.post("/invoices/overdue")
-async def invoices_overdue(req: OverdueRequest):
+async def invoices_overdue(req: OverdueRequest, request: Request):
     invoices = await get_overdue_invoices(req.connection_id, req.min_days_overdue)
-    return {"invoices": invoices, "count": len(invoices)}
+    return json_response(request, {"invoices": invoices, "count": len(invoices)}, cached=False)
 
 
 @app.post("/email/send-followup")
@@ -266,47 +177,229 @@ async def email_send_followup(req: FollowUpRequest):
     }
 
 
+@app.post("/email/send-followup/batch")
+async def email_send_followup_batch(req: BatchFollowUpRequest):
+    missing = []
+    if req.invoice_ids is not None:
+        found = await get_invoices_by_id(req.connection_id, req.invoice_ids)
+        invoices = [inv for inv in found if inv]
+        missing = [i for i, inv in zip(req.invoice_ids, found) if not inv]
+    else:
+        invoices = await get_overdue_invoices(req.connection_id, req.min_days_overdue)
+
+    async def events():
+        async for event in draft_stream(invoices, req.tone, missing):
+            yield encode_event(event, req.format)
+
+    media_type = "text/event-stream" if req.format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
+
+
+@app.get("/email/metrics")
+async def email_metrics():
+    return draft_cache.stats()
+
+
 @app.post("/email/confirm")
 async def email_confirm(req: ConfirmSendRequest):
-    result = await send_email(
+    if is_demo_mode(req.connection_id):
+        result = await send_email(req.connection_id, req.to, req.subject, req.body)
+        result["invoice_id"] = req.invoice_id
+        return result
+
+    message = await get_outbox().enqueue(
         req.connection_id,
         req.to,
         req.subject,
         req.body,
+        invoice_id=req.invoice_id,
+        key=req.idempotency_key,
     )
-    result["invoice_id"] = req.invoice_id
-    return result
+    return {
+        "status": message["status"],
+        "message": "Email queued for delivery" if message["status"] == "queued" else f"Email already {message['status']}",
+        "invoice_id": req.invoice_id,
+        "message_id": message["id"],
+    }
+
+
+@app.get("/email/outbox")
+async def email_outbox():
+    return await get_outbox().counts()
+
+
+@app.get("/email/outbox/{message_id}")
+async def email_outbox_status(message_id: str):
+    message = await get_outbox().status(message_id)
+    if message is None:
+        return {"status": "error", "message": f"Message {message_id} not found"}
+    return message
 
 
 @app.post("/payments/reconcile")
-async def payments_reconcile(req: ReconcileRequest):
+async def payments_reconcile(req: ReconcileRequest, request: Request):
     if is_demo_mode(req.accounting_connection_id) and is_demo_mode(req.payment_connection_id):
-        return get_demo_reconciliation()
-
-    invoices = await get_overdue_invoices(req.accounting_connection_id)
-    transactions = await get_recent_transactions(req.payment_connection_id)
-    return fuzzy_reconcile(invoices, transactions)
+        return json_response(request, get_demo_reconciliation(), cached=False)
+
+    try:
+        result = await reconcile_live(
+            req.accounting_connection_id,
+            req.payment_connection_id,
+            assignment=req.assignment,
+            full_refresh=req.full_refresh,
+        )
+    except TimeoutError as exc:
+        return {"status": "error", "message": str(exc)}
+    return json_response(request, result.to_dict(), cached=False)
+
+
+async def reconcile_live(
+    accounting_connection_id: str,
+    payment_connection_id: str,
+    assignment: Literal["greedy", "optimal"] = "greedy",
+    full_refresh: bool = False,
+) -> ReconciliationResult:
+    ledger = get_ledger()
+    scope = f"{accounting_connection_id}:{payment_connection_id}"
+    if full_refresh:
+        ledger.reset(scope)
+
+    # Only fetch transactions since the last one the ledger has seen; older
+    # ones are already stored, matched or still open.
+    days = ledger.window_days or 30
+    since = ledger.watermark(scope, "transaction")
+    if since:
+        days = max(1, min(days, (date.today() - date.fromisoformat(since[:10])).days + 1))
+
+    # Both listings come from different connections; fetch them together.
+    fetched, _ = await fan_out({
+        "invoices": lambda: get_overdue_invoices(accounting_connection_id),
+        "transactions": lambda: get_recent_transactions(payment_connection_id, days),
+    })
+    # The ledger does SQLite I/O as well as matching, so it always leaves the
+    # event loop; large matches go on to a worker process.
+    return await compute.run(
+        ledger.run, scope, fetched["invoices"], fetched["transactions"],
+        assignment=assignment, reconcile=compute.reconcile,
+    )
 
 
 @app.get("/summary/monthly")
 async def summary_monthly(
+    request: Request,
     connection_id: str = Query("demo"),
-    month: str = Query("2026-02"),
+    month: str = Query("2026-02", pattern=MONTH_PATTERN),
 ):
     stats = await get_monthly_stats(connection_id, month)
-    return stats
+    return json_response(request, stats)
 
 
 @app.post("/analysis/financial")
-async def financial_analysis(req: FinancialAnalysisRequest):
-    data = get_demo_financial_analysis(req.timeframe, req.year)
-    return data
+async def financial_analysis(req: FinancialAnalysisRequest, request: Request):
+    if req.timeframe not in TIMEFRAMES:
+        return {"status": "error", "message": f"Unknown timeframe: {req.timeframe}"}
+    if not 0 <= req.window <= 366:
+        return {"status": "error", "message": "window must be between 0 and 366 periods"}
+    engine = await get_ledger_timeseries(req.connection_id)
+    analysis = await compute.run(
+        build_financial_analysis, engine, req.year, req.timeframe, req.window, req.compare_prior_year,
+        size=len(engine),
+    )
+    return json_response(request, analysis)
+
+
+@app.get("/export/{dataset}")
+async def export(
+    dataset: str,
+    format: str = Query("csv"),
+    connection_id: str = Query("demo"),
+    payment_connection_id: str = Query("demo"),
+    min_days_overdue: int = Query(0),
+    days: int = Query(30),
+    year: int = Query(2026, ge=1, le=9999),
+    timeframe: str = Query("monthly"),
+):
+    """Stream a dataset as CSV, XLSX, Parquet or Arrow.
+
+    Invoices and transactions are written as their pages arrive, so the
+    export never holds the full listing; ``connection_id`` is the payment
+    connection for ``transactions``. Live reconciliation is exported as the
+    ledger last stored it (see ``POST /payments/reconcile``), without
+    reconciling again.
+    """
+    if dataset not in EXPORT_COLUMNS:
+        return {"status": "error", "message": f"Unknown dataset: {dataset}. Use one of {', '.join(EXPORT_COLUMNS)}"}
+    problem = check_format(format)
+    if problem is None and dataset == "analysis":
+        if timeframe not in TIMEFRAMES:
+            problem = f"Unknown timeframe: {timeframe}"
+        elif year < min_year(timeframe):
+            problem = f"year must be at least {min_year(timeframe)} for the {timeframe} view"
+    if problem:
+        return {"status": "error", "message": problem}
+
+    if dataset == "invoices":
+        rows = iter_overdue_invoices(connection_id, min_days_overdue)
+    elif dataset == "transactions":
+        rows = iter_recent_transactions(connection_id, days)
+    elif dataset == "reconciliation":
+        if is_demo_mode(connection_id) and is_demo_mode(payment_connection_id):
+            result = get_demo_reconciliation()
+        else:
+            result = await compute.run(get_ledger().snapshot, f"{connection_id}:{payment_connection_id}")
+        rows = reconciliation_rows(result)
+    else:
+        engine = await get_ledger_timeseries(connection_id)
+        rows = (await compute.run(build_financial_analysis, engine, year, timeframe, size=len(engine)))["periods"]
+
+    filename = f"{dataset}.{format}"
+    return StreamingResponse(
+        export_stream(dataset, rows, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @app.post("/insights")
-async def insights(req: InsightsRequest):
-    data = get_demo_insights()
-    return data
+async def insights(req: InsightsRequest, request: Request):
+    month = req.month or date.today().strftime("%Y-%m")
+    if is_demo_mode(req.connection_id):
+        return json_response(request, get_demo_insights(month))
+
+    async def periods():
+        engine = await get_ledger_timeseries(req.connection_id)
+        return engine.active_months(int(month[:4]))
+
+    # Overdue invoices are the one source the dashboard can't do without;
+    # the other cards are dropped if their fetch fails or runs late.
+    calls = {
+        "invoices": lambda: get_overdue_invoices(req.connection_id),
+        "monthly": lambda: get_monthly_stats(req.connection_id, month),
+        "periods": periods,
+    }
+    if req.payment_connection_id:
+        calls["transactions"] = lambda: get_recent_transactions(req.payment_connection_id)
+    try:
+        sources, errors = await fan_out(calls, required={"invoices"})
+    except TimeoutError as exc:
+        return {"status": "error", "message": str(exc)}
+
+    # Every source above is served from a cache that replaces objects on
+    # change, so an unchanged dashboard is a lookup; reconciliation only
+    # runs when invoices or transactions moved.
+    key = (req.connection_id, req.payment_connection_id, month)
+    reconciliation = None
+    if sources.get("transactions") is not None and "match_rate" in materialized_insights.stale(key, sources):
+        try:
+            reconciliation = await reconcile_live(req.connection_id, req.payment_connection_id)
+        except Exception as exc:
+            errors["reconciliation"] = f"{type(exc).__name__}: {exc}"
+    data = await compute.run(
+        materialized_insights.get, key, sources, reconciliation, size=len(sources["invoices"])
+    )
+    if "reconciliation" in errors:
+        materialized_insights.invalidate(*key)  # retry the match rate on the next call
+    return json_response(request, data, extra={"unavailable": errors})
 
 
 @app.post("/agent/run")
@@ -315,6 +408,17 @@ async def agent_run(req: AgentRequest):
     return result
 
 
+@app.post("/agent/run/stream")
+async def agent_run_stream(req: AgentRequest):
+    # Starlette cancels this generator when the client disconnects, which
+    # cancels the agent run mid-step and frees the pooled session.
+    async def events():
+        async for event in stream_agent(req.connection_id, req.message):
+            yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @app.get("/health")
 async def health():
     return {
@@ -324,6 +428,16 @@ async def health():
     }
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    return {**unified_cache.stats(), "responses": serialized_payloads.stats()}
+
+
+@app.get("/compute/stats")
+async def compute_stats():
+    return compute.stats()
+
+
 # --- Admin: Demo Data Management ---
 
 class AdminInvoice(BaseModel):
@@ -361,8 +475,8 @@ class AdminFinancialPeriod(BaseModel):
 
 
 @app.get("/admin/data/invoices")
-async def admin_get_invoices():
-    return get_demo_invoices()
+async def admin_get_invoices(request: Request):
+    return json_response(request, get_demo_invoices())
 
 @app.put("/admin/data/invoices")
 async def admin_set_invoices(invoices: List[AdminInvoice]):
@@ -370,8 +484,8 @@ async def admin_set_invoices(invoices: List[AdminInvoice]):
     return {"status": "ok", "count": len(invoices)}
 
 @app.get("/admin/data/transactions")
-async def admin_get_transactions():
-    return get_demo_transactions()
+async def admin_get_transactions(request: Request):
+    return json_response(request, get_demo_transactions())
 
 @app.put("/admin/data/transactions")
 async def admin_set_transactions(transactions: List[AdminTransaction]):
@@ -379,8 +493,8 @@ async def admin_set_transactions(transactions: List[AdminTransaction]):
     return {"status": "ok", "count": len(transactions)}
 
 @app.get("/admin/data/monthly")
-async def admin_get_monthly():
-    return get_demo_monthly_summary("2026-02")
+async def admin_get_monthly(request: Request):
+    return json_response(request, get_demo_monthly_summary("2026-02"))
 
 @app.put("/admin/data/monthly")
 async def admin_set_monthly(summary: AdminMonthlySummary):
@@ -388,8 +502,8 @@ async def admin_set_monthly(summary: AdminMonthlySummary):
     return {"status": "ok"}
 
 @app.get("/admin/data/financial")
-async def admin_get_financial():
-    return get_demo_financial_periods()
+async def admin_get_financial(request: Request):
+    return json_response(request, get_demo_financial_periods())
 
 @app.put("/admin/data/financial")
 async def admin_set_financial(periods: List[AdminFinancialPeriod]):
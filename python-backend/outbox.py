@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+from pathlib import Path
+
+import httpx
+
+from data.messaging import send_email
+
+OUTBOX_PATH = Path(os.getenv("EMAIL_OUTBOX_PATH", Path(__file__).parent / "email_outbox.db"))
+OUTBOX_WORKERS = int(os.getenv("EMAIL_OUTBOX_WORKERS", "4"))
+OUTBOX_RATE = float(os.getenv("EMAIL_OUTBOX_RATE", "5"))  # sends per second per connection
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("EMAIL_OUTBOX_BACKOFF_BASE", "2"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("EMAIL_OUTBOX_BACKOFF_MAX", "300"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("EMAIL_OUTBOX_POLL_INTERVAL", "1"))
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,             -- idempotency key
+    connection_id TEXT NOT NULL,
+    invoice_id TEXT,
+    to_addr TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL,            -- queued, sending, sent, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    response TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_due ON messages (status, next_attempt_at);
+"""
+
+_COLUMNS = (
+    "id", "connection_id", "invoice_id", "to_addr", "subject", "body", "status",
+    "attempts", "next_attempt_at", "last_error", "response", "created_at", "updated_at",
+)
+
+
+def idempotency_key(connection_id: str, invoice_id: str | None, to: str, subject: str, body: str) -> str:
+    payload = json.dumps([connection_id, invoice_id, to, subject, body])
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class _ConnectionPacer:
+    """Spaces sends to the same connection at least 1/rate seconds apart."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next: dict[str, float] = {}
+
+    async def wait(self, connection_id: str) -> None:
+        now = time.monotonic()
+        slot = max(now, self._next.get(connection_id, now))
+        self._next[connection_id] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class EmailOutbox:
+    """Durable outbound email queue drained by a pool of async workers.
+
+    Each message is stored under an idempotency key (derived from its
+    content unless the caller supplies one), so enqueueing the same email
+    twice returns the existing entry, and the key is sent upstream as an
+    ``Idempotency-Key`` header so a retry after an ambiguous failure is not
+    delivered twice. Transient failures (429, 5xx, network) are retried
+    with exponential backoff up to ``OUTBOX_MAX_ATTEMPTS``. SQLite calls
+    run in a worker thread, never on the event loop.
+    """
+
+    def __init__(self, path: Path | str = OUTBOX_PATH, workers: int = OUTBOX_WORKERS, rate: float = OUTBOX_RATE):
+        self.path = Path(path)
+        self.workers = workers
+        self._pacer = _ConnectionPacer(rate)
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    async def enqueue(
+        self,
+        connection_id: str,
+        to: str,
+        subject: str,
+        body: str,
+        invoice_id: str | None = None,
+        key: str | None = None,
+    ) -> dict:
+        key = key or idempotency_key(connection_id, invoice_id, to, subject, body)
+        message = await asyncio.to_thread(self._insert, key, connection_id, invoice_id, to, subject, body)
+        self._wakeup.set()
+        return message
+
+    async def status(self, message_id: str) -> dict | None:
+        return await asyncio.to_thread(self._status, message_id)
+
+    async def counts(self) -> dict:
+        return await asyncio.to_thread(self._counts)
+
+    def _insert(self, key, connection_id, invoice_id, to, subject, body) -> dict:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO messages "
+                "(id, connection_id, invoice_id, to_addr, subject, body, status, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (key, connection_id, invoice_id, to, subject, body, now, now, now),
+            )
+        return self._status(key)
+
+    def _status(self, message_id: str) -> dict | None:
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM messages WHERE id = ?", (message_id,)).fetchone()
+        if row is None:
+            return None
+        message = dict(zip(_COLUMNS, row))
+        message["response"] = json.loads(message["response"]) if message["response"] else None
+        return message
+
+    def _counts(self) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM messages GROUP BY status").fetchall()
+        return {status: 0 for status in ("queued", "sending", "sent", "failed")} | dict(rows)
+
+    def _claim(self) -> dict | None:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "UPDATE messages SET status = 'sending', attempts = attempts + 1, updated_at = ? "
+                "WHERE id = (SELECT id FROM messages WHERE status = 'queued' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT 1) "
+                f"RETURNING {', '.join(_COLUMNS)}",
+                (now, now),
+            ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def _finish(self, message_id: str, status: str, error: str | None = None,
+                response: dict | None = None, retry_in: float = 0.0) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE messages SET status = ?, last_error = ?, response = ?, next_attempt_at = ?, updated_at = ? "
+                "WHERE id = ?",
+                (status, error, json.dumps(response) if response is not None else None, now + retry_in, now, message_id),
+            )
+
+    def _backoff(self, attempts: int, exc: Exception) -> float:
+        response = getattr(exc, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE ** attempts)
+            return delay * (0.5 + random.random() / 2)
+
+    async def _deliver(self, message: dict) -> None:
+        await self._pacer.wait(message["connection_id"])
+        try:
+            result = await send_email(
+                message["connection_id"],
+                message["to_addr"],
+                message["subject"],
+                message["body"],
+                invoice_id=message["invoice_id"],
+                idempotency_key=message["id"],
+            )
+        except (httpx.TransportError, httpx.HTTPStatusError) as exc:
+            transient = isinstance(exc, httpx.TransportError) or (
+                exc.response.status_code == 429 or exc.response.status_code >= 500
+            )
+            error = f"{type(exc).__name__}: {exc}"
+            if transient and message["attempts"] < OUTBOX_MAX_ATTEMPTS:
+                retry_in = self._backoff(message["attempts"], exc)
+                await asyncio.to_thread(self._finish, message["id"], "queued", error, retry_in=retry_in)
+            else:
+                await asyncio.to_thread(self._finish, message["id"], "failed", error)
+            return
+        except Exception as exc:
+            await asyncio.to_thread(self._finish, message["id"], "failed", f"{type(exc).__name__}: {exc}")
+            return
+        await asyncio.to_thread(self._finish, message["id"], "sent", response=result.get("response"))
+
+    async def _worker(self) -> None:
+        failures = 0
+        while True:
+            try:
+                message = await asyncio.to_thread(self._claim)
+                if message is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), OUTBOX_POLL_INTERVAL)
+                    except TimeoutError:
+                        pass
+                    continue
+                await self._deliver(message)
+                failures = 0
+            except Exception:
+                # e.g. "database is locked": keep the worker alive and try
+                # again later; a message it had claimed is requeued on restart.
+                failures += 1
+                delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE ** failures)
+                logger.exception("Email outbox worker failed; retrying in %.1fs", delay)
+                await asyncio.sleep(delay)
+
+    async def start(self) -> None:
+        # Anything left mid-send by a previous process goes back in the
+        # queue; the idempotency key keeps the resend from duplicating it.
+        await asyncio.to_thread(self._requeue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _requeue(self) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE messages SET status = 'queued' WHERE status = 'sending'")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+_outbox: EmailOutbox | None = None
+
+
+def get_outbox() -> EmailOutbox:
+    global _outbox
+    if _outbox is None:
+        _outbox = EmailOutbox()
+    return _outbox
@@ -0,0 +1,1156 @@
+import bisect
+import functools
+import hashlib
+import itertools
+import re
+from collections import Counter, defaultdict
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from records import Invoice, Transaction, invoice_records, transaction_records
+
+
+MATCH_THRESHOLD = 0.6
+AMOUNT_TOLERANCE = 0.01  # amounts within 1% count as an exact match
+MAX_BLOCK_SIZE = 200  # upper bound on invoices contributed by a single amount window or name token
+BATCH_CELLS = 250_000  # scored pairs held in memory at once by batch scoring
+DENSE_COMPONENT_CELLS = 250_000  # larger match-graph components use the sparse auction solver
+AUCTION_TOLERANCE = 1e-4  # max shortfall of the auction solver's total confidence vs. the optimum
+AUCTION_SERIAL_BIDS = 32  # fewer bidders than this are cheaper to run one at a time than as a vectorized round
+MAX_GROUP_SIZE = 4  # most payments/invoices combined into one split or bulk match
+MAX_GROUP_POOL = 12  # most same-payer candidates searched for a split or bulk match
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_NAME_STOPWORDS = {
+    "the", "and", "of", "co", "company", "corp", "corporation", "inc", "incorporated",
+    "llc", "llp", "lp", "ltd", "limited", "plc", "gmbh", "ag", "sa", "bv", "pty",
+}
+
+
+def _name_tokens(name: str) -> set[str]:
+    return {
+        tok for tok in _TOKEN_RE.findall(name.lower())
+        if len(tok) > 1 and tok not in _NAME_STOPWORDS
+    }
+
+
+def _id_key(value) -> str:
+    return "".join(_TOKEN_RE.findall(str(value).lower()))
+
+
+def _currency(value) -> str | None:
+    return value.upper() if value else None
+
+
+def _same_currency(a: str | None, b: str | None) -> bool:
+    # A record without a currency can pair with any currency.
+    return a is None or b is None or a == b
+
+
+def _reference_keys(reference: str) -> set[str]:
+    # "INV-001-PAY" -> {"inv001pay", "inv", "001", "pay", "inv001", "001pay"}
+    parts = _TOKEN_RE.findall(reference.lower())
+    keys = set(parts)
+    keys.update(a + b for a, b in zip(parts, parts[1:]))
+    if parts:
+        keys.add("".join(parts))
+    return keys
+
+
+class CandidateIndex:
+    """Shortlists the invoices a transaction could plausibly settle.
+
+    A transaction is paired with every invoice whose amount falls inside the
+    exact-match tolerance window, every invoice whose customer name shares a
+    normalized token with the payer name, and every invoice whose id appears
+    in the payment reference. Only those pairs go to the name scorer.
+    Invoices in a different known currency from the transaction are never
+    shortlisted.
+    """
+
+    def __init__(
+        self,
+        invoices: list[Invoice],
+        amount_tolerance: float = AMOUNT_TOLERANCE,
+        max_block_size: int = MAX_BLOCK_SIZE,
+        amount_only: bool = False,
+    ):
+        self.amount_tolerance = amount_tolerance
+        self.max_block_size = max_block_size
+        self.amount_only = amount_only  # shortlist by amount window alone (see sharded_reconcile)
+        self._currencies = [_currency(inv.currency) for inv in invoices]
+        self._currency_set = set(self._currencies)
+
+        by_amount = sorted((inv.amount, idx) for idx, inv in enumerate(invoices) if inv.amount_cents > 0)
+        self._amounts = [amount for amount, _ in by_amount]
+        self._amount_idx = [idx for _, idx in by_amount]
+
+        self._tokens: dict[str, list[int]] = defaultdict(list)
+        self._ids: dict[str, list[int]] = defaultdict(list)
+        if amount_only:
+            return
+        for idx, inv in enumerate(invoices):
+            for tok in _name_tokens(inv.customer_name):
+                self._tokens[tok].append(idx)
+            for value in (inv.id, inv.invoice_number):
+                key = _id_key(value or "")
+                if key:
+                    self._ids[key].append(idx)
+
+    def by_amount(self, amount: float) -> list[int]:
+        # |amount - a| / a <= tol  <=>  amount / (1 + tol) <= a <= amount / (1 - tol)
+        if amount <= 0:
+            return []
+        lo = bisect.bisect_left(self._amounts, amount / (1 + self.amount_tolerance))
+        hi = bisect.bisect_right(self._amounts, amount / (1 - self.amount_tolerance))
+        if hi - lo > self.max_block_size:
+            # Crowded window (many identical amounts): keep the closest ones.
+            mid = bisect.bisect_left(self._amounts, amount, lo, hi)
+            lo = max(lo, min(mid - self.max_block_size // 2, hi - self.max_block_size))
+            hi = lo + self.max_block_size
+        return self._amount_idx[lo:hi]
+
+    def by_name(self, name: str) -> list[int]:
+        found = []
+        for tok in _name_tokens(name):
+            block = self._tokens.get(tok)
+            # Tokens shared by too many customers ("group", "services") do not discriminate.
+            if block and len(block) <= self.max_block_size:
+                found.extend(block)
+        return found
+
+    def by_reference(self, reference: str) -> list[int]:
+        found = []
+        for key in _reference_keys(reference):
+            found.extend(self._ids.get(key, ()))
+        return found
+
+    def candidates(self, txn: Transaction) -> list[int]:
+        found = set(self.by_amount(txn.amount))
+        if not self.amount_only:
+            found.update(self.by_name(txn.payer_name))
+            found.update(self.by_reference(txn.reference or ""))
+        currency = _currency(txn.currency)
+        # Nothing to filter when every invoice here is in this currency or none.
+        if currency is not None and not self._currency_set <= {currency, None}:
+            currencies = self._currencies
+            found = [idx for idx in found if currencies[idx] is None or currencies[idx] == currency]
+        # Invoice order decides ties, exactly as in the all-pairs scan.
+        return sorted(found)
+
+
+def score_pair(payer_name: str, customer_name: str, txn_amount: float, inv_amount: float) -> tuple[float, float, float]:
+    """Return (confidence, name_score, amount_score) for lowercased names."""
+    name_score = fuzz.ratio(payer_name, customer_name) / 100.0
+
+    if inv_amount > 0:
+        amount_diff = abs(txn_amount - inv_amount) / inv_amount
+        amount_score = 1.0 if amount_diff <= AMOUNT_TOLERANCE else max(0, 1.0 - amount_diff)
+    else:
+        amount_score = 0.0
+
+    confidence = (name_score * 0.4) + (amount_score * 0.6)
+    return confidence, name_score, amount_score
+
+
+# Reason flags kept per match; the text is only built for the response.
+REASON_EXACT_AMOUNT = 1
+REASON_CLOSE_AMOUNT = 2
+REASON_NAME = 4
+
+
+def reason_flags(name_score, amount_score):
+    """Reason flags for scalar or array scores."""
+    amount = np.where(amount_score >= 0.99, REASON_EXACT_AMOUNT, np.where(amount_score > 0.8, REASON_CLOSE_AMOUNT, 0))
+    return (amount | np.where(name_score > 0.6, REASON_NAME, 0)).astype(np.uint8)
+
+
+def describe_match(inv: Invoice, txn: Transaction, flags: int) -> str:
+    reason = []
+    if flags & REASON_EXACT_AMOUNT:
+        reason.append("Amount exact match")
+    elif flags & REASON_CLOSE_AMOUNT:
+        reason.append("Amount close match")
+    if flags & REASON_NAME:
+        reason.append(f"Name similarity ({inv.customer_name} / {txn.payer_name})")
+    return " + ".join(reason)
+
+
+def unmatched_transaction(txn: Transaction) -> dict:
+    return {
+        "transaction": txn.to_dict(),
+        "reason": f"No invoice found matching amount ${txn.amount:,.2f} "
+                  f"or payer '{txn.payer_name or 'Unknown'}'",
+    }
+
+
+def unmatched_invoice(inv: Invoice) -> dict:
+    return {
+        "invoice": inv.to_dict(),
+        "reason": f"No payment received for {inv.customer_name} "
+                  f"(${inv.amount:,.2f}, {inv.days_overdue or 0} days overdue)",
+    }
+
+
+@dataclass(slots=True)
+class ReconciliationResult:
+    """Matches as parallel arrays of positions into ``transactions`` and
+    ``invoices``; records are not copied into the result.
+
+    Match reasons are kept as ``REASON_*`` flags, or as ready text in
+    ``reasons`` when they come from storage. ``groups`` maps a match
+    position to its split/bulk group key. :meth:`to_dict` builds the JSON
+    response shape.
+    """
+
+    invoices: list[Invoice]
+    transactions: list[Transaction]
+    txn_idx: np.ndarray
+    inv_idx: np.ndarray
+    confidence: np.ndarray
+    flags: np.ndarray
+    groups: dict[int, str] = field(default_factory=dict)
+    reasons: list[str] | None = None
+
+    def _open(self, n: int, idx: np.ndarray) -> np.ndarray:
+        mask = np.ones(n, dtype=bool)
+        mask[idx] = False
+        return np.flatnonzero(mask)
+
+    def counts(self) -> tuple[int, int, int]:
+        """(matched, unmatched transactions, unmatched invoices)."""
+        return (
+            len(self.txn_idx),
+            len(self._open(len(self.transactions), self.txn_idx)),
+            len(self._open(len(self.invoices), self.inv_idx)),
+        )
+
+    def _reason(self, k: int, txn: Transaction, inv: Invoice, group_sizes: dict) -> str:
+        if self.reasons is not None:
+            return self.reasons[k]
+        reason = describe_match(inv, txn, int(self.flags[k]))
+        group = self.groups.get(k)
+        if group is None:
+            return reason
+        kind, _ = group.split(":", 1)
+        size = group_sizes[group]
+        label = f"Split payment ({size} transactions)" if kind == "split" else f"Bulk payment ({size} invoices)"
+        return " + ".join(filter(None, [label, reason]))
+
+    def matches(self) -> Iterator[tuple[Transaction, Invoice, float, str, str | None]]:
+        """(transaction, invoice, confidence, match_reason, group) per match."""
+        group_sizes = Counter(self.groups.values())
+        for k, (t, i, confidence) in enumerate(zip(self.txn_idx.tolist(), self.inv_idx.tolist(), self.confidence.tolist())):
+            txn, inv = self.transactions[t], self.invoices[i]
+            yield txn, inv, round(confidence, 2), self._reason(k, txn, inv, group_sizes), self.groups.get(k)
+
+    def matched(self) -> Iterator[dict]:
+        for txn, inv, confidence, reason, group in self.matches():
+            entry = {
+                "transaction": txn.to_dict(),
+                "invoice": inv.to_dict(),
+                "confidence": confidence,
+                "match_reason": reason,
+            }
+            if group:
+                entry["group"] = group
+            yield entry
+
+    def unmatched_transactions(self) -> Iterator[dict]:
+        for t in self._open(len(self.transactions), self.txn_idx).tolist():
+            yield unmatched_transaction(self.transactions[t])
+
+    def unmatched_invoices(self) -> Iterator[dict]:
+        for i in self._open(len(self.invoices), self.inv_idx).tolist():
+            yield unmatched_invoice(self.invoices[i])
+
+    def to_dict(self) -> dict:
+        return {
+            "matched": list(self.matched()),
+            "unmatched_transactions": list(self.unmatched_transactions()),
+            "unmatched_invoices": list(self.unmatched_invoices()),
+        }
+
+
+def score_batch(
+    payer_names: np.ndarray,
+    customer_names: np.ndarray,
+    txn_amounts: np.ndarray,
+    inv_amounts: np.ndarray,
+    txn_idx: np.ndarray,
+    inv_idx: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized :func:`score_pair` over aligned (transaction, invoice) index arrays."""
+    name_score = process.cpdist(
+        payer_names[txn_idx],
+        customer_names[inv_idx],
+        scorer=fuzz.ratio,
+        dtype=np.float64,
+        workers=-1,
+    ) / 100.0
+    return _combine(name_score, txn_amounts[txn_idx], inv_amounts[inv_idx])
+
+
+def _combine(name_score: np.ndarray, txn_amount: np.ndarray, inv_amount: np.ndarray):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amount_diff = np.abs(txn_amount - inv_amount) / inv_amount
+    amount_score = np.where(
+        inv_amount > 0,
+        np.where(amount_diff <= AMOUNT_TOLERANCE, 1.0, np.maximum(0.0, 1.0 - amount_diff)),
+        0.0,
+    )
+    confidence = (name_score * 0.4) + (amount_score * 0.6)
+    return confidence, name_score, amount_score
+
+
+def _scored_blocks(
+    invoices: list[Invoice], transactions: list[Transaction], blocking: bool, amount_only: bool = False
+):
+    """Yield (txn_idx, inv_idx, confidence, name_score, amount_score) array blocks.
+
+    Names are lowercased and amounts gathered once up front. Pairs come out
+    grouped by transaction and, within a transaction, in invoice order.
+    """
+    payer_names = np.array([txn.payer_name.lower() for txn in transactions], dtype=object)
+    customer_names = np.array([inv.customer_name.lower() for inv in invoices], dtype=object)
+    txn_amounts = np.array([txn.amount_cents for txn in transactions], dtype=np.float64) / 100
+    inv_amounts = np.array([inv.amount_cents for inv in invoices], dtype=np.float64) / 100
+    n_txn, n_inv = len(transactions), len(invoices)
+    if not n_txn or not n_inv:
+        return
+
+    if not blocking:
+        # Currencies as small codes, 0 for none, so the same-currency rule
+        # of CandidateIndex is one vectorized comparison per batch.
+        codes = defaultdict(lambda: len(codes) + 1)
+        txn_currencies = np.array([codes[_currency(txn.currency)] if txn.currency else 0 for txn in transactions])
+        inv_currencies = np.array([codes[_currency(inv.currency)] if inv.currency else 0 for inv in invoices])
+        mixed = len(codes) > 1
+        rows = max(1, BATCH_CELLS // n_inv)
+        for start in range(0, n_txn, rows):
+            stop = min(start + rows, n_txn)
+            name_score = process.cdist(
+                payer_names[start:stop].tolist(), customer_names.tolist(),
+                scorer=fuzz.ratio, dtype=np.float64, workers=-1,
+            ).ravel() / 100.0
+            txn_idx = np.repeat(np.arange(start, stop), n_inv)
+            inv_idx = np.tile(np.arange(n_inv), stop - start)
+            if mixed:
+                keep = (txn_currencies[txn_idx] == 0) | (inv_currencies[inv_idx] == 0)
+                keep |= txn_currencies[txn_idx] == inv_currencies[inv_idx]
+                txn_idx, inv_idx, name_score = txn_idx[keep], inv_idx[keep], name_score[keep]
+            yield (txn_idx, inv_idx, *_combine(name_score, txn_amounts[txn_idx], inv_amounts[inv_idx]))
+        return
+
+    index = CandidateIndex(invoices, amount_only=amount_only)
+    txn_idx, inv_idx = [], []
+    for t, txn in enumerate(transactions):
+        found = index.candidates(txn)
+        txn_idx.extend([t] * len(found))
+        inv_idx.extend(found)
+        if len(txn_idx) >= BATCH_CELLS or t == n_txn - 1:
+            block_txn = np.array(txn_idx, dtype=np.int64)
+            block_inv = np.array(inv_idx, dtype=np.int64)
+            yield (block_txn, block_inv, *score_batch(
+                payer_names, customer_names, txn_amounts, inv_amounts, block_txn, block_inv
+            ))
+            txn_idx, inv_idx = [], []
+
+
+def _best_per_transaction(
+    invoices: list[Invoice], transactions: list[Transaction], blocking: bool, amount_only: bool = False
+) -> tuple:
+    """(txn_idx, inv_idx, confidence, name_score, amount_score) columns of each
+    transaction's top-scoring invoice above the threshold, by transaction."""
+    blocks = []
+    for txn_idx, inv_idx, confidence, name_score, amount_score in _scored_blocks(
+        invoices, transactions, blocking, amount_only
+    ):
+        # Highest confidence first, lowest invoice index on ties, like the pairwise scan.
+        # A transaction's pairs never span blocks, so its top pair is final.
+        order = np.lexsort((inv_idx, -confidence, txn_idx))
+        _, first = np.unique(txn_idx[order], return_index=True)
+        top = order[first]
+        top = top[confidence[top] > MATCH_THRESHOLD]
+        blocks.append((txn_idx[top], inv_idx[top], confidence[top], name_score[top], amount_score[top]))
+    if not blocks:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty.astype(np.int64), empty, empty, empty
+    return tuple(np.concatenate(column) for column in zip(*blocks))
+
+
+def _edges_above_threshold(
+    invoices: list[Invoice], transactions: list[Transaction], blocking: bool, amount_only: bool = False
+):
+    blocks = [
+        (txn_idx[keep], inv_idx[keep], confidence[keep], name_score[keep], amount_score[keep])
+        for txn_idx, inv_idx, confidence, name_score, amount_score in _scored_blocks(
+            invoices, transactions, blocking, amount_only
+        )
+        for keep in [confidence > MATCH_THRESHOLD]
+    ]
+    if not blocks:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty.astype(np.int64), empty, empty, empty
+    return tuple(np.concatenate(column) for column in zip(*blocks))
+
+
+def max_weight_matching(
+    n_txn: int, n_inv: int, txn_idx: np.ndarray, inv_idx: np.ndarray, weight: np.ndarray
+) -> np.ndarray:
+    """Return positions of the edges in a maximum-weight one-to-one matching.
+
+    The graph is split into connected components first. Single-edge
+    components are taken as-is, small components are solved densely with
+    ``linear_sum_assignment`` and large ones with a sparse auction.
+    """
+    if not len(weight):
+        return np.empty(0, dtype=np.int64)
+
+    graph = coo_matrix(
+        (np.ones(len(weight)), (txn_idx, n_txn + inv_idx)), shape=(n_txn + n_inv, n_txn + n_inv)
+    )
+    _, labels = connected_components(graph, directed=False)
+    edge_comp = labels[txn_idx]
+    order = np.argsort(edge_comp, kind="stable")
+    bounds = np.flatnonzero(np.diff(edge_comp[order])) + 1
+    starts = np.concatenate(([0], bounds))
+    sizes = np.diff(np.concatenate((starts, [len(order)])))
+
+    chosen = [order[starts[sizes == 1]]]
+    for start, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+        edges = order[start:start + size]
+        rows, local_t = np.unique(txn_idx[edges], return_inverse=True)
+        cols, local_i = np.unique(inv_idx[edges], return_inverse=True)
+        if len(rows) * len(cols) <= DENSE_COMPONENT_CELLS:
+            picked = _solve_dense(edges, local_t, local_i, len(rows), len(cols), weight)
+        else:
+            picked = _solve_sparse(edges, local_t, local_i, len(rows), len(cols), weight)
+        chosen.append(picked)
+    return np.sort(np.concatenate(chosen))
+
+
+def _solve_dense(edges, local_t, local_i, n_rows, n_cols, weight):
+    matrix = np.zeros((n_rows, n_cols))
+    slot = np.full((n_rows, n_cols), -1, dtype=np.int64)
+    matrix[local_t, local_i] = weight[edges]
+    slot[local_t, local_i] = edges
+    row, col = linear_sum_assignment(matrix, maximize=True)
+    picked = slot[row, col]
+    return picked[picked >= 0]
+
+
+def _solve_sparse(edges, local_t, local_i, n_rows, n_cols, weight):
+    matched_col = _auction(n_rows, n_cols, local_t, local_i, weight[edges])
+    return edges[matched_col[local_t] == local_i]
+
+
+def _csr(keys: np.ndarray, other: np.ndarray, weight: np.ndarray, n: int):
+    order = np.argsort(keys, kind="stable")
+    ptr = np.concatenate(([0], np.cumsum(np.bincount(keys, minlength=n))))
+    return ptr, other[order], weight[order]
+
+
+def _segments(ptr: np.ndarray, members: np.ndarray):
+    """Edge positions of ``members`` (rows of a CSR layout), concatenated.
+
+    Returns the members that have edges, where each one's run starts in
+    the concatenation, the run lengths, and the edge positions.
+    """
+    lo = ptr[members]
+    deg = ptr[members + 1] - lo
+    members, lo, deg = members[deg > 0], lo[deg > 0], deg[deg > 0]
+    seg = np.concatenate(([0], np.cumsum(deg)[:-1]))
+    return members, seg, deg, np.repeat(lo - seg, deg) + np.arange(deg.sum())
+
+
+def _top_two(value: np.ndarray, seg: np.ndarray, deg: np.ndarray, floor: float):
+    """Best value, second best (at least ``floor``) and argmax position per run."""
+    best = np.maximum.reduceat(value, seg)
+    hits = np.flatnonzero(value == np.repeat(best, deg))
+    run = np.repeat(np.arange(len(seg)), deg)[hits]
+    first = hits[np.concatenate(([True], run[1:] != run[:-1]))]
+    value[first] = -np.inf
+    return best, np.maximum(np.maximum.reduceat(value, seg), floor), first
+
+
+def _highest(keys: np.ndarray, score: np.ndarray) -> np.ndarray:
+    # Position of the highest score per distinct key.
+    order = np.lexsort((-score, keys))
+    return order[np.concatenate(([True], keys[order][1:] != keys[order][:-1]))]
+
+
+def _auction(n_rows, n_cols, rows, cols, weight, theta=10.0, start_eps=0.1):
+    """Sparse forward/reverse auction with epsilon scaling (Bertsekas).
+
+    Rows are transactions, each free to stay unmatched at value 0; columns are
+    invoices. Each phase runs a forward auction, where unassigned rows bid for
+    their best column, then a reverse auction that pulls the price of every
+    unassigned invoice down to 0, which is what makes the asymmetric problem
+    come out optimal. Bids are placed as vectorized Jacobi rounds (every free
+    row at once, the highest bid per column wins) until fewer than
+    ``AUCTION_SERIAL_BIDS`` are left, and the tail goes one bid at a time,
+    which avoids the long price wars synchronous rounds get into. Between
+    phases only the rows that no longer satisfy epsilon-complementary
+    slackness are unassigned. The last phase uses an epsilon small enough
+    that the total weight is within ``AUCTION_TOLERANCE`` of the optimum.
+    Returns the matched column per row, -1 for unmatched.
+    """
+    row_ptr, row_col, row_w = _csr(rows, cols, weight, n_rows)
+    col_ptr, col_row, col_w = _csr(cols, rows, weight, n_cols)
+    nonempty = np.flatnonzero(np.diff(row_ptr))
+
+    price = np.zeros(n_cols)
+    owner = np.full(n_cols, -1, dtype=np.int64)
+    assigned = np.full(n_rows, -1, dtype=np.int64)
+    profit = np.zeros(n_rows)
+    final_eps = AUCTION_TOLERANCE / (n_rows + 1)
+    eps = max(start_eps, final_eps)
+    free = np.arange(n_rows)
+    while True:
+        # Forward: unassigned rows bid for their best column.
+        while len(free) >= AUCTION_SERIAL_BIDS:
+            members, seg, deg, idx = _segments(row_ptr, free)
+            value = row_w[idx] - price[row_col[idx]]
+            best, second, first = _top_two(value, seg, deg, 0.0)
+            bidding = best > 0  # otherwise staying unmatched is at least as good
+            if not bidding.any():
+                free = free[:0]
+                break
+            members, second = members[bidding], second[bidding]
+            col = row_col[idx[first[bidding]]]
+            bid = price[col] + best[bidding] - second + eps
+            win = _highest(col, bid)
+            won, winners = col[win], members[win]
+            previous = owner[won]
+            price[won], owner[won] = bid[win], winners
+            assigned[winners], profit[winners] = won, second[win] - eps
+            previous = previous[previous >= 0]
+            assigned[previous], profit[previous] = -1, 0.0
+            outbid = np.ones(len(members), dtype=bool)
+            outbid[win] = False
+            free = np.concatenate((members[outbid], previous))
+        _forward_serial(row_ptr, row_col, row_w, price, owner, assigned, profit, free.tolist(), eps)
+
+        # Reverse: unassigned columns with a positive price bid for rows.
+        queue = np.flatnonzero((owner < 0) & (price > 0))
+        while len(queue) >= AUCTION_SERIAL_BIDS:
+            members, seg, deg, idx = _segments(col_ptr, queue)
+            value = col_w[idx] - profit[col_row[idx]]
+            best, second, first = _top_two(value, seg, deg, -np.inf)
+            price[members[best <= eps]] = 0.0
+            bidding = best > eps
+            if not bidding.any():
+                queue = queue[:0]
+                break
+            members, first = members[bidding], first[bidding]
+            new_price = np.maximum(0.0, second[bidding] - eps)
+            row, offer = col_row[idx[first]], col_w[idx[first]] - new_price
+            win = _highest(row, offer)
+            won, winners = members[win], row[win]
+            released = assigned[winners]
+            price[won], owner[won] = new_price[win], winners
+            assigned[winners], profit[winners] = won, offer[win]
+            released = released[released >= 0]
+            owner[released] = -1
+            outbid = np.ones(len(members), dtype=bool)
+            outbid[win] = False
+            queue = np.concatenate((members[outbid], released[price[released] > 0]))
+        _reverse_serial(col_ptr, col_row, col_w, price, owner, assigned, profit, queue.tolist(), eps)
+
+        if eps <= final_eps:
+            return assigned
+        eps = max(eps / theta, final_eps)
+        value = row_w - price[row_col]
+        best = np.zeros(n_rows)
+        best[nonempty] = np.maximum(np.maximum.reduceat(value, row_ptr[nonempty]), 0.0)
+        free = np.flatnonzero(profit < best - eps)
+        held = assigned[free]
+        owner[held[held >= 0]] = -1
+        assigned[free], profit[free] = -1, 0.0
+
+
+def _forward_serial(row_ptr, row_col, row_w, price, owner, assigned, profit, stack, eps):
+    """Gauss-Seidel forward bids for the rows in ``stack``; updates the arrays in place."""
+    if not stack:
+        return
+    p, own, asg, prof = price.tolist(), owner.tolist(), assigned.tolist(), profit.tolist()
+    edges = {}
+    while stack:
+        r = stack.pop()
+        if r not in edges:
+            lo, hi = row_ptr[r], row_ptr[r + 1]
+            edges[r] = list(zip(row_col[lo:hi].tolist(), row_w[lo:hi].tolist()))
+        best, second, best_col = -1.0, 0.0, -1
+        for c, w in edges[r]:
+            value = w - p[c]
+            if value > best:
+                if best > second:
+                    second = best
+                best, best_col = value, c
+            elif value > second:
+                second = value
+        if best <= 0:
+            continue
+        p[best_col] += best - second + eps
+        previous = own[best_col]
+        own[best_col], asg[r], prof[r] = r, best_col, second - eps
+        if previous >= 0:
+            asg[previous], prof[previous] = -1, 0.0
+            stack.append(previous)
+    price[:], owner[:], assigned[:], profit[:] = p, own, asg, prof
+
+
+def _reverse_serial(col_ptr, col_row, col_w, price, owner, assigned, profit, queue, eps):
+    """Gauss-Seidel reverse bids for the columns in ``queue``; updates the arrays in place."""
+    if not queue:
+        return
+    p, own, asg, prof = price.tolist(), owner.tolist(), assigned.tolist(), profit.tolist()
+    edges = {}
+    while queue:
+        c = queue.pop()
+        if c not in edges:
+            lo, hi = col_ptr[c], col_ptr[c + 1]
+            edges[c] = list(zip(col_row[lo:hi].tolist(), col_w[lo:hi].tolist()))
+        best, second, best_row, best_w = -np.inf, -np.inf, -1, 0.0
+        for r, w in edges[c]:
+            value = w - prof[r]
+            if value > best:
+                if best > second:
+                    second = best
+                best, best_row, best_w = value, r, w
+            elif value > second:
+                second = value
+        if best <= eps:
+            p[c] = 0.0
+            continue
+        p[c] = max(0.0, second - eps)
+        released = asg[best_row]
+        own[c], asg[best_row], prof[best_row] = best_row, c, best_w - p[c]
+        if released >= 0:
+            own[released] = -1
+            if p[released] > 0:
+                queue.append(released)
+    price[:], owner[:], assigned[:], profit[:] = p, own, asg, prof
+
+
+def _group_matches(
+    invoices: list[Invoice], transactions: list[Transaction], open_txns: list[int], open_invs: list[int]
+) -> list[tuple[list[int], list[int], float, float]]:
+    """Pair open payments and invoices of the same payer whose amounts add up.
+
+    Returns ``(txn_idxs, inv_idxs, confidence, name_score)`` groups: one
+    transaction settling several invoices (bulk) or several transactions
+    settling one invoice (split), never across currencies. Subset sums are
+    searched over at most ``MAX_GROUP_POOL`` same-payer candidates and
+    ``MAX_GROUP_SIZE`` members.
+    """
+    groups = []
+    used_txns, used_invs = set(), set()
+    payer_names = {t: transactions[t].payer_name.lower() for t in open_txns}
+    customer_names = {i: invoices[i].customer_name.lower() for i in open_invs}
+    txn_currencies = {t: _currency(transactions[t].currency) for t in open_txns}
+    inv_currencies = {i: _currency(invoices[i].currency) for i in open_invs}
+    inv_tokens = defaultdict(list)
+    for i in open_invs:
+        for tok in _name_tokens(customer_names[i]):
+            inv_tokens[tok].append(i)
+    txn_tokens = defaultdict(list)
+    for t in open_txns:
+        for tok in _name_tokens(payer_names[t]):
+            txn_tokens[tok].append(t)
+
+    def related(name, currency, tokens, names, currencies, used):
+        pool = set()
+        for tok in _name_tokens(name):
+            block = tokens.get(tok, ())
+            if len(block) <= MAX_BLOCK_SIZE:
+                pool.update(j for j in block if j not in used and _same_currency(currencies[j], currency))
+        if len(pool) < 2:
+            return []
+        pool = sorted(pool)
+        scores = process.cdist([name], [names[j] for j in pool], scorer=fuzz.ratio, dtype=np.float64)[0] / 100.0
+        ranked = sorted((-score, j) for score, j in zip(scores.tolist(), pool) if score > 0.6)
+        return [(-neg, j) for neg, j in ranked[:MAX_GROUP_POOL]]
+
+    def subset_summing_to(cents, pool, cents_of):
+        slack = round(cents * AMOUNT_TOLERANCE)
+        amounts = {j: cents_of(j) for _, j in pool}
+        for size in range(2, min(MAX_GROUP_SIZE, len(pool)) + 1):
+            for combo in itertools.combinations(pool, size):
+                if abs(sum(amounts[j] for _, j in combo) - cents) <= slack:
+                    return combo
+        return None
+
+    # Bulk: one payment covering several invoices.
+    for t in open_txns:
+        amount = transactions[t].amount_cents
+        if amount <= 0:
+            continue
+        pool = related(payer_names[t], txn_currencies[t], inv_tokens, customer_names, inv_currencies, used_invs)
+        combo = subset_summing_to(amount, pool, lambda i: invoices[i].amount_cents)
+        if combo:
+            name_score = sum(score for score, _ in combo) / len(combo)
+            groups.append(([t], sorted(i for _, i in combo), name_score * 0.4 + 0.6, name_score))
+            used_txns.add(t)
+            used_invs.update(i for _, i in combo)
+
+    # Split: several payments settling one invoice.
+    for i in open_invs:
+        amount = invoices[i].amount_cents
+        if i in used_invs or amount <= 0:
+            continue
+        pool = related(customer_names[i], inv_currencies[i], txn_tokens, payer_names, txn_currencies, used_txns)
+        combo = subset_summing_to(amount, pool, lambda t: transactions[t].amount_cents)
+        if combo:
+            name_score = sum(score for score, _ in combo) / len(combo)
+            groups.append((sorted(t for _, t in combo), [i], name_score * 0.4 + 0.6, name_score))
+            used_txns.update(t for _, t in combo)
+            used_invs.add(i)
+
+    return groups
+
+
+def fuzzy_reconcile(
+    invoices: list[Invoice | dict],
+    transactions: list[Transaction | dict],
+    blocking: bool = True,
+    scoring: str = "batch",
+    assignment: str = "greedy",
+) -> ReconciliationResult:
+    """Match transactions to invoices.
+
+    Dicts are turned into :class:`~records.Invoice`/:class:`~records.Transaction`
+    records first; the result refers to those records by position.
+
+    With ``blocking`` (the default) only the pairs shortlisted by
+    :class:`CandidateIndex` are scored; ``blocking=False`` scores every pair.
+    Either way, a transaction and an invoice in different known currencies
+    are never paired.
+    ``scoring="batch"`` scores pairs as NumPy arrays with rapidfuzz's
+    multi-threaded ``cdist``/``cpdist``; ``scoring="pairwise"`` calls
+    :func:`score_pair` once per pair. Both produce the same result.
+
+    ``assignment="greedy"`` gives each transaction its best-scoring invoice,
+    even if another transaction already claimed it. ``assignment="optimal"``
+    first pairs split and bulk payments (see :func:`_group_matches`), then
+    solves a maximum-weight one-to-one matching over the remaining pairs
+    above the confidence threshold. Optimal assignment always uses batch
+    scoring.
+    """
+    invoices = invoice_records(invoices)
+    transactions = transaction_records(transactions)
+
+    if assignment == "optimal":
+        edges = _edges_above_threshold(invoices, transactions, blocking)
+        txn_idx, inv_idx, confidence, flags, groups = _assign_optimal(invoices, transactions, *edges)
+    else:
+        if scoring == "batch":
+            best = _best_per_transaction(invoices, transactions, blocking)
+        else:
+            best = _kept(_best_per_transaction_pairwise(invoices, transactions, blocking))
+        txn_idx, inv_idx, confidence, name_score, amount_score = best
+        flags, groups = reason_flags(name_score, amount_score), {}
+
+    return ReconciliationResult(
+        invoices, transactions, txn_idx.astype(np.int64), inv_idx.astype(np.int64), confidence, flags, groups
+    )
+
+
+def _kept(best: dict) -> tuple:
+    """(txn_idx, inv_idx, confidence, name_score, amount_score) columns of the
+    per-transaction bests above the threshold, by transaction."""
+    kept = [(t, *best[t]) for t in sorted(best) if best[t][1] > MATCH_THRESHOLD]
+    t, i, confidence, name_score, amount_score = np.array(kept, dtype=np.float64).reshape(-1, 5).T
+    return t.astype(np.int64), i.astype(np.int64), confidence, name_score, amount_score
+
+
+def _assign_optimal(invoices, transactions, txn_idx, inv_idx, confidence, name_score, amount_score):
+    """Split/bulk groups, then a maximum-weight matching over the remaining edges.
+
+    Returns ``(txn_idx, inv_idx, confidence, flags, groups)`` ordered by
+    transaction, then invoice.
+    """
+    groups = {}
+
+    # A same-payer subset whose amounts add up beats a fuzzy one-to-one
+    # match, so split/bulk groups are formed first, but only from records
+    # that have no exact-amount one-to-one candidate.
+    exact = amount_score >= 1.0
+    open_txns = sorted(set(range(len(transactions))) - set(txn_idx[exact].tolist()))
+    open_invs = sorted(set(range(len(invoices))) - set(inv_idx[exact].tolist()))
+    grouped = []  # (txn_idx, inv_idx, confidence, flags, group)
+    grouped_txns, grouped_invs = set(), set()
+    for txns, invs, group_confidence, group_name_score in _group_matches(
+        invoices, transactions, open_txns, open_invs
+    ):
+        if len(txns) > 1:
+            group = f"split:{invoices[invs[0]].id}"
+        else:
+            group = f"bulk:{transactions[txns[0]].id}"
+        flags = int(reason_flags(group_name_score, 0.0))
+        grouped.extend((t, i, group_confidence, flags, group) for t in txns for i in invs)
+        grouped_txns.update(txns)
+        grouped_invs.update(invs)
+
+    free = ~(np.isin(txn_idx, list(grouped_txns)) | np.isin(inv_idx, list(grouped_invs)))
+    txn_idx, inv_idx = txn_idx[free], inv_idx[free]
+    confidence, name_score, amount_score = confidence[free], name_score[free], amount_score[free]
+    chosen = max_weight_matching(len(transactions), len(invoices), txn_idx, inv_idx, confidence)
+    txn_idx, inv_idx, confidence = txn_idx[chosen], inv_idx[chosen], confidence[chosen]
+    flags = reason_flags(name_score[chosen], amount_score[chosen])
+    if grouped:
+        t, i, c, f, group = zip(*grouped)
+        txn_idx = np.concatenate((txn_idx, t))
+        inv_idx = np.concatenate((inv_idx, i))
+        confidence = np.concatenate((confidence, c))
+        flags = np.concatenate((flags, np.array(f, dtype=np.uint8)))
+        groups = dict(enumerate(group, start=len(chosen)))
+    order = np.lexsort((inv_idx, txn_idx))
+    txn_idx, inv_idx, confidence, flags = txn_idx[order], inv_idx[order], confidence[order], flags[order]
+    groups = {int(k): groups[j] for k, j in enumerate(order.tolist()) if j in groups}
+    return txn_idx, inv_idx, confidence, flags, groups
+
+
+def pack_inputs(invoices: list[Invoice], transactions: list[Transaction]) -> tuple:
+    """Just the fields matching reads, as columns.
+
+    This is what goes to a worker process: far smaller to pickle than the
+    records, and repeated (interned) names are sent once.
+    """
+    return (
+        [inv.id for inv in invoices],
+        [inv.customer_name for inv in invoices],
+        np.fromiter((inv.amount_cents for inv in invoices), dtype=np.int64, count=len(invoices)),
+        [inv.invoice_number for inv in invoices],
+        [inv.currency for inv in invoices],
+        [txn.id for txn in transactions],
+        [txn.payer_name for txn in transactions],
+        np.fromiter((txn.amount_cents for txn in transactions), dtype=np.int64, count=len(transactions)),
+        [txn.reference for txn in transactions],
+        [txn.currency for txn in transactions],
+    )
+
+
+def _unpack(packed: tuple) -> tuple[list[Invoice], list[Transaction]]:
+    (
+        inv_ids, customer_names, inv_cents, invoice_numbers, inv_currencies,
+        txn_ids, payer_names, txn_cents, references, txn_currencies,
+    ) = packed
+    invoices = [
+        Invoice(inv_id, name, cents, currency=currency, invoice_number=number)
+        for inv_id, name, cents, number, currency in zip(
+            inv_ids, customer_names, inv_cents.tolist(), invoice_numbers, inv_currencies
+        )
+    ]
+    transactions = [
+        Transaction(txn_id, name, cents, currency=currency, reference=reference)
+        for txn_id, name, cents, reference, currency in zip(
+            txn_ids, payer_names, txn_cents.tolist(), references, txn_currencies
+        )
+    ]
+    return invoices, transactions
+
+
+def reconcile_packed(packed: tuple, **options) -> tuple:
+    """:func:`fuzzy_reconcile` over :func:`pack_inputs` columns.
+
+    Returns ``(txn_idx, inv_idx, confidence, flags, groups)``; the caller
+    rebuilds the :class:`ReconciliationResult` around its own records.
+    """
+    result = fuzzy_reconcile(*_unpack(packed), **options)
+    return result.txn_idx, result.inv_idx, result.confidence, result.flags, result.groups
+
+
+def _viable_range(cents: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # confidence = 0.4 * name + 0.6 * amount_score can only clear the 0.6
+    # threshold if amount_score > 1/3, i.e. |txn - inv| < 2/3 * inv, which
+    # puts the invoice amount strictly between 0.6x and 3x the payment.
+    return cents * 3 / 5, cents * 3
+
+
+def _currencies(values) -> np.ndarray:
+    """:func:`_currency` of each value as an object array, worked out once
+    per distinct value."""
+    canonical = {value: _currency(value) for value in set(values)}
+    return np.array([canonical[value] for value in values], dtype=object)
+
+
+def _exact_window(cents: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # The window CandidateIndex.by_amount shortlists, a cent wider each way
+    # so float rounding at its edges cannot drop a band.
+    return cents / (1 + AMOUNT_TOLERANCE) - 1, cents / (1 - AMOUNT_TOLERANCE) + 1
+
+
+def partition_shards(
+    invoices: list[Invoice], transactions: list[Transaction], shards: int, blocking: bool = True
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Split a reconciliation into about ``shards`` independent pieces.
+
+    Invoices are grouped by currency and each currency is cut into amount
+    bands holding equal numbers of invoices, so every invoice lands in one
+    shard. A transaction goes to every band of its currency that overlaps
+    its amount window: the exact-match window with ``blocking`` (see
+    :func:`_exact_window`; names and references are matched across bands
+    by :func:`sharded_reconcile`), otherwise every amount it could still
+    match above the threshold (see :func:`_viable_range`). A window that
+    falls between two bands goes to the upper one, so each transaction is
+    in at least one band of every currency it can pair with. Records
+    without a currency pair with every currency. Records with no positive
+    amount cannot match one-to-one and are left out. Returns
+    ``(invoice_idx, transaction_idx)`` per shard, each ascending.
+    """
+    return _partition(
+        np.fromiter((inv.amount_cents for inv in invoices), dtype=np.int64, count=len(invoices)),
+        [inv.currency for inv in invoices],
+        np.fromiter((txn.amount_cents for txn in transactions), dtype=np.int64, count=len(transactions)),
+        [txn.currency for txn in transactions],
+        shards, blocking,
+    )
+
+
+def _partition(inv_cents, inv_currency, txn_cents, txn_currency, shards: int, blocking: bool) -> list:
+    """:func:`partition_shards` over amount and currency columns."""
+    inv_currency, txn_currency = _currencies(inv_currency), _currencies(txn_currency)
+    priced, payable = inv_cents > 0, txn_cents > 0
+    total = int(priced.sum())
+    window = _exact_window if blocking else _viable_range
+
+    pieces = []
+    for currency in sorted(set(inv_currency[priced].tolist()), key=str):
+        if currency is None:
+            members, same = np.flatnonzero(priced & ~inv_currency.astype(bool)), payable
+        else:
+            members = np.flatnonzero(priced & (inv_currency == currency))
+            same = payable & ((txn_currency == currency) | ~txn_currency.astype(bool))
+        members = members[np.argsort(inv_cents[members], kind="stable")]
+        bands = np.array_split(members, max(1, min(len(members), round(shards * len(members) / total))))
+        lo = np.array([inv_cents[band[0]] for band in bands])
+        hi = np.array([inv_cents[band[-1]] for band in bands])
+
+        candidates = np.flatnonzero(same)
+        low, high = window(txn_cents[candidates])
+        first = np.minimum(np.searchsorted(hi, low, side="left"), len(bands) - 1)
+        last = np.maximum(np.searchsorted(lo, high, side="right") - 1, first)
+        spans = last - first + 1
+        txns = np.repeat(candidates, spans)
+        band_of = np.repeat(first, spans) + np.arange(len(txns)) - np.repeat(np.cumsum(spans) - spans, spans)
+        order = np.argsort(band_of, kind="stable")
+        per_band = np.split(txns[order], np.searchsorted(band_of[order], np.arange(1, len(bands))))
+        pieces.extend((np.sort(band), band_txns) for band, band_txns in zip(bands, per_band) if len(band_txns))
+    return pieces
+
+
+def crowded_tokens(customer_names: list[str], max_block_size: int = MAX_BLOCK_SIZE) -> frozenset[str]:
+    """Name tokens :class:`CandidateIndex` would skip over invoices with these customer names."""
+    counts = Counter()
+    for name, repeats in Counter(customer_names).items():
+        for tok in _name_tokens(name):
+            counts[tok] += repeats
+    return frozenset(tok for tok, count in counts.items() if count > max_block_size)
+
+
+def _key_hash(key: str) -> int:
+    # Stable across processes, unlike hash(). A 64-bit collision could only
+    # add a candidate pair, never lose one.
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little", signed=True)
+
+
+def _shortlist_keys(invoices: list[Invoice], transactions: list[Transaction], crowded: frozenset[str]) -> tuple:
+    """Hashed keys :class:`CandidateIndex` shortlists names and references by.
+
+    A transaction and an invoice sharing a key are a candidate pair: a name
+    token that is not crowded over all invoices, or a reference key that is
+    an invoice id or number. Keys carry the shard's currency, so only
+    records that can pair share one. Returns ``(invoice_keys, invoice_pos,
+    transaction_keys, transaction_pos)``.
+    """
+    prefix = f"{_currency(invoices[0].currency)}:" if invoices else ""
+    name_keys = {}  # names repeat; tokenize each once
+
+    def keys(name: str, refs) -> list[str]:
+        if name not in name_keys:
+            name_keys[name] = [f"{prefix}name:{tok}" for tok in _name_tokens(name) if tok not in crowded]
+        return name_keys[name] + [f"{prefix}ref:{key}" for key in refs if key]
+
+    def columns(keys_per_record) -> tuple[np.ndarray, np.ndarray]:
+        hashed, positions = [], []
+        for pos, record_keys in enumerate(keys_per_record):
+            hashed.extend(map(_key_hash, record_keys))
+            positions.extend([pos] * len(record_keys))
+        return np.array(hashed, dtype=np.int64), np.array(positions, dtype=np.int64)
+
+    return (
+        *columns(
+            keys(inv.customer_name, {_id_key(inv.id), _id_key(inv.invoice_number or "")}) for inv in invoices
+        ),
+        *columns(keys(txn.payer_name, _reference_keys(txn.reference or "")) for txn in transactions),
+    )
+
+
+def _linked_pairs(inv_keys, inv_idx, txn_keys, txn_idx, n_inv: int) -> tuple[np.ndarray, np.ndarray]:
+    """``(txn_idx, inv_idx)`` of every transaction and invoice sharing a key,
+    each pair once, by transaction then invoice."""
+    order = np.argsort(inv_keys)
+    inv_keys, inv_idx = inv_keys[order], inv_idx[order]
+    order = np.argsort(txn_keys)  # sorted lookups are several times faster
+    txn_keys, txn_idx = txn_keys[order], txn_idx[order]
+    lo = np.searchsorted(inv_keys, txn_keys, side="left")
+    counts = np.searchsorted(inv_keys, txn_keys, side="right") - lo
+    starts = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    code = np.unique(np.repeat(txn_idx, counts) * n_inv + inv_idx[starts])
+    return code // n_inv, code % n_inv
+
+
+def _reconcile_shard(packed: tuple, assignment: str, blocking: bool, crowded: frozenset[str]) -> tuple:
+    """Scored pairs of one shard, in shard positions: each transaction's best
+    invoice for greedy assignment, every edge above the threshold for optimal.
+
+    With blocking only the amount windows are shortlisted here, and the
+    shard's :func:`_shortlist_keys` come back alongside."""
+    invoices, transactions = _unpack(packed)
+    score = _edges_above_threshold if assignment == "optimal" else _best_per_transaction
+    if not blocking:
+        return score(invoices, transactions, False), None
+    return score(invoices, transactions, True, amount_only=True), _shortlist_keys(invoices, transactions, crowded)
+
+
+def _score_linked(columns: tuple) -> tuple:
+    """:func:`score_batch` over aligned payer name, customer name, payment
+    cents and invoice cents columns, one pair per row."""
+    payer_names, customer_names, txn_cents, inv_cents = columns
+    rows = np.arange(len(txn_cents))
+    return score_batch(
+        np.array([name.lower() for name in payer_names], dtype=object),
+        np.array([name.lower() for name in customer_names], dtype=object),
+        txn_cents / 100, inv_cents / 100, rows, rows,
+    )
+
+
+def sharded_reconcile(
+    invoices: list[Invoice | dict],
+    transactions: list[Transaction | dict],
+    shards: int = 4,
+    executor=None,
+    blocking: bool = True,
+    assignment: str = "greedy",
+) -> ReconciliationResult:
+    """:func:`fuzzy_reconcile` split by currency and amount band.
+
+    The pieces from :func:`partition_shards` are scored through
+    ``executor.map`` (a :class:`~concurrent.futures.ProcessPoolExecutor`,
+    or inline when None) as :func:`pack_inputs` columns. With blocking a
+    shard only scores amount windows and returns its records' name and
+    reference keys; the keys are joined here into the pairs
+    :class:`CandidateIndex` would shortlist by name or reference, whatever
+    band each side is in, and those are scored in a second round of
+    ``shards`` jobs. A transaction is thus sent to one or two bands, not to
+    every band of its viable range.
+
+    Merging is global: for greedy assignment each transaction keeps its
+    best invoice across all scored pairs; for optimal assignment the edges
+    are pooled and split/bulk grouping and the one-to-one matching run over
+    all of them in this process, so every invoice is claimed once.
+
+    The result is that of :func:`fuzzy_reconcile`, except where more than
+    :data:`MAX_BLOCK_SIZE` invoices share an amount window: each shard keeps
+    the closest ones of its own part of the window.
+    """
+    invoices = invoice_records(invoices)
+    transactions = transaction_records(transactions)
+    # Pack once; each shard is a slice of the columns.
+    columns = pack_inputs(invoices, transactions)
+    pieces = _partition(columns[2], columns[4], columns[7], columns[9], shards, blocking)
+    # Name tokens too common to block on are judged over the whole set, as
+    # the unsharded index would.
+    crowded = crowded_tokens(columns[1]) if blocking else frozenset()
+    # The bands with the most payments cost the most; hand them out first
+    # so they don't finish last.
+    pieces.sort(key=lambda piece: -len(piece[1]))
+    columns = [np.asarray(column, dtype=object) if isinstance(column, list) else column for column in columns]
+    packed = (
+        tuple(column[inv_idx] for column in columns[:5]) + tuple(column[txn_idx] for column in columns[5:])
+        for inv_idx, txn_idx in pieces
+    )
+    scored = (executor.map if executor is not None else map)(
+        functools.partial(_reconcile_shard, assignment=assignment, blocking=blocking, crowded=crowded), packed
+    )
+    merged, postings = [], []
+    for (invs, txns), ((txn_idx, inv_idx, *scores), keys) in zip(pieces, scored):
+        merged.append((txns[txn_idx], invs[inv_idx], *scores))
+        if keys is not None:
+            inv_keys, inv_pos, txn_keys, txn_pos = keys
+            postings.append((inv_keys, invs[inv_pos], txn_keys, txns[txn_pos]))
+
+    if postings:
+        txn_idx, inv_idx = _linked_pairs(*(np.concatenate(c) for c in zip(*postings)), len(invoices))
+        # Pairs outside the viable range cannot clear the threshold.
+        low, high = _viable_range(columns[7][txn_idx])
+        viable = (columns[2][inv_idx] >= low) & (columns[2][inv_idx] <= high)
+        txn_idx, inv_idx = txn_idx[viable], inv_idx[viable]
+        rows = [r for r in np.array_split(np.arange(len(txn_idx)), max(1, shards)) if len(r)]
+        linked = (executor.map if executor is not None else map)(_score_linked, (
+            (columns[6][txn_idx[r]], columns[1][inv_idx[r]], columns[7][txn_idx[r]], columns[2][inv_idx[r]])
+            for r in rows
+        ))
+        for r, (confidence, name_score, amount_score) in zip(rows, linked):
+            keep = confidence > MATCH_THRESHOLD
+            merged.append((txn_idx[r][keep], inv_idx[r][keep], confidence[keep], name_score[keep], amount_score[keep]))
+
+    if merged:
+        txn_idx, inv_idx, confidence, name_score, amount_score = (np.concatenate(c) for c in zip(*merged))
+    else:
+        txn_idx = inv_idx = np.empty(0, dtype=np.int64)
+        confidence = name_score = amount_score = np.empty(0)
+
+    if assignment == "optimal":
+        # A pair can come from both an amount window and a key; keep it once,
+        # in the unsharded edge order: by transaction, then invoice.
+        _, first = np.unique(txn_idx * max(1, len(invoices)) + inv_idx, return_index=True)
+        txn_idx, inv_idx = txn_idx[first], inv_idx[first]
+        confidence, name_score, amount_score = confidence[first], name_score[first], amount_score[first]
+        txn_idx, inv_idx, confidence, flags, groups = _assign_optimal(
+            invoices, transactions, txn_idx, inv_idx, confidence, name_score, amount_score
+        )
+    else:
+        # Best across shards: highest confidence, lowest invoice on ties.
+        order = np.lexsort((inv_idx, -confidence, txn_idx))
+        _, first = np.unique(txn_idx[order], return_index=True)
+        top = order[first]
+        txn_idx, inv_idx, confidence = txn_idx[top], inv_idx[top], confidence[top]
+        flags, groups = reason_flags(name_score[top], amount_score[top]), {}
+    return ReconciliationResult(invoices, transactions, txn_idx, inv_idx, confidence, flags, groups)
+
+
+def _best_per_transaction_pairwise(
+    invoices: list[Invoice], transactions: list[Transaction], blocking: bool
+) -> dict:
+    best = {}
+    index = CandidateIndex(invoices) if blocking else None
+    every_invoice = range(len(invoices))
+    customer_names = [inv.customer_name.lower() for inv in invoices]
+
+    currencies = [_currency(inv.currency) for inv in invoices]
+
+    for t, txn in enumerate(transactions):
+        payer_name = txn.payer_name.lower()
+        txn_amount = txn.amount
+        currency = _currency(txn.currency)
+        best_score = 0.0
+
+        for idx in (index.candidates(txn) if index else every_invoice):
+            if not _same_currency(currencies[idx], currency):
+                continue
+            confidence, name_score, amount_score = score_pair(
+                payer_name, customer_names[idx], txn_amount, invoices[idx].amount
+            )
+            if confidence > best_score:
+                best_score = confidence
+                best[t] = (idx, confidence, name_score, amount_score)
+    return best
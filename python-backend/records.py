@@ -0,0 +1,122 @@
+import sys
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+# Values repeated across records (a customer's name and email, dates,
+# currencies) are interned so a large run holds one copy of each.
+
+
+def to_cents(amount) -> int:
+    return round(float(amount or 0) * 100)
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+@dataclass(slots=True)
+class Invoice:
+    """An invoice as reconciliation sees it, with the amount in integer cents.
+
+    Fields missing upstream stay None and are left out of :meth:`to_dict`;
+    any other upstream fields ride along in ``extra`` so the response keeps
+    the record as it was fetched.
+    """
+
+    id: str
+    customer_name: str
+    amount_cents: int
+    customer_email: str | None = None
+    currency: str | None = None
+    due_date: str | None = None
+    days_overdue: int | None = None
+    status: str | None = None
+    invoice_number: str | None = None
+    extra: dict | None = None
+
+    @property
+    def amount(self) -> float:
+        return self.amount_cents / 100
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Invoice":
+        extra = {k: v for k, v in data.items() if k not in _INVOICE_FIELDS}
+        return cls(
+            id=data.get("id", ""),
+            customer_name=_intern(data.get("customer_name", "")),
+            amount_cents=to_cents(data.get("amount")),
+            customer_email=_intern(data.get("customer_email")),
+            currency=_intern(data.get("currency")),
+            due_date=_intern(data.get("due_date")),
+            days_overdue=data.get("days_overdue"),
+            status=_intern(data.get("status")),
+            invoice_number=data.get("invoice_number"),
+            extra=extra or None,
+        )
+
+    def to_dict(self) -> dict:
+        data = {"id": self.id, "customer_name": self.customer_name}
+        if self.customer_email is not None:
+            data["customer_email"] = self.customer_email
+        data["amount"] = self.amount
+        for field in ("currency", "due_date", "days_overdue", "status", "invoice_number"):
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+@dataclass(slots=True)
+class Transaction:
+    """A payment as reconciliation sees it, with the amount in integer cents."""
+
+    id: str
+    payer_name: str
+    amount_cents: int
+    currency: str | None = None
+    date: str | None = None
+    reference: str | None = None
+    extra: dict | None = None
+
+    @property
+    def amount(self) -> float:
+        return self.amount_cents / 100
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Transaction":
+        extra = {k: v for k, v in data.items() if k not in _TRANSACTION_FIELDS}
+        return cls(
+            id=data.get("id", ""),
+            payer_name=_intern(data.get("payer_name", "")),
+            amount_cents=to_cents(data.get("amount")),
+            currency=_intern(data.get("currency")),
+            date=_intern(data.get("date")),
+            reference=data.get("reference"),
+            extra=extra or None,
+        )
+
+    def to_dict(self) -> dict:
+        data = {"id": self.id, "payer_name": self.payer_name, "amount": self.amount}
+        for field in ("currency", "date", "reference"):
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+_INVOICE_FIELDS = {
+    "id", "customer_name", "amount", "customer_email", "currency", "due_date", "days_overdue", "status", "invoice_number",
+}
+_TRANSACTION_FIELDS = {"id", "payer_name", "amount", "currency", "date", "reference"}
+
+
+def invoice_records(invoices: Iterable[dict | Invoice]) -> list[Invoice]:
+    return [inv if isinstance(inv, Invoice) else Invoice.from_dict(inv) for inv in invoices]
+
+
+def transaction_records(transactions: Iterable[dict | Transaction]) -> list[Transaction]:
+    return [txn if isinstance(txn, Transaction) else Transaction.from_dict(txn) for txn in transactions]
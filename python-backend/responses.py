@@ -0,0 +1,110 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+
+# Serialized payloads kept for reuse; each entry also pins its payload.
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+def etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+class JSONResponse(ORJSONResponse):
+    """Default response class: orjson, with the same fallbacks as :func:`dumps`."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class SerializedPayloads:
+    """Encoded bytes and ETag per payload object.
+
+    Materialized payloads (insights snapshots, analysis results, demo data)
+    are replaced on change, never mutated, so a payload that is the same
+    object as last time has the same bytes. Entries hold a reference to
+    their payload, which keeps its ``id`` from being reused; the least
+    recently served are dropped past ``max_entries``.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[object, bytes, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0}
+
+    def get(self, payload) -> tuple[bytes, str]:
+        key = id(payload)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is payload:
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return entry[1], entry[2]
+        body = dumps(payload)
+        tag = etag(body)
+        with self._lock:
+            self.counters["misses"] += 1
+            self._entries[key] = (payload, body, tag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, tag
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), **self.counters}
+
+
+serialized_payloads = SerializedPayloads()
+
+
+def _not_modified(request: Request, tag: str) -> bool:
+    # If-None-Match only turns into a 304 for GET and HEAD (RFC 9110 13.1.2).
+    if request.method not in ("GET", "HEAD"):
+        return False
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    return "*" in candidates or tag in candidates
+
+
+def json_response(request: Request, payload, extra: dict | None = None, cached: bool = True) -> Response:
+    """Serve ``payload`` as JSON with an ETag, or 304 if a GET/HEAD client has it.
+
+    With ``cached`` the bytes come from :data:`serialized_payloads`; pass
+    ``cached=False`` for payloads built fresh per request. ``extra`` keys
+    are merged into a dict payload, replacing keys of the same name, and
+    the merged dict is encoded per request.
+    """
+    if extra:
+        body, tag = dumps({**payload, **extra}), None
+    elif cached:
+        body, tag = serialized_payloads.get(payload)
+    else:
+        body, tag = dumps(payload), None
+    tag = tag or etag(body)
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if _not_modified(request, tag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,114 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data.cache import AsyncCache, index_by_id  # noqa: E402
+
+
+class Loader:
+    """Counts upstream calls; each call returns the next value."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return [self.calls]
+
+
+def test_concurrent_misses_share_one_call():
+    cache = AsyncCache(ttl=30, stale_ttl=300, max_weight=100)
+    load = Loader(delay=0.01)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get(("conn", "invoices"), load) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert load.calls == 1
+    assert all(result is results[0] for result in results)
+    assert cache.counters["misses"] == 1 and cache.counters["coalesced"] == 4
+
+
+def test_stale_value_is_served_while_refreshing():
+    cache = AsyncCache(ttl=0.05, stale_ttl=30, max_weight=100)
+    load = Loader()
+
+    async def scenario():
+        first = await cache.get(("conn", "invoices"), load)
+        await asyncio.sleep(0.06)
+        stale = await cache.get(("conn", "invoices"), load)
+        await asyncio.sleep(0.01)  # let the background refresh finish
+        fresh = await cache.get(("conn", "invoices"), load)
+        return first, stale, fresh
+
+    first, stale, fresh = asyncio.run(scenario())
+    assert stale is first
+    assert fresh == [2]
+    assert cache.counters["stale_hits"] == 1 and cache.counters["hits"] == 1
+
+
+def test_failed_load_is_raised_and_not_cached():
+    cache = AsyncCache(ttl=30, stale_ttl=300, max_weight=100)
+    failing = Loader(fail=True)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await cache.get(("conn", "invoices"), failing)
+        return await cache.get(("conn", "invoices"), Loader())
+
+    assert asyncio.run(scenario()) == [1]
+    assert cache.counters["load_errors"] == 1
+
+
+def test_weight_bound_evicts_least_recently_used():
+    cache = AsyncCache(ttl=30, stale_ttl=300, max_weight=5)
+
+    async def value(records):
+        return records
+
+    async def scenario():
+        await cache.get(("conn", "a"), lambda: value([1, 2]))
+        await cache.get(("conn", "b"), lambda: value([3, 4]))
+        await cache.get(("conn", "a"), lambda: value([]))  # touch a, so b is the oldest
+        await cache.get(("conn", "c"), lambda: value([5, 6]))
+        await cache.get(("conn", "huge"), lambda: value(list(range(10))))  # heavier than the bound
+
+    asyncio.run(scenario())
+    assert cache.peek(("conn", "a")) == [1, 2]
+    assert cache.peek(("conn", "b")) is None
+    assert cache.peek(("conn", "c")) == [5, 6]
+    assert cache.peek(("conn", "huge")) is None
+    assert cache.stats()["weight"] == 4 and cache.counters["evictions"] == 1
+
+
+def test_invalidate_detaches_in_flight_loads():
+    cache = AsyncCache(ttl=30, stale_ttl=300, max_weight=100)
+
+    async def scenario():
+        await cache.get(("conn", "invoice", "inv_1"), Loader())
+        await cache.get(("other", "invoice", "inv_1"), Loader())
+        pending = asyncio.create_task(cache.get(("conn", "invoices"), Loader(delay=0.01)))
+        await asyncio.sleep(0)
+        assert cache.invalidate("conn") == 1
+        assert await pending == [1]  # the caller still gets its result ...
+
+    asyncio.run(scenario())
+    assert cache.peek(("conn", "invoices")) is None  # ... but it is not stored
+    assert cache.peek(("other", "invoice", "inv_1")) == [1]
+
+
+def test_index_by_id_is_rebuilt_for_a_new_list():
+    records = [{"id": "inv_1"}, {"id": 2}]
+    index = index_by_id(records)
+    assert index_by_id(records) is index
+    assert set(index) == {"inv_1", "2"}
+    assert index_by_id(list(records)) is not index
@@ -0,0 +1,65 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data.fanout import fan_out  # noqa: E402
+
+
+def returns(value, delay: float = 0.0):
+    async def call():
+        await asyncio.sleep(delay)
+        return value
+    return call
+
+
+def raises(exc: Exception):
+    async def call():
+        raise exc
+    return call
+
+
+def test_calls_run_concurrently():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await fan_out({name: returns(name, 0.05) for name in ("a", "b", "c")})
+        return results, loop.time() - start
+
+    (results, errors), elapsed = asyncio.run(scenario())
+    assert results == {"a": "a", "b": "b", "c": "c"} and errors == {}
+    assert elapsed < 0.14
+
+
+def test_optional_failures_are_reported():
+    calls = {
+        "invoices": returns([1, 2]),
+        "monthly": raises(ValueError("bad month")),
+        "periods": returns([], delay=1),
+    }
+    results, errors = asyncio.run(fan_out(calls, required={"invoices"}, deadline=0.05))
+    assert results == {"invoices": [1, 2]}
+    assert errors == {"monthly": "ValueError: bad month", "periods": "timed out after 0.05s"}
+
+
+def test_required_failure_cancels_siblings():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with pytest.raises(ValueError, match="no invoices"):
+        asyncio.run(fan_out({"invoices": raises(ValueError("no invoices")), "periods": slow}))
+    assert cancelled == [True]
+
+
+def test_required_timeout_names_the_call():
+    with pytest.raises(TimeoutError, match="invoices did not finish within 0.05s"):
+        asyncio.run(fan_out({"invoices": returns([], delay=1)}, deadline=0.05))
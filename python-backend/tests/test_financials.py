@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from financials import FinancialSeries, financial_series  # noqa: E402
+
+PERIODS = [
+    {"month": "Jan", "revenue": 100, "expenses": 60, "profit": 40, "sales": 3, "cogs": 40, "operating_expenses": 20},
+    {"month": "Feb", "revenue": 150, "expenses": 90, "profit": 60, "sales": 5, "cogs": 60, "operating_expenses": 30},
+    {"month": "Mar", "revenue": 50.5, "expenses": 70, "profit": -19.5, "sales": 1, "cogs": 50, "operating_expenses": 20},
+]
+
+
+def test_stats_match_the_plain_sums():
+    stats = FinancialSeries.from_periods(PERIODS).stats
+    assert stats["totals"]["revenue"] == 300.5
+    assert stats["totals"]["sales"] == 9 and isinstance(stats["totals"]["sales"], int)
+    assert stats["margin"] == round(80.5 / 300.5 * 100, 1)
+    assert stats["expense_ratios"] == [60.0, 60.0, 138.6]
+    assert stats["best_revenue"] == 1 and stats["worst_profit"] == 2
+    assert stats["period_growth"] == -49.5
+
+
+def test_empty_series_has_neutral_stats():
+    stats = FinancialSeries.from_periods([]).stats
+    assert stats["totals"]["revenue"] == 0
+    assert stats["margin"] == 0 and stats["recent_growth"] == 0
+    assert stats["best_revenue"] is None
+
+
+def test_quarters_pad_missing_months():
+    quarters = FinancialSeries.from_periods(PERIODS[:2]).quarters
+    assert [q["period"] for q in quarters] == ["Q1", "Q2", "Q3", "Q4"]
+    assert quarters[0]["revenue"] == 250 and quarters[1]["revenue"] == 0
+
+
+def test_group_sum_by_key():
+    series = FinancialSeries.from_periods(PERIODS)
+    keys, sums = series.group_sum(np.array([1, 0, 1]))
+    assert keys.tolist() == [0, 1]
+    assert sums[:, 0].tolist() == [150.0, 150.5]
+
+
+def test_series_is_built_once_per_list():
+    periods = list(PERIODS)
+    series = financial_series(periods)
+    assert financial_series(periods) is series
+    assert financial_series(list(PERIODS)) is not series
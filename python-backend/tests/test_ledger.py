@@ -0,0 +1,107 @@
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ledger import ReconciliationLedger  # noqa: E402
+from reconciliation import fuzzy_reconcile  # noqa: E402
+
+SCOPE = "acct:pay"
+TODAY = date.today()
+
+
+def invoice(inv_id: str, name: str, amount: float) -> dict:
+    return {"id": inv_id, "customer_name": name, "amount": amount, "currency": "USD", "status": "overdue"}
+
+
+def transaction(txn_id: str, payer: str, amount: float, days_ago: int = 1) -> dict:
+    dated = (TODAY - timedelta(days=days_ago)).isoformat()
+    return {"id": txn_id, "payer_name": payer, "amount": amount, "date": dated, "reference": f"{txn_id}-REF"}
+
+
+INVOICES = [invoice("inv_1", "Acme Corp", 1200.0), invoice("inv_2", "Globex Labs", 830.0)]
+TRANSACTIONS = [transaction("txn_1", "ACME CORPORATION", 1200.0), transaction("txn_2", "Unknown Sender", 55.0)]
+
+
+class CountingReconcile:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, invoices, transactions, **options):
+        self.calls.append((len(invoices), len(transactions)))
+        return fuzzy_reconcile(invoices, transactions, **options)
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return ReconciliationLedger(tmp_path / "ledger.db", window_days=30)
+
+
+def pairs(result) -> set[tuple[str, str]]:
+    return {(txn.id, inv.id) for txn, inv, *_ in result.matches()}
+
+
+def test_unchanged_records_are_not_rescored(ledger):
+    reconcile = CountingReconcile()
+    first = ledger.run(SCOPE, INVOICES, TRANSACTIONS, reconcile=reconcile)
+    assert pairs(first) == {("txn_1", "inv_1")}
+    assert reconcile.calls == [(2, 2)]
+
+    again = ledger.run(SCOPE, INVOICES, TRANSACTIONS, reconcile=reconcile)
+    assert pairs(again) == pairs(first)
+    assert reconcile.calls == [(2, 2)]
+    assert again.counts() == (1, 1, 1)
+
+
+def test_new_transaction_is_scored_against_open_invoices_only(ledger):
+    ledger.run(SCOPE, INVOICES, TRANSACTIONS)
+    reconcile = CountingReconcile()
+    result = ledger.run(SCOPE, INVOICES, [transaction("txn_3", "Globex Labs", 830.0)], reconcile=reconcile)
+    assert reconcile.calls == [(1, 1)]  # inv_1 is settled; txn_2 already failed
+    assert pairs(result) == {("txn_1", "inv_1"), ("txn_3", "inv_2")}
+
+
+def test_changed_record_voids_its_match(ledger):
+    ledger.run(SCOPE, INVOICES, TRANSACTIONS)
+    corrected = [transaction("txn_1", "GLOBEX LABS", 830.0)]  # the bank feed corrected the payment
+    result = ledger.run(SCOPE, INVOICES, corrected)
+    assert pairs(result) == {("txn_1", "inv_2")}
+    assert [u["invoice"]["id"] for u in result.unmatched_invoices()] == ["inv_1"]
+
+
+def test_complete_invoice_list_drops_missing_open_invoices(ledger):
+    ledger.run(SCOPE, INVOICES, TRANSACTIONS)
+    result = ledger.run(SCOPE, INVOICES[:1], [])
+    assert {inv.id for inv in result.invoices} == {"inv_1"}  # inv_2 is no longer overdue
+    assert pairs(result) == {("txn_1", "inv_1")}  # matched records stay
+
+
+def test_old_transactions_age_out_with_their_matches(ledger):
+    ledger.run(SCOPE, INVOICES, [transaction("txn_old", "Acme Corp", 1200.0, days_ago=10)])
+    ledger.window_days = 5
+    result = ledger.run(SCOPE, INVOICES, [])
+    assert pairs(result) == set()
+    assert {txn.id for txn in result.transactions} == set()
+
+
+def test_snapshot_reads_the_last_run_without_writing(ledger):
+    run = ledger.run(SCOPE, INVOICES, TRANSACTIONS)
+    watermark = ledger.watermark(SCOPE, "transaction")
+    snapshot = ledger.snapshot(SCOPE)
+    assert pairs(snapshot) == pairs(run)
+    assert snapshot.to_dict() == run.to_dict()
+    assert ledger.watermark(SCOPE, "transaction") == watermark
+    assert ledger.snapshot("other:scope").counts() == (0, 0, 0)
+
+
+def test_snapshot_leaves_out_aged_transactions(ledger):
+    ledger.run(SCOPE, INVOICES, [transaction("txn_old", "Acme Corp", 1200.0, days_ago=10)])
+    ledger.window_days = 5
+    snapshot = ledger.snapshot(SCOPE)
+    assert pairs(snapshot) == set()
+    assert {inv.id for inv in snapshot.invoices} == {"inv_1", "inv_2"}
+    ledger.window_days = 30
+    assert pairs(ledger.snapshot(SCOPE)) == {("txn_old", "inv_1")}  # nothing was deleted
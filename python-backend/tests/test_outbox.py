@@ -0,0 +1,101 @@
+import asyncio
+import sqlite3
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import outbox  # noqa: E402
+from outbox import EmailOutbox  # noqa: E402
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_BACKOFF_MAX", 0.01)
+    monkeypatch.setattr(outbox, "OUTBOX_POLL_INTERVAL", 0.01)
+
+
+async def drain(box: EmailOutbox) -> dict:
+    await box.start()
+    try:
+        for _ in range(500):
+            counts = await box.counts()
+            if counts["queued"] == 0 and counts["sending"] == 0:
+                return counts
+            await asyncio.sleep(0.01)
+        raise AssertionError(f"outbox did not drain: {counts}")
+    finally:
+        await box.stop()
+
+
+def test_enqueue_is_idempotent_and_retries_transient_failures(tmp_path, monkeypatch, fast_retries):
+    sent = []
+
+    async def send_email(connection_id, to, subject, body, invoice_id=None, idempotency_key=None):
+        sent.append(idempotency_key)
+        if len(sent) == 1:
+            request = httpx.Request("POST", "https://unified.test/messaging")
+            raise httpx.HTTPStatusError("busy", request=request, response=httpx.Response(503, request=request))
+        return {"response": {"id": f"msg-{len(sent)}"}}
+
+    monkeypatch.setattr(outbox, "send_email", send_email)
+
+    async def scenario():
+        box = EmailOutbox(tmp_path / "outbox.db", workers=2, rate=0)
+        first = await box.enqueue("conn", "ap@example.com", "Invoice 1", "Please pay.", invoice_id="inv_1")
+        again = await box.enqueue("conn", "ap@example.com", "Invoice 1", "Please pay.", invoice_id="inv_1")
+        assert again["id"] == first["id"]
+        counts = await drain(box)
+        return first["id"], counts, await box.status(first["id"])
+
+    message_id, counts, message = asyncio.run(scenario())
+    assert counts["sent"] == 1 and counts["failed"] == 0
+    assert message["status"] == "sent" and message["attempts"] == 2
+    assert message["response"] == {"id": "msg-2"}
+    assert sent == [message_id, message_id]  # the retry reuses the idempotency key
+
+
+def test_permanent_failure_is_not_retried(tmp_path, monkeypatch, fast_retries):
+    async def send_email(*args, **kwargs):
+        request = httpx.Request("POST", "https://unified.test/messaging")
+        raise httpx.HTTPStatusError("bad", request=request, response=httpx.Response(400, request=request))
+
+    monkeypatch.setattr(outbox, "send_email", send_email)
+
+    async def scenario():
+        box = EmailOutbox(tmp_path / "outbox.db", workers=1, rate=0)
+        message = await box.enqueue("conn", "ap@example.com", "Invoice 2", "Please pay.")
+        await drain(box)
+        return await box.status(message["id"])
+
+    message = asyncio.run(scenario())
+    assert message["status"] == "failed" and message["attempts"] == 1
+    assert message["last_error"] == "HTTPStatusError: bad"
+
+
+def test_worker_survives_database_errors(tmp_path, monkeypatch, fast_retries):
+    async def send_email(*args, **kwargs):
+        return {"response": {}}
+
+    monkeypatch.setattr(outbox, "send_email", send_email)
+    box = EmailOutbox(tmp_path / "outbox.db", workers=1, rate=0)
+    claim, failures = box._claim, []
+
+    def flaky_claim():
+        if len(failures) < 3:
+            failures.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        return claim()
+
+    monkeypatch.setattr(box, "_claim", flaky_claim)
+
+    async def scenario():
+        await box.enqueue("conn", "ap@example.com", "Invoice 3", "Please pay.")
+        return await drain(box)
+
+    counts = asyncio.run(scenario())
+    assert len(failures) == 3
+    assert counts["sent"] == 1
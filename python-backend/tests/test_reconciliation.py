@@ -0,0 +1,106 @@
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import reconciliation  # noqa: E402
+from reconciliation import fuzzy_reconcile, max_weight_matching, sharded_reconcile  # noqa: E402
+from records import invoice_records, transaction_records  # noqa: E402
+
+CURRENCIES = ["USD", "EUR", "gbp", None]
+
+
+def mixed_currency(rows: int, seed: int = 3):
+    """Customers billed in several currencies, paid in the same or another one."""
+    rng = random.Random(seed)
+    names = [f"{rng.choice(['Acme', 'Globex', 'Initech', 'Umbrella', 'Stark'])} {k} Ltd" for k in range(rows // 4)]
+    invoices, transactions = [], []
+    for k in range(rows):
+        name = rng.choice(names)
+        amount = round(rng.uniform(50, 5000), 2)
+        currency = rng.choice(CURRENCIES)
+        invoices.append({"id": f"INV-{k}", "customer_name": name, "amount": amount, "currency": currency})
+        if rng.random() < 0.7:
+            paid_in = currency if rng.random() < 0.6 else rng.choice(CURRENCIES)
+            transactions.append({
+                "id": f"TXN-{k}",
+                "payer_name": name.upper() if rng.random() < 0.5 else name,
+                "amount": round(amount * rng.uniform(0.97, 1.03), 2),
+                "currency": paid_in and paid_in.lower(),
+                "reference": f"INV-{k}" if rng.random() < 0.2 else "",
+            })
+    rng.shuffle(transactions)
+    return invoice_records(invoices), transaction_records(transactions)
+
+
+def pairs(result):
+    return list(zip(result.txn_idx.tolist(), result.inv_idx.tolist()))
+
+
+def known_currency(record):
+    return record.currency and record.currency.upper()
+
+
+@pytest.mark.parametrize("assignment", ["greedy", "optimal"])
+@pytest.mark.parametrize("shards", [1, 4])
+def test_sharded_matches_unsharded_across_currencies(assignment, shards):
+    invoices, transactions = mixed_currency(3000)
+    base = fuzzy_reconcile(invoices, transactions, assignment=assignment)
+    sharded = sharded_reconcile(invoices, transactions, shards, assignment=assignment)
+    assert pairs(sharded) == pairs(base)
+    np.testing.assert_allclose(sharded.confidence, base.confidence)
+    assert sharded.groups == base.groups
+
+
+def test_sharded_links_names_and_references_across_bands():
+    invoices, _ = mixed_currency(3000)
+    # Short payments fall outside their invoice's exact-amount window, often
+    # in another band; only the name and the reference lead to the invoice.
+    short = transaction_records([
+        {
+            "id": f"PART-{k}",
+            "payer_name": inv.customer_name,
+            "amount": round(inv.amount * 0.9, 2),
+            "currency": inv.currency,
+            "reference": f"Part payment {inv.id}",
+        }
+        for k, inv in enumerate(invoices[:200])
+    ])
+    base = fuzzy_reconcile(invoices, short)
+    assert sum(t == i for t, i in pairs(base)) > 50
+    assert pairs(sharded_reconcile(invoices, short, 32)) == pairs(base)
+
+
+@pytest.mark.parametrize("blocking", [True, False])
+@pytest.mark.parametrize("scoring", ["batch", "pairwise"])
+def test_no_match_between_known_currencies(blocking, scoring):
+    invoices, transactions = mixed_currency(600)
+    result = fuzzy_reconcile(invoices, transactions, blocking=blocking, scoring=scoring)
+    assert len(result.txn_idx)
+    for t, i in pairs(result):
+        a, b = known_currency(transactions[t]), known_currency(invoices[i])
+        assert a is None or b is None or a == b
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_sparse_assignment_matches_dense(seed, monkeypatch):
+    # Coarse weights give plenty of ties, which is where auctions go wrong.
+    rng = np.random.default_rng(seed)
+    n, edges = 400, 3000
+    txn_idx = rng.integers(0, n, edges)
+    inv_idx = np.minimum(txn_idx + rng.integers(0, 40, edges), n - 1)
+    keep = np.unique(txn_idx * n + inv_idx, return_index=True)[1]
+    txn_idx, inv_idx = txn_idx[keep], inv_idx[keep]
+    weight = np.round(rng.uniform(0.6, 1.0, len(keep)), 2)
+
+    dense = max_weight_matching(n, n, txn_idx, inv_idx, weight)
+    monkeypatch.setattr(reconciliation, "DENSE_COMPONENT_CELLS", 0)
+    sparse = max_weight_matching(n, n, txn_idx, inv_idx, weight)
+    for picked in (dense, sparse):
+        assert len(np.unique(txn_idx[picked])) == len(picked)
+        assert len(np.unique(inv_idx[picked])) == len(picked)
+    assert weight[sparse].sum() >= weight[dense].sum() - reconciliation.AUCTION_TOLERANCE
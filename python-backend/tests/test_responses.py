@@ -0,0 +1,76 @@
+import sys
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from responses import SerializedPayloads, json_response, serialized_payloads  # noqa: E402
+
+PAYLOAD = {"month": "2026-02", "total": 1250.5}
+
+app = FastAPI()
+
+
+@app.get("/snapshot")
+async def snapshot(request: Request):
+    return json_response(request, PAYLOAD)
+
+
+@app.post("/snapshot")
+async def snapshot_post(request: Request):
+    return json_response(request, PAYLOAD)
+
+
+@app.get("/fresh")
+async def fresh(request: Request):
+    return json_response(request, dict(PAYLOAD), extra={"total": 0, "note": "extra"}, cached=False)
+
+
+client = TestClient(app)
+
+
+def test_get_revalidates_to_304():
+    first = client.get("/snapshot")
+    assert first.status_code == 200
+    assert first.json() == PAYLOAD
+    tag = first.headers["etag"]
+
+    again = client.get("/snapshot", headers={"If-None-Match": tag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == tag
+    assert again.content == b""
+
+    assert client.get("/snapshot", headers={"If-None-Match": f"W/{tag}"}).status_code == 304
+    assert client.get("/snapshot", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_post_ignores_if_none_match():
+    tag = client.get("/snapshot").headers["etag"]
+    response = client.post("/snapshot", headers={"If-None-Match": tag})
+    assert response.status_code == 200
+    assert response.json() == PAYLOAD
+    assert client.post("/snapshot", headers={"If-None-Match": "*"}).status_code == 200
+
+
+def test_extra_keys_replace_payload_keys():
+    response = client.get("/fresh")
+    assert response.json() == {"month": "2026-02", "total": 0, "note": "extra"}
+    assert client.get("/fresh", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+
+def test_serialized_payloads_reuse_bytes_per_object():
+    cache = SerializedPayloads(max_entries=2)
+    payload = {"a": 1}
+    body, tag = cache.get(payload)
+    assert cache.get(payload) == (body, tag)
+    assert cache.counters == {"hits": 1, "misses": 1}
+
+    # An equal but distinct object is encoded again; old entries are evicted.
+    cache.get({"a": 1})
+    cache.get({"b": 2})
+    assert cache.stats()["entries"] == 2
+    cache.get(payload)
+    assert cache.counters["misses"] == 4
+    assert serialized_payloads.get(PAYLOAD)[1] == client.get("/snapshot").headers["etag"]
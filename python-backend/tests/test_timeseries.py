@@ -0,0 +1,95 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import timeseries  # noqa: E402
+from timeseries import TimeSeriesEngine, bucket_keys, bucket_labels, day_number, financial_analysis  # noqa: E402
+
+
+def engine_with(entries: list[dict]) -> TimeSeriesEngine:
+    engine = TimeSeriesEngine()
+    engine.add(entries)
+    return engine
+
+
+def test_buckets_follow_the_calendar():
+    days = np.array([day_number("2026-01-01"), day_number("2025-12-29"), day_number("2026-04-01")])
+    assert bucket_labels("week", bucket_keys("week", days)) == ["2026-W01", "2026-W01", "2026-W14"]
+    assert bucket_labels("quarter", bucket_keys("quarter", days)) == ["Q1 2026", "Q4 2025", "Q2 2026"]
+    assert bucket_labels("month", bucket_keys("month", days), with_year=False) == ["Jan", "Dec", "Apr"]
+
+
+def test_series_sums_each_bucket_in_cents():
+    engine = engine_with([
+        {"date": "2026-01-05", "revenue": 0.1, "cogs": 0.05},
+        {"date": "2026-01-20", "revenue": 0.2, "operating_expenses": 0.01, "sales": 2},
+        {"date": "2026-03-02T10:00:00Z", "revenue": 5},
+    ])
+    months = engine.series("month", date(2026, 1, 1), date(2026, 3, 31))
+    assert months.labels == ["Jan", "Feb", "Mar"]
+    assert months.column("revenue") == [0.3, 0.0, 5.0]  # no float drift
+    assert months.column("expenses") == [0.06, 0.0, 0.0]
+    assert months.column("profit") == [0.24, 0.0, 5.0]
+    assert months.column("sales") == [2, 0, 0]
+
+
+def test_resent_entries_replace_their_earlier_values():
+    engine = engine_with([{"id": "inv_1", "date": "2026-01-05", "revenue": 100}])
+    version = engine.version
+    assert engine.add([{"id": "inv_1", "date": "2026-01-05", "revenue": 100}]) == 0
+    assert engine.version == version
+    engine.add([{"id": "inv_1", "date": "2026-02-10", "revenue": 40}])  # moved and changed
+    months = engine.series("month", date(2026, 1, 1), date(2026, 2, 28))
+    assert months.column("revenue") == [0.0, 40.0]
+    assert len(engine) == 1
+
+
+def test_rolling_and_prior_year():
+    engine = engine_with([
+        {"date": "2025-02-01", "revenue": 10},
+        {"date": "2025-12-01", "revenue": 1},
+        {"date": "2026-01-01", "revenue": 2},
+        {"date": "2026-02-01", "revenue": 4},
+    ])
+    start, end = date(2026, 1, 1), date(2026, 2, 28)
+    assert engine.rolling("month", start, end, 2).column("revenue") == [3.0, 6.0]
+    prior = engine.prior_year("month", start, end)
+    assert prior.labels == ["Jan 2025", "Feb 2025"]
+    assert prior.column("revenue") == [0.0, 10.0]
+
+
+def test_analysis_payload_is_cached_until_the_next_add():
+    engine = engine_with([{"date": "2026-01-15", "revenue": 100, "cogs": 30}])
+    first = financial_analysis(engine, 2026, "monthly", compare_prior_year=True)
+    assert financial_analysis(engine, 2026, "monthly", compare_prior_year=True) is first
+    assert first["summary"]["total_profit"] == 70.0
+    assert first["summary"]["best_month"] == "Jan"
+    assert first["periods"][0]["prior_year"]["revenue_change"] is None
+
+    engine.add([{"date": "2026-02-15", "revenue": 50}])
+    again = financial_analysis(engine, 2026, "monthly")
+    assert again is not first
+    assert again["summary"]["total_revenue"] == 150.0
+
+
+def test_yearly_view_spans_five_years():
+    engine = engine_with([{"date": "2022-06-01", "revenue": 1}, {"date": "2026-06-01", "revenue": 2}])
+    periods = financial_analysis(engine, 2026, "yearly")["periods"]
+    assert [p["period"] for p in periods] == ["2022", "2023", "2024", "2025", "2026"]
+    assert [p["revenue"] for p in periods] == [1.0, 0.0, 0.0, 0.0, 2.0]
+    assert timeseries.min_year("yearly") == timeseries.YEARLY_SPAN
+    assert timeseries.min_year("monthly") == 1
+
+
+def test_result_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(timeseries, "TIMESERIES_CACHE_SIZE", 4)
+    engine = engine_with([{"date": "2026-01-15", "revenue": 1}])
+    first = engine.series("day", date(2026, 1, 1), date(2026, 1, 31))
+    for day in range(2, 10):
+        engine.series("day", date(2026, 1, day), date(2026, 1, 31))
+    assert len(engine._results) == 4
+    assert engine.series("day", date(2026, 1, 1), date(2026, 1, 31)) is not first
@@ -0,0 +1,324 @@
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from datetime import date
+
+import numpy as np
+
+from financials import METRICS, FinancialSeries
+
+GRANULARITIES = ("day", "week", "month", "quarter", "year")
+TIMEFRAMES = {"daily": "day", "weekly": "week", "monthly": "month", "quarterly": "quarter", "yearly": "year"}
+YEARLY_SPAN = 5  # the yearly view covers this many years up to the requested one
+TIMESERIES_CACHE_SIZE = int(os.getenv("TIMESERIES_CACHE_SIZE", "256"))
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# What an entry carries; expenses and profit are derived on the way out.
+# Money is stored in integer cents so incremental sums never drift.
+BASE = ("revenue", "cogs", "operating_expenses", "sales")
+_MONEY = np.array([100, 100, 100, 1])
+_EPOCH = date(1970, 1, 1).toordinal()
+
+
+def day_number(value: date | str) -> int:
+    """Days since 1970-01-01 for a date or ISO date/datetime string."""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return value.toordinal() - _EPOCH
+
+
+def bucket_keys(granularity: str, days: np.ndarray) -> np.ndarray:
+    """Bucket index for each day number; consecutive buckets get consecutive keys."""
+    if granularity == "day":
+        return days
+    if granularity == "week":
+        return (days + 3) // 7  # ISO weeks start on Monday; 1970-01-01 was a Thursday
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    if granularity == "month":
+        return months
+    if granularity == "quarter":
+        return months // 3
+    if granularity == "year":
+        return months // 12
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def bucket_starts(granularity: str, keys: np.ndarray) -> np.ndarray:
+    """First day of each bucket, as datetime64[D]."""
+    if granularity == "day":
+        return keys.astype("datetime64[D]")
+    if granularity == "week":
+        return (keys * 7 - 3).astype("datetime64[D]")
+    months = keys * {"month": 1, "quarter": 3, "year": 12}[granularity]
+    return months.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def bucket_labels(granularity: str, keys: np.ndarray, with_year: bool = True) -> list[str]:
+    starts = bucket_starts(granularity, keys)
+    if granularity == "day":
+        return np.datetime_as_string(starts).tolist()
+    if granularity == "week":
+        thursdays = starts + 3  # the ISO year is the one holding the week's Thursday
+        years = thursdays.astype("datetime64[Y]")
+        weeks = (thursdays - years.astype("datetime64[D]")).astype(np.int64) // 7 + 1
+        return [f"{y}-W{w:02d}" for y, w in zip((years.astype(np.int64) + 1970).tolist(), weeks.tolist())]
+    months = starts.astype("datetime64[M]").astype(np.int64)
+    years = (months // 12 + 1970).tolist()
+    if granularity == "year":
+        return [str(y) for y in years]
+    if granularity == "month":
+        names = [MONTHS[m] for m in (months % 12).tolist()]
+    else:
+        names = [f"Q{q + 1}" for q in (months % 12 // 3).tolist()]
+    return [f"{n} {y}" for n, y in zip(names, years)] if with_year else names
+
+
+def _prior_year_keys(granularity: str, keys: np.ndarray) -> np.ndarray:
+    """The same bucket one year earlier (Feb 29 maps to Feb 28)."""
+    if granularity == "day":
+        days = keys.astype("datetime64[D]")
+        months = days.astype("datetime64[M]")
+        prior = months - 12
+        length = (prior + 1).astype("datetime64[D]") - prior.astype("datetime64[D]")
+        offset = np.minimum(days - months.astype("datetime64[D]"), length - 1)
+        return (prior.astype("datetime64[D]") + offset).astype(np.int64)
+    return keys - {"week": 52, "month": 12, "quarter": 4, "year": 1}[granularity]
+
+
+class _Rollup:
+    """Dense per-bucket sums of the base metrics, indexed by ``key - start``."""
+
+    def __init__(self):
+        self.start = 0
+        self.sums = np.zeros((0, len(BASE)), dtype=np.int64)
+
+    def add(self, keys: np.ndarray, values: np.ndarray) -> None:
+        lo, hi = int(keys.min()), int(keys.max())
+        if len(self.sums):
+            lo, hi = min(lo, self.start), max(hi, self.start + len(self.sums) - 1)
+        if lo != self.start or hi - lo + 1 != len(self.sums):
+            grown = np.zeros((hi - lo + 1, len(BASE)), dtype=np.int64)
+            offset = self.start - lo
+            grown[offset:offset + len(self.sums)] = self.sums
+            self.start, self.sums = lo, grown
+        np.add.at(self.sums, keys - self.start, values)
+
+    def take(self, keys: np.ndarray) -> np.ndarray:
+        """Rows for ``keys``; buckets outside the table are zero."""
+        index = keys - self.start
+        inside = (index >= 0) & (index < len(self.sums))
+        out = np.zeros((len(keys), len(BASE)), dtype=np.int64)
+        out[inside] = self.sums[index[inside]]
+        return out
+
+
+class TimeSeriesEngine:
+    """Financial figures over dated ledger entries at any granularity.
+
+    Every entry is folded into a rollup table per granularity as it
+    arrives, so a query is a slice of one table rather than a pass over
+    the entries. Entries with an ``id`` can be sent again when they
+    change: the earlier contribution is taken back out first. Query
+    results are cached until the next batch of entries, the least recently
+    used dropped beyond ``TIMESERIES_CACHE_SIZE``. Adds and queries
+    may come from different threads and are serialized by one lock.
+    """
+
+    def __init__(self):
+        self._rollups = {g: _Rollup() for g in GRANULARITIES}
+        self._entries: dict[str, tuple[int, tuple]] = {}
+        self._results: OrderedDict[tuple, object] = OrderedDict()
+        self._lock = threading.RLock()
+        self.version = 0
+        self.watermark: str | None = None  # newest upstream update folded in, kept by the caller
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, entries: Iterable[dict]) -> int:
+        """Fold entries (``date`` plus any of :data:`BASE`) into the rollups."""
+        with self._lock:
+            return self._add(entries)
+
+    def _add(self, entries: Iterable[dict]) -> int:
+        days, rows = [], []
+        for entry in entries:
+            day = day_number(entry["date"])
+            values = tuple(round(entry.get(m) or 0, 2) for m in BASE)
+            entry_id = entry.get("id")
+            if entry_id is not None:
+                previous = self._entries.get(entry_id)
+                if previous == (day, values):
+                    continue
+                if previous is not None:
+                    days.append(previous[0])
+                    rows.append(tuple(-v for v in previous[1]))
+                self._entries[entry_id] = (day, values)
+            days.append(day)
+            rows.append(values)
+        if days:
+            values = np.rint(np.asarray(rows, dtype=np.float64) * _MONEY).astype(np.int64)
+            self.add_columns(np.asarray(days, dtype=np.int64), values)
+        return len(days)
+
+    def add_columns(self, days: np.ndarray, values: np.ndarray) -> None:
+        """Bulk form of :meth:`add`: day numbers and (n x BASE) integer cents/units."""
+        if not len(days):
+            return
+        with self._lock:
+            for granularity, rollup in self._rollups.items():
+                rollup.add(bucket_keys(granularity, days), values)
+            self.version += 1
+            self._results.clear()
+
+    def _cached(self, key: tuple, build):
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                return result
+            result = self._results[key] = build()
+            while len(self._results) > TIMESERIES_CACHE_SIZE:
+                self._results.popitem(last=False)
+            return result
+
+    def keys(self, granularity: str, start: date, end: date) -> np.ndarray:
+        lo, hi = bucket_keys(granularity, np.array([day_number(start), day_number(end)], dtype=np.int64))
+        return np.arange(lo, hi + 1, dtype=np.int64)
+
+    def _frame(self, raw: np.ndarray, labels: list[str]) -> FinancialSeries:
+        cents = {m: raw[:, i] for i, m in enumerate(BASE)}
+        cents["expenses"] = cents["cogs"] + cents["operating_expenses"]
+        cents["profit"] = cents["revenue"] - cents["expenses"]
+        columns = {m: cents[m] if m == "sales" else cents[m] / 100 for m in METRICS}
+        return FinancialSeries(labels, columns)
+
+    def series(self, granularity: str, start: date, end: date) -> FinancialSeries:
+        """Buckets from the one holding ``start`` to the one holding ``end``."""
+        def build():
+            keys = self.keys(granularity, start, end)
+            labels = bucket_labels(granularity, keys, with_year=start.year != end.year)
+            return self._frame(self._rollups[granularity].take(keys), labels)
+        return self._cached(("series", granularity, start, end), build)
+
+    def active_months(self, year: int) -> FinancialSeries:
+        """The months of ``year`` up to the last one with any activity."""
+        def build():
+            months = self.series("month", date(year, 1, 1), date(year, 12, 31))
+            active = np.flatnonzero(np.abs(months.matrix).sum(axis=1))
+            last = int(active[-1]) + 1 if len(active) else 0
+            return FinancialSeries(months.labels[:last], {m: c[:last] for m, c in months.columns.items()})
+        return self._cached(("active_months", year), build)
+
+    def prior_year(self, granularity: str, start: date, end: date) -> FinancialSeries:
+        """The buckets of :meth:`series` one year earlier, row for row."""
+        def build():
+            keys = _prior_year_keys(granularity, self.keys(granularity, start, end))
+            labels = bucket_labels(granularity, keys)
+            return self._frame(self._rollups[granularity].take(keys), labels)
+        return self._cached(("prior_year", granularity, start, end), build)
+
+    def rolling(self, granularity: str, start: date, end: date, window: int) -> FinancialSeries:
+        """Sum of the ``window`` buckets ending at each bucket of :meth:`series`."""
+        def build():
+            keys = self.keys(granularity, start, end)
+            extended = np.arange(keys[0] - window + 1, keys[-1] + 1, dtype=np.int64)
+            cumulative = np.zeros((len(extended) + 1, len(BASE)), dtype=np.int64)
+            np.cumsum(self._rollups[granularity].take(extended), axis=0, out=cumulative[1:])
+            sums = cumulative[window:] - cumulative[:-window]
+            return self._frame(sums, self.series(granularity, start, end).labels)
+        return self._cached(("rolling", granularity, start, end, window), build)
+
+
+def min_year(timeframe: str) -> int:
+    """The earliest ``year`` :func:`financial_analysis` can cover for ``timeframe``."""
+    return YEARLY_SPAN if TIMEFRAMES.get(timeframe, timeframe) == "year" else 1
+
+
+def _change(current: np.ndarray, prior: np.ndarray) -> list:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.round((current - prior) / np.abs(prior) * 100, 1)
+    return [p if b else None for p, b in zip(pct.tolist(), (prior != 0).tolist())]
+
+
+def financial_analysis(
+    engine: TimeSeriesEngine,
+    year: int,
+    timeframe: str = "monthly",
+    window: int = 0,
+    compare_prior_year: bool = False,
+) -> dict:
+    """The /analysis/financial payload for ``year``.
+
+    ``yearly`` covers the :data:`YEARLY_SPAN` years up to ``year``; every
+    other timeframe covers the calendar year. The summary is always taken over the year's
+    months, up to the last month with any activity. The payload is kept
+    with the engine's other results until the next :meth:`~TimeSeriesEngine.add`,
+    so repeat calls return the same object; treat it as read-only.
+    """
+    granularity = TIMEFRAMES.get(timeframe, timeframe)
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown timeframe: {timeframe}")
+    return engine._cached(
+        ("analysis", year, timeframe, window, compare_prior_year),
+        lambda: _financial_analysis(engine, year, timeframe, granularity, window, compare_prior_year),
+    )
+
+
+def _financial_analysis(
+    engine: TimeSeriesEngine, year: int, timeframe: str, granularity: str, window: int, compare_prior_year: bool
+) -> dict:
+    start, end = date(year, 1, 1), date(year, 12, 31)
+    if granularity == "year":
+        start = date(year - YEARLY_SPAN + 1, 1, 1)
+
+    series = engine.series(granularity, start, end)
+    columns = [series.column(m) for m in METRICS]
+    starts = np.datetime_as_string(bucket_starts(granularity, engine.keys(granularity, start, end))).tolist()
+    periods = [
+        {"period": label, "start": first, **dict(zip(METRICS, row))}
+        for label, first, row in zip(series.labels, starts, zip(*columns))
+    ]
+    if window > 1:
+        rolling = engine.rolling(granularity, start, end, window)
+        keys = ("revenue", "expenses", "profit", "sales")
+        for period, row in zip(periods, zip(*(rolling.column(m) for m in keys))):
+            period["rolling"] = dict(zip(keys, row))
+    if compare_prior_year:
+        prior = engine.prior_year(granularity, start, end)
+        rows = zip(
+            prior.labels,
+            prior.column("revenue"),
+            prior.column("profit"),
+            _change(series.columns["revenue"], prior.columns["revenue"]),
+            _change(series.columns["profit"], prior.columns["profit"]),
+        )
+        keys = ("period", "revenue", "profit", "revenue_change", "profit_change")
+        for period, row in zip(periods, rows):
+            period["prior_year"] = dict(zip(keys, row))
+
+    months = engine.active_months(year)
+    stats = months.stats
+    totals = {m: round(v, 2) for m, v in stats["totals"].items()}
+    best, worst = stats["best_revenue"], stats["worst_revenue"]
+    revenue = months.column("revenue")
+
+    return {
+        "year": year,
+        "timeframe": timeframe,
+        "granularity": granularity,
+        "periods": periods,
+        "summary": {
+            "total_revenue": totals["revenue"],
+            "total_expenses": totals["expenses"],
+            "total_profit": totals["profit"],
+            "total_sales": totals["sales"],
+            "avg_profit_margin": stats["margin"],
+            "best_month": months.labels[best] if best is not None else None,
+            "best_month_revenue": revenue[best] if best is not None else 0,
+            "worst_month": months.labels[worst] if worst is not None else None,
+            "worst_month_revenue": revenue[worst] if worst is not None else 0,
+            "revenue_growth": stats["period_growth"],
+        },
+    }
@@ -1,7 +1,7 @@
 import { z } from "zod";
 
 const periodSchema = z.object({
-  period: z.string().describe("Period label (month name or quarter)"),
+  period: z.string().describe("Period label (date, ISO week, month, quarter or year)"),
   revenue: z.number().describe("Revenue for the period"),
   expenses: z.number().describe("Total expenses"),
   profit: z.number().describe("Profit (revenue - expenses)"),
@@ -25,7 +25,7 @@ const summarySchema = z.object({
 
 export const propSchema = z.object({
   year: z.number().describe("Year being analyzed"),
-  timeframe: z.string().describe("Timeframe (monthly or quarterly)"),
+  timeframe: z.string().describe("Timeframe (daily, weekly, monthly, quarterly or yearly)"),
   periods: z.array(periodSchema).describe("Financial data by period"),
   summary: summarySchema.describe("Summary statistics"),
 });